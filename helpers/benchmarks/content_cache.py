@@ -0,0 +1,103 @@
+"""Benchmark of a worker's startup with and without the content cache
+
+Generates a content repository of the size of sipa's (about 150 pages
+in two languages), and times initializing `CategorizedFlatPages` and
+rendering each page once, which every worker does on the first request
+of the respective page:
+
+* without `CONTENT_CACHE_DIR`,
+* for the worker filling the cache,
+* for a worker loading it.
+
+Run from the project root:
+
+    python -m helpers.benchmarks.content_cache
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+from flask import Flask
+from flask_babel import Babel
+
+from sipa.config import default
+from sipa.flatpages import CategorizedFlatPages
+
+PARAGRAPH = (
+    "Lorem ipsum dolor sit amet, [consectetur](/pages/about/contact) adipiscing"
+    " elit, sed do *eiusmod* tempor incididunt ut labore et dolore magna aliqua."
+)
+TABLE = "| A | B | C |\n|---|---|---|\n" + "| 1 | 2 | 3 |\n" * 8
+
+
+def page(title: str, rank: int) -> str:
+    body = "\n\n".join([PARAGRAPH] * 6 + ["* one\n* two\n* three", TABLE])
+    return f"title: {title}\nrank: {rank}\ndate: 2024-01-01\n\n{body}\n"
+
+
+def create_content(root: str, categories: int = 8, articles: int = 9) -> int:
+    count = 0
+    for c in range(categories):
+        for a in range(articles + 1):
+            name = "index" if a == 0 else f"article{a}"
+            for locale in ("de", "en"):
+                path = os.path.join(root, f"category{c}", f"{name}.{locale}.md")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as f:
+                    f.write(page(f"{name} {locale}", a))
+                count += 1
+    git = ["git", "-C", root, "-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+    subprocess.check_call([*git, "init", "-q"])
+    subprocess.check_call([*git, "add", "."])
+    subprocess.check_call([*git, "commit", "-q", "-m", "content"])
+    return count
+
+
+def start_worker(content: str, cache_dir: str | None) -> float:
+    """Initialize the pages and render each of them, return the seconds taken"""
+    app = Flask("bench")
+    app.config.update(
+        FLATPAGES_ROOT=content,
+        FLATPAGES_EXTENSION=default.FLATPAGES_EXTENSION,
+        FLATPAGES_MARKDOWN_EXTENSIONS=default.FLATPAGES_MARKDOWN_EXTENSIONS,
+        FLATPAGES_EXTENSION_CONFIGS=default.FLATPAGES_EXTENSION_CONFIGS,
+        CONTENT_CACHE_DIR=cache_dir,
+    )
+    Babel(app)
+    start = time.perf_counter()
+    cf_pages = CategorizedFlatPages()
+    cf_pages.init_app(app)
+    with app.test_request_context():
+        for p in cf_pages.flat_pages:
+            p.html
+    return time.perf_counter() - start
+
+
+def report(name: str, timings: list[float]):
+    print(f"{name:>22}: {statistics.median(timings) * 1000:7.1f} ms"
+          f" (min {min(timings) * 1000:.1f} ms)")
+
+
+def main(repeat: int = 7):
+    with tempfile.TemporaryDirectory() as tmp:
+        content = os.path.join(tmp, "content")
+        cache_dir = os.path.join(tmp, "cache")
+        print(f"{create_content(content)} pages")
+
+        report("without cache", [start_worker(content, None) for _ in range(repeat)])
+
+        filling = []
+        for _ in range(repeat):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            filling.append(start_worker(content, cache_dir))
+        report("filling the cache", filling)
+
+        report("loading the cache", [start_worker(content, cache_dir)
+                                     for _ in range(repeat)])
+
+
+if __name__ == "__main__":
+    main()
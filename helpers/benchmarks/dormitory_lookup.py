@@ -0,0 +1,43 @@
+"""Micro-benchmark of `DataSource.dormitory_from_ip`
+
+Compares the former linear scan over all dormitories and subnets with
+the bisection in `SubnetIndex`, with and without the LRU cache in front
+of it, using the pycroft datasource's subnets.
+
+Run from the project root:
+
+    python -m helpers.benchmarks.dormitory_lookup
+"""
+import random
+import timeit
+from ipaddress import IPv4Address
+
+from sipa.model.pycroft import datasource
+
+
+def linear_scan(ip: str):
+    address = IPv4Address(ip)
+    return next((d for d in datasource.dormitories if address in d.subnets), None)
+
+
+def main(number: int = 20_000):
+    subnets = [s for d in datasource.dormitories for s in d.subnets.subnets]
+    rng = random.Random(0)
+    # half of the ips inside some dormitory, half outside
+    ips = [str(s[rng.randrange(s.num_addresses)])
+           for s in (rng.choice(subnets) for _ in range(500))]
+    ips += [str(IPv4Address(rng.getrandbits(32))) for _ in range(500)]
+    print(f"{len(subnets)} subnets in {len(datasource.dormitories)} dormitories, "
+          f"{len(ips)} distinct ips")
+
+    def run(lookup):
+        it = iter(ips * (number // len(ips) + 1))
+        return timeit.timeit(lambda: lookup(next(it)), number=number) / number * 1e6
+
+    print(f"linear scan:  {run(linear_scan):6.2f} µs/lookup")
+    print(f"bisection:    {run(datasource._dormitory_from_ip):6.2f} µs/lookup")
+    print(f"cached:       {run(datasource.dormitory_from_ip):6.2f} µs/lookup")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark of building the search index and of search queries
+
+Uses the generated content repository of
+:py:mod:`helpers.benchmarks.content_cache` and times
+
+* building the index of all pages,
+* updating it after one page has changed,
+* queries of one and of several words.
+
+Run from the project root:
+
+    python -m helpers.benchmarks.search
+"""
+import os
+import statistics
+import tempfile
+import time
+
+from flask import Flask
+from flask_babel import Babel
+
+from sipa.config import default
+from sipa.flatpages import CategorizedFlatPages
+from sipa.search import SearchIndex
+
+from .content_cache import create_content
+
+QUERIES = ("dolor", "consectetur adipiscing elit", "article5 en", "nothing")
+
+
+def make_cf_pages(content: str) -> CategorizedFlatPages:
+    app = Flask("bench")
+    app.config.update(
+        FLATPAGES_ROOT=content,
+        FLATPAGES_EXTENSION=default.FLATPAGES_EXTENSION,
+        FLATPAGES_MARKDOWN_EXTENSIONS=default.FLATPAGES_MARKDOWN_EXTENSIONS,
+        FLATPAGES_EXTENSION_CONFIGS=default.FLATPAGES_EXTENSION_CONFIGS,
+    )
+    Babel(app)
+    cf_pages = CategorizedFlatPages()
+    cf_pages.init_app(app)
+    return cf_pages
+
+
+def timeit(function, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: list[float]):
+    print(f"{name:>32}: {statistics.median(timings) * 1000:8.3f} ms"
+          f" (min {min(timings) * 1000:.3f} ms)")
+
+
+def main(repeat: int = 21):
+    with tempfile.TemporaryDirectory() as tmp:
+        content = os.path.join(tmp, "content")
+        print(f"{create_content(content)} pages")
+        cf_pages = make_cf_pages(content)
+        root = cf_pages.root_category
+
+        report("building the index",
+               timeit(lambda: SearchIndex().updated(root), repeat))
+
+        index = cf_pages.search_index
+        changed = cf_pages._build_categories()
+        article = changed.categories["category3"]._articles["article4"]
+        page = article.localized_pages["en"]
+        article.localized_pages["en"] = cf_pages.flat_pages._parse(
+            page._meta + "\n\n" + page.body + "\nchanged", page.path, page.folder
+        )
+        report("updating one page", timeit(lambda: index.updated(changed), repeat))
+
+        for query in QUERIES:
+            report(repr(query), timeit(lambda: index.search(query, "en"), repeat * 10))
+
+
+if __name__ == "__main__":
+    main()
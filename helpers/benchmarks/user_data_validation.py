@@ -0,0 +1,107 @@
+"""Micro-benchmark of validating pycroft user data
+
+Compares validating all of a long-standing member's data eagerly, as
+`UserData` used to, with the lazy validation of the finance and traffic
+history, both for a page which only needs the scalar fields and for one
+which reads the whole finance history.  For comparison, the cost of
+skipping validation via (shallow) `model_construct` is shown, as well
+as that of decoding the response with `json` or with `orjson`, which
+is used with `PYCROFT_DECODE_MODE = "trusted"`.
+
+Run from the project root:
+
+    python -m helpers.benchmarks.user_data_validation
+"""
+import json
+import timeit
+from datetime import date, timedelta
+
+from pydantic import BaseModel
+
+from sipa.model.pycroft import schema
+from sipa.model.pycroft.schema import (
+    FinanceHistoryEntry,
+    Interface,
+    TrafficHistoryEntry,
+    UserData,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class EagerUserData(UserData):
+    traffic_history: list[TrafficHistoryEntry]
+    interfaces: list[Interface]
+    finance_history: list[FinanceHistoryEntry]
+
+
+# the inherited annotations refer to names of the schema module
+EagerUserData.model_rebuild(_types_namespace=vars(schema))
+
+
+def member_json(months: int) -> dict:
+    """A member with a membership fee and a payment for each month"""
+    start = date(2010, 1, 1)
+    finance_history = [
+        entry
+        for month in range(months)
+        for entry in (
+            {"valid_on": (start + timedelta(days=30 * month)).isoformat(),
+             "amount": "-5.00", "description": "Mitgliedsbeitrag"},
+            {"valid_on": (start + timedelta(days=30 * month + 3)).isoformat(),
+             "amount": "5.00", "description": "Überweisung"},
+        )
+    ]
+    traffic_history = [
+        {"timestamp": f"2023-11-{day:02d}T00:00:00+00:00",
+         "ingress": 1 << 30, "egress": 1 << 28}
+        for day in range(1, 8)
+    ]
+    return {
+        "id": 1, "user_id": "1-0", "login": "user", "name": "Test User",
+        "status": {"member": True, "traffic_exceeded": False, "network_access": True,
+                   "account_balanced": True, "violation": False},
+        "room": "Wu 5 / 0 01", "mail": "test@example.com",
+        "mail_forwarded": False, "mail_confirmed": True,
+        "properties": ["sipa_login", "member", "network_access", "mail"],
+        "traffic_history": traffic_history,
+        "interfaces": [{"id": 1, "mac": "aa:bb:cc:dd:ee:ff", "ips": ["141.30.228.39"]}],
+        "finance_balance": "0.00",
+        "finance_history": finance_history,
+        "last_finance_update": "2023-11-02",
+        "birthdate": "1990-01-01", "membership_end_date": None,
+        "membership_begin_date": start.isoformat(), "wifi_password": None,
+    }
+
+
+def main(number: int = 2_000):
+    def run(fn):
+        return timeit.timeit(fn, number=number) / number * 1e6
+
+    for months in (12, 120, 240):
+        data = member_json(months)
+
+        def scalar_page(model: type[BaseModel] = UserData):
+            user = model.model_validate(data)
+            return user.login, user.properties
+
+        def finance_page():
+            return list(UserData.model_validate(data).finance_history)
+
+        print(f"{len(data['finance_history'])} transactions:")
+        print(f"  eager:                 {run(lambda: scalar_page(EagerUserData)):8.1f} µs")
+        print(f"  lazy, scalar fields:   {run(scalar_page):8.1f} µs")
+        print(f"  lazy, finance history: {run(finance_page):8.1f} µs")
+        print(f"  model_construct:       {run(lambda: UserData.model_construct(**data)):8.1f} µs")
+
+        body = json.dumps(data).encode()
+        print(f"  json.loads:            {run(lambda: json.loads(body)):8.1f} µs")
+        if orjson is not None:
+            print(f"  orjson.loads:          {run(lambda: orjson.loads(body)):8.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""Write compressed siblings (`.br`, `.gz`) of the static files
+
+Run from the project root after changing the static files, e.g. when
+building the image:
+
+    python -m helpers.compress_static [directory]
+
+The directory defaults to `sipa/static`.  `.br` files are only written
+if the `brotli` package is installed.
+"""
+import sys
+
+from sipa.compression import ENCODINGS, compress_directory
+
+
+def main(directory: str = "sipa/static"):
+    written = compress_directory(directory)
+    names = ", ".join(encoding.name for encoding in ENCODINGS)
+    print(f"Wrote {written} compressed files ({names}) in {directory}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
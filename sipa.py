@@ -39,7 +39,11 @@ else:
     # __name__ == 'uwsgi_file_sipa'
     import uwsgi
     debug = uwsgi.opt.get('debug', False)
-    app = create_app()
+    config = {}
+    if interval := uwsgi.opt.get('content-refresh-interval'):
+        # overridden by a `SIPA_CONFIG_FILE`
+        config['CONTENT_REFRESH_INTERVAL'] = float(interval)
+    app = create_app(config=config)
     if debug:
         logger.warning("Running in debug mode")
         app.debug = True
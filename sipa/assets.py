@@ -0,0 +1,120 @@
+"""Content-hashed urls of the static files
+
+At startup, every file below the static folder is hashed.  Urls built
+with ``url_for('static', filename=…)`` get the hash appended as ``v``
+argument, so they change whenever the file does.  Responses to such
+urls may therefore be cached forever (``Cache-Control: immutable``),
+while urls without or with an outdated hash are revalidated as usual.
+"""
+import hashlib
+import logging
+import os
+import typing as t
+
+from flask import Flask, current_app, request
+from werkzeug import Response
+
+logger = logging.getLogger(__name__)
+
+#: The argument carrying the hash
+VERSION_ARG = 'v'
+#: How long hashed urls may be cached (one year)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+HASH_LENGTH = 12
+
+
+class ManifestEntry(t.NamedTuple):
+    hash: str
+    #: To notice changes in debug mode
+    size: int
+    mtime_ns: int
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 16):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def _entry(path: str) -> ManifestEntry:
+    stat = os.stat(path)
+    return ManifestEntry(_hash_file(path), stat.st_size, stat.st_mtime_ns)
+
+
+class AssetManifest:
+    """The hashes of the files in ``directory``, keyed by their relative path
+
+    :param check_changes: Whether to hash files again if they have
+        changed since, e.g. while developing
+    """
+
+    def __init__(self, directory: str, check_changes: bool = False):
+        self.directory = directory
+        self.check_changes = check_changes
+        self._entries: dict[str, ManifestEntry] = {}
+        for parent, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(parent, name)
+                filename = os.path.relpath(path, directory).replace(os.sep, '/')
+                self._entries[filename] = _entry(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, filename: str) -> str | None:
+        """The hash of ``filename``, if it is a file of the manifest"""
+        if (entry := self._entries.get(filename)) is None:
+            return None
+        if self.check_changes:
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            if (stat.st_size, stat.st_mtime_ns) != entry[1:]:
+                entry = self._entries[filename] = _entry(path)
+        return entry.hash
+
+
+def add_asset_version(endpoint: str, values: dict[str, t.Any]) -> None:
+    """Append the hash to the urls of static files
+
+    This is a `url_defaults` callback.
+    """
+    if endpoint != 'static' or VERSION_ARG in values:
+        return
+    manifest: AssetManifest = current_app.extensions['asset_manifest']
+    if (version := manifest.get(values.get('filename', ''))) is not None:
+        values[VERSION_ARG] = version
+
+
+def cache_versioned_assets(response: Response) -> Response:
+    """Let clients cache static files requested with their current hash
+
+    This is an `after_request` handler.
+    """
+    if request.endpoint != 'static' or response.status_code not in (200, 206, 304):
+        return response
+    if (version := request.args.get(VERSION_ARG)) is None:
+        return response
+    manifest: AssetManifest = current_app.extensions['asset_manifest']
+    if version != manifest.get(request.view_args.get('filename', '')):
+        return response
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    response.expires = None
+    return response
+
+
+def init_app(app: Flask) -> None:
+    if app.static_folder is None or not app.config['STATIC_ASSET_HASHING']:
+        return
+    manifest = AssetManifest(app.static_folder, check_changes=app.debug)
+    logger.debug("Hashed %d static files", len(manifest))
+    app.extensions['asset_manifest'] = manifest
+    app.url_defaults(add_asset_version)
+    app.after_request(cache_versioned_assets)
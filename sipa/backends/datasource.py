@@ -1,8 +1,13 @@
 from __future__ import annotations
 
-from collections.abc import Callable
+from bisect import bisect_right
+from heapq import heappop, heappush
+from itertools import pairwise
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass, field
-from ipaddress import IPv4Network, IPv4Address, AddressValueError
+from functools import lru_cache
+from ipaddress import IPv4Network, IPv4Address, IPv6Network, IPv6Address, ip_address
+from typing import Generic, TypeVar
 
 from flask import Flask
 
@@ -12,6 +17,9 @@ from .types import UserLike
 
 InitContextCallable = Callable[[Flask], None]
 
+IPNetwork = IPv4Network | IPv6Network
+IPAddress = IPv4Address | IPv6Address
+
 
 class DataSource:
     """A class providing a certain Backend.
@@ -42,6 +50,12 @@ class DataSource:
         self.user_class: type[UserLike] = _user_class
 
         self._dormitories = {d.name: d for d in dormitories}
+        # where subnets overlap, the dormitory configured first wins
+        self._subnet_index = SubnetIndex(
+            (subnet, d) for d in dormitories for subnet in d.subnets.subnets
+        )
+        # hot ips (e.g. a user browsing from their room) skip even the bisection
+        self._cached_dormitory_from_ip = lru_cache(maxsize=1024)(self._dormitory_from_ip)
         #: The mail server to be appended to a user's login in order
         #: to construct the mail address.
         self.mail_server = mail_server
@@ -71,15 +85,20 @@ class DataSource:
     def dormitory_from_ip(self, ip: str) -> Dormitory | None:
         """Return the dormitory whose subnets contain ``ip``
 
-        :param ip: The ip
+        :param ip: The ip, either IPv4 or IPv6
 
         :return: The dormitory containing ``ip``
         """
+        return self._cached_dormitory_from_ip(str(ip))
+
+    def _dormitory_from_ip(self, ip: str) -> Dormitory | None:
         try:
-            address = IPv4Address(str(ip))
-        except AddressValueError:
+            address = ip_address(ip)
+        except ValueError:
             return None
-        return next((d for d in self.dormitories if address in d.subnets), None)
+        if isinstance(address, IPv6Address) and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        return self._subnet_index.lookup(address)
 
     def init_app(self, app: Flask):
         """Initialize this backend
@@ -117,21 +136,102 @@ class DataSource:
 
 @dataclass(frozen=True)
 class SubnetCollection:
-    """A simple class for combining multiple IPv4Networks.
+    """A simple class for combining multiple IPv4Networks or IPv6Networks.
 
-    Provides __contains__ functionality for IPv4Addresses.
+    Provides __contains__ functionality for IPv4Addresses and IPv6Addresses.
     """
 
-    subnets: list[IPv4Network] = field(default_factory=list)
+    subnets: list[IPNetwork] = field(default_factory=list)
 
     # hint should be replaced with typing info from stub
-    def __contains__(self, address: IPv4Address):
+    def __contains__(self, address: IPAddress):
         for subnet in self.subnets:
-            if address in subnet:
+            # `ipaddress` does not check the version by itself
+            if address.version == subnet.version and address in subnet:
                 return True
         return False
 
 
+T = TypeVar('T')
+
+
+class SubnetIndex(Generic[T]):
+    """Maps ip addresses to values by means of sorted address ranges.
+
+    Every network is stored as the integer range of its addresses.
+    The ranges are kept sorted and disjoint, so a lookup is a
+    bisection over the range starts, i.e. ``O(log n)`` in the number of
+    networks.  IPv4 and IPv6 networks are kept in separate indices.
+
+    :param entries: Pairs of a network and the value it maps to.  Where
+        networks overlap, the entry given first wins, as it would when
+        searching the entries in order.
+    """
+
+    def __init__(self, entries: Iterable[tuple[IPNetwork, T]]):
+        ranges: dict[int, list[tuple[int, int, T]]] = {4: [], 6: []}
+        for network, value in entries:
+            ranges[network.version].append((
+                int(network.network_address),
+                int(network.broadcast_address),
+                value,
+            ))
+
+        self._starts: dict[int, list[int]] = {}
+        self._ends: dict[int, list[int]] = {}
+        self._values: dict[int, list[T]] = {}
+        for version, version_ranges in ranges.items():
+            merged = self._merge(version_ranges)
+            self._starts[version] = [start for start, _, _ in merged]
+            self._ends[version] = [end for _, end, _ in merged]
+            self._values[version] = [value for _, _, value in merged]
+
+    @staticmethod
+    def _merge(ranges: list[tuple[int, int, T]]) -> list[tuple[int, int, T]]:
+        """Turn ranges in the order of priority into sorted disjoint ones
+
+        Where ranges overlap, the one given first wins.  Adjacent ranges
+        of the same value are joined.
+        """
+        # every elementary interval between these points is covered by
+        # the same ranges
+        points = sorted({start for start, _, _ in ranges}
+                        | {end + 1 for _, end, _ in ranges})
+        by_start = sorted((start, priority, end, value)
+                          for priority, (start, end, value) in enumerate(ranges))
+        merged: list[tuple[int, int, T]] = []
+        # the covering ranges by priority, ended ones are dropped lazily
+        active: list[tuple[int, int, T]] = []
+        i = 0
+        for point, next_point in pairwise(points):
+            while i < len(by_start) and by_start[i][0] == point:
+                _, priority, end, value = by_start[i]
+                heappush(active, (priority, end, value))
+                i += 1
+            while active and active[0][1] < point:
+                heappop(active)
+            if not active:
+                continue
+            value = active[0][2]
+            if merged and merged[-1][2] is value and merged[-1][1] == point - 1:
+                merged[-1] = (merged[-1][0], next_point - 1, value)
+            else:
+                merged.append((point, next_point - 1, value))
+        return merged
+
+    def lookup(self, address: IPAddress) -> T | None:
+        """Return the value of the network containing ``address``"""
+        ip = int(address)
+        starts = self._starts[address.version]
+        i = bisect_right(starts, ip) - 1
+        if i < 0 or ip > self._ends[address.version][i]:
+            return None
+        return self._values[address.version][i]
+
+    def __len__(self):
+        return sum(len(starts) for starts in self._starts.values())
+
+
 # used for two things:
 # 1. determining whether the source IP belongs to a pycroft user
 # 2. suggesting a default dormitory name based on an IP
@@ -6,6 +6,7 @@ from flask import request, current_app, Flask
 from flask_login import AnonymousUserMixin
 from werkzeug.local import LocalProxy
 
+from . import identity_map
 from .datasource import DataSource, Dormitory
 from .exceptions import InvalidConfiguration
 from .logging import logger
@@ -73,6 +74,7 @@ class Backends:
             return
         app.extensions['backends'] = self
         self.app = app
+        identity_map.init_app(app)
 
         if "BACKENDS" in app.config:
             logger.warning(
@@ -129,10 +131,36 @@ class Backends:
             return dormitory.name
         return None
 
+    def user_from_id(self, user_id: str) -> UserLike:
+        """Return the User with the id ``user_id`` according to the
+        datasource.
+
+        Lookups are memoized for the duration of the request.
+
+        :param user_id: The id as returned by the user's ``get_id()``
+
+        :return: The corresponding User in the sense of the
+                 datasource.
+        """
+        user_class = self.datasource.user_class
+        if (id_map := identity_map.request_identity_map()) is None:
+            return user_class.get(user_id)
+        return id_map.get(user_id, user_class.get)
+
+    def remember_user(self, user: UserLike) -> None:
+        """Make lookups of ``user`` in this request return it as is.
+
+        :param user: An authenticated user, e.g. fresh from a login
+        """
+        if (id_map := identity_map.request_identity_map()) is not None:
+            id_map.add(user)
+
     def user_from_ip(self, ip: str) -> UserLike | None:
         """Return the User that corresponds to ``ip`` according to the
         datasource.
 
+        Lookups are memoized for the duration of the request.
+
         :param ip: The ip
 
         :return: The corresponding User in the sense of the
@@ -142,7 +170,10 @@ class Backends:
         if not self.dormitory_from_ip(ip):
             return AnonymousUserMixin()
 
-        return self.datasource.user_class.from_ip(ip)
+        user_class = self.datasource.user_class
+        if (id_map := identity_map.request_identity_map()) is None:
+            return user_class.from_ip(ip)
+        return id_map.from_ip(ip, user_class.from_ip)
 
 
 #: A namedtuple to improve readability of some return values
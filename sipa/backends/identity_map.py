@@ -0,0 +1,91 @@
+"""A request scoped identity map for user objects
+
+A single request may look up the same user several times, e.g. as
+``current_user`` and again via :py:meth:`Backends.user_from_ip
+<sipa.backends.extension.Backends.user_from_ip>` while rendering the
+template.  The :py:class:`IdentityMap` stored on :py:data:`flask.g`
+makes sure each of these lookups reaches the datasource only once.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from flask import Flask, g, has_request_context
+
+from .logging import logger
+from .types import UserLike
+
+
+class IdentityMap:
+    """Memoizes user lookups by id and by ip.
+
+    If a lookup by ip resolves to an authenticated user, the result
+    is registered under the user's id as well, so that a subsequent
+    lookup by id returns the very same object.
+    """
+
+    def __init__(self):
+        self.by_id: dict[str, UserLike] = {}
+        self.by_ip: dict[str, UserLike] = {}
+        #: How many lookups have been requested
+        self.lookups = 0
+        #: How many lookups did not have to reach the datasource
+        self.saved_calls = 0
+
+    def get(self, user_id: str, loader: Callable[[str], UserLike]) -> UserLike:
+        """Return the user with ``user_id``, calling ``loader`` if unknown."""
+        key = str(user_id)
+        self.lookups += 1
+        if (user := self.by_id.get(key)) is not None:
+            self.saved_calls += 1
+            return user
+
+        user = loader(user_id)
+        self.by_id[key] = user
+        return user
+
+    def add(self, user: UserLike) -> None:
+        """Register an already loaded, authenticated user."""
+        self.by_id[str(user.get_id())] = user
+
+    def from_ip(self, ip: str, loader: Callable[[str], UserLike]) -> UserLike:
+        """Return the user behind ``ip``, calling ``loader`` if unknown."""
+        key = str(ip)
+        self.lookups += 1
+        if (user := self.by_ip.get(key)) is not None:
+            self.saved_calls += 1
+            return user
+
+        user = loader(ip)
+        if user.is_authenticated:
+            # prefer an already known object for the same user
+            user = self.by_id.setdefault(str(user.get_id()), user)
+        self.by_ip[key] = user
+        return user
+
+
+def request_identity_map() -> IdentityMap | None:
+    """The identity map of the current request, if there is one."""
+    if not has_request_context():
+        return None
+    if "user_identity_map" not in g:
+        g.user_identity_map = IdentityMap()
+    return g.user_identity_map
+
+
+def report_identity_map(exc: BaseException | None = None) -> None:
+    """Log how many datasource calls the identity map saved.
+
+    Meant to be registered as a ``teardown_request`` handler.
+    """
+    identity_map: IdentityMap | None = g.pop("user_identity_map", None)
+    if identity_map is None or not identity_map.saved_calls:
+        return
+    logger.debug(
+        "Identity map saved %d of %d user lookups",
+        identity_map.saved_calls, identity_map.lookups,
+    )
+
+
+def init_app(app: Flask) -> None:
+    app.teardown_request(report_identity_map)
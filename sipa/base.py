@@ -9,7 +9,7 @@ import logging
 from flask.globals import session
 from werkzeug.routing import IntegerConverter as BaseIntegerConverter
 
-from sipa.login_manager import SipaLoginManager
+from sipa.login_manager import LEGACY_DISPLAY_NAME_KEY, LazyUser, SipaLoginManager
 from sipa.backends import backends
 
 logger = logging.getLogger(__name__)
@@ -32,12 +32,23 @@ class IntegerConverter(BaseIntegerConverter):
 @login_manager.user_loader
 def load_user(username):
     """Loads a User object from/into the session at every request
+
+    The user is only fetched from the backend once its data is
+    accessed, see :py:class:`~sipa.login_manager.LazyUser`.
     """
     logger.debug("User loader triggered (%r)", username)
     _cleanup_session(session)
-    User = backends.datasource.user_class
-    return User.get(username)
+    return LazyUser(username, backends.user_from_id)
+
+
+def remember_display_name(app, user, **kw):
+    app.extensions['display_names'].set(user.get_id(), user.display_name)
+
+
+def forget_display_name(app, user, **kw):
+    app.extensions['display_names'].invalidate(user.get_id())
 
 
 def _cleanup_session(session):
     session.pop("dormitory", None)
+    session.pop(LEGACY_DISPLAY_NAME_KEY, None)
@@ -6,3 +6,5 @@ from .features import bp_features
 from .news import bp_news
 from .hooks import bp_hooks
 from .register import bp_register
+from .metrics import bp_metrics
+from .search import bp_search
@@ -1,14 +1,46 @@
+import mimetypes
 import os
+import time
+from datetime import UTC, datetime
+from urllib.parse import quote
 
-from flask import Blueprint, send_from_directory, current_app
+from flask import Blueprint, send_from_directory, current_app, abort, request
 from flask_login import current_user
 from flask.views import View
+from werkzeug import Response
+from werkzeug.http import is_resource_modified
+from werkzeug.security import safe_join
 
 from sipa.base import login_manager
+from sipa.utils.git_utils import FileVersion, get_file_version, get_working_tree
 
 
 bp_documents = Blueprint('documents', __name__)
 
+#: The values of ``STATIC_FILES_OFFLOAD`` besides ``None``
+OFFLOAD_MODES = ('x-accel-redirect', 'x-sendfile')
+
+
+@bp_documents.record_once
+def check_offload_mode(state):
+    mode = state.app.config['STATIC_FILES_OFFLOAD']
+    if mode is not None and mode not in OFFLOAD_MODES:
+        raise ValueError(f"STATIC_FILES_OFFLOAD must be one of {OFFLOAD_MODES}"
+                         f" or None, not {mode!r}")
+
+
+def content_file_version(path: str) -> FileVersion | None:
+    """The version of ``path`` in the commit the content pages are from
+
+    Files outside of the content repository have no version.
+    """
+    cf_pages = getattr(current_app, 'cf_pages', None)
+    if cf_pages is None or cf_pages.generation is None:
+        return None
+    if (working_tree := get_working_tree(cf_pages.flat_pages.root)) is None:
+        return None
+    return get_file_version(path, working_tree, cf_pages.generation)
+
 
 class StaticFiles(View):
     def __init__(self, directory, login_required=False, member_required=False):
@@ -27,12 +59,63 @@ class StaticFiles(View):
             directory = self.directory
         else:
             directory = os.path.join(current_app.root_path, self.directory)
+
+        # the same for every checkout of the content, unlike the mtime
+        validators = {}
+        if (path := safe_join(directory, filename)) is not None \
+                and (version := content_file_version(path)) is not None:
+            validators = {'etag': version.sha, 'last_modified': version.modified}
+
+        if current_app.config.get('STATIC_FILES_OFFLOAD') is not None:
+            return self.offload(directory, filename, path, **validators)
         return send_from_directory(
             directory,
             filename,
             max_age=current_app.get_send_file_max_age(filename),
+            **validators,
         )
 
+    def offload(self, directory, filename, path, etag=None, last_modified=None):
+        """Let the front proxy send the file
+
+        Only the headers are set here, like :py:func:`flask.send_file`
+        would.  Range requests are left to the proxy.
+        """
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+        mimetype, _ = mimetypes.guess_type(filename)
+        response = Response(mimetype=mimetype or 'application/octet-stream')
+        if current_app.config['STATIC_FILES_OFFLOAD'] == 'x-accel-redirect':
+            location = (current_app.config['STATIC_FILES_ACCEL_PREFIX'].rstrip('/')
+                        + '/' + os.path.basename(os.path.normpath(directory))
+                        + '/' + os.path.relpath(path, directory).replace(os.sep, '/'))
+            response.headers['X-Accel-Redirect'] = quote(location)
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+
+        if etag is None:
+            stat = os.stat(path)
+            etag = f"{stat.st_mtime}-{stat.st_size}"
+            last_modified = datetime.fromtimestamp(stat.st_mtime, UTC)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        if (max_age := current_app.get_send_file_max_age(filename)) is not None:
+            if max_age > 0:
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            response.expires = int(time.time() + max_age)
+
+        if not is_resource_modified(request.environ, etag=etag,
+                                    last_modified=last_modified):
+            # the proxy must not send the file anyway
+            response.status_code = 304
+            for header in ('X-Accel-Redirect', 'X-Sendfile', 'Content-Type'):
+                del response.headers[header]
+        return response
+
 
 bp_documents.add_url_rule('/images/<path:filename>',
                           view_func=StaticFiles.as_view('show_image',
@@ -2,10 +2,16 @@
 Basically, this is everything that is to specific to appear in the generic.py
 and does not fit into any other blueprint such as “documents”.
 """
+import logging
 
 from flask import Blueprint, current_app, render_template, render_template_string
 
+from sipa.backends.exceptions import BackendError
+from sipa.model.misc import should_display_traffic_data
 from sipa.utils import get_bustimes, meetingcal, support_hotline_available
+from sipa.utils.deadline import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
 
 bp_features = Blueprint('features', __name__)
 
@@ -56,3 +62,27 @@ def hotline():
         """,
         available=support_hotline_available(),
     )
+
+
+@bp_features.route("/traffic-fragment")
+def traffic():
+    """The sidebar's traffic module, if there is traffic data to display.
+
+    This is loaded asynchronously so that rendering a page does not
+    have to wait for the lookup of the user behind the request's ip.
+    If that fails, the module is left out as well instead of redirecting
+    the fragment to the index.
+    """
+    try:
+        display = should_display_traffic_data()
+    except (BackendError, DeadlineExceeded):
+        logger.warning("Could not look up the traffic data", exc_info=True)
+        return ""
+    if not display:
+        return ""
+    return render_template_string(
+        """
+        {%- from "macros/traffic-module.html" import traffic_module -%}
+        {{- traffic_module() -}}
+        """
+    )
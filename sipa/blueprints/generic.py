@@ -23,6 +23,7 @@ from sipa.forms import flash_formerrors, LoginForm, AnonymousContactForm, \
 from sipa.mail import send_official_contact_mail, send_contact_mail
 from sipa.backends.extension import backends
 from sipa.model import pycroft
+from sipa.page_cache import cached_for_anonymous
 from sipa.units import dynamic_unit, format_money
 from sipa.model.exceptions import (
     UserNotFound,
@@ -32,6 +33,7 @@ from sipa.model.exceptions import (
     TokenNotFound,
     LoginNotAllowed,
 )
+from sipa.utils.deadline import DeadlineExceeded
 from sipa.utils.git_utils import get_repo_active_branch, get_latest_commits
 
 logger = logging.getLogger(__name__)
@@ -111,8 +113,20 @@ def exceptionhandler_backend(ex: BackendError):
     return redirect(url_for('generic.index'), 302)
 
 
+@bp_generic.app_errorhandler(DeadlineExceeded)
+def exceptionhandler_deadline(ex: DeadlineExceeded):
+    """Handles requests which ran out of time before uwsgi kills them"""
+    flash(gettext("Die Anfrage hat zu lange gedauert. "
+                  "Bitte probiere es in ein paar Minuten noch mal."),
+          'error')
+    logger.error('Request deadline exceeded: %s', ex,
+                 extra={'data': {'path': request.path}})
+    return redirect(url_for('generic.index'), 302)
+
+
 @bp_generic.route('/index.php')
 @bp_generic.route('/')
+@cached_for_anonymous
 def index():
     return redirect(url_for('news.show'))
 
@@ -151,6 +165,7 @@ def login():
         else:
             if isinstance(user, User):
                 login_user(user, remember=remember)
+                backends.remember_user(user)
                 logger.info('Authentication successful',
                             extra={'tags': {'user': username}})
                 flash(gettext("Anmeldung erfolgreich!"), "success")
@@ -169,7 +184,7 @@ def login():
 @login_required
 def logout():
     logger.info("Logging out",
-                extra={'tags': {'user': current_user.uid}})
+                extra={'tags': {'user': current_user.get_id()}})
     logout_user()
     flash(gettext("Abmeldung erfolgreich!"), 'success')
     return redirect(url_for('.index'))
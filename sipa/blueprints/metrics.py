@@ -0,0 +1,39 @@
+import logging
+from hmac import compare_digest
+
+from flask import Blueprint, Response, abort, current_app, request
+
+from sipa.utils.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+bp_metrics = Blueprint('metrics', __name__)
+
+
+def request_token() -> str | None:
+    """The token passed as bearer token or as ``token`` argument"""
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        return auth.removeprefix('Bearer ')
+    return request.args.get('token')
+
+
+@bp_metrics.route('/metrics')
+def metrics():
+    auth_key = current_app.config.get('METRICS_TOKEN')
+
+    if not auth_key:
+        # no key configured (default) → feature not enabled
+        abort(404)
+
+    key = request_token()
+    if not key:
+        abort(401)
+
+    if not compare_digest(key, auth_key):
+        logger.warning("`metrics` called with wrong Token")
+        abort(403)
+
+    registry: MetricsRegistry = current_app.extensions['metrics']
+    return Response(registry.render(),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,7 +2,6 @@
 Blueprint providing features regarding the news entries.
 """
 import typing as t
-from operator import attrgetter
 from traceback import format_exception_only
 
 from flask import (
@@ -16,11 +15,13 @@ from flask import (
 from flask_flatpages import Page
 
 from sipa.flatpages import CategorizedFlatPages, Article
+from sipa.page_cache import cached_for_anonymous
 
 bp_news = Blueprint('news', __name__, url_prefix='/news')
 
 
 @bp_news.route("/")
+@cached_for_anonymous
 def show():
     """Get all markdown files from 'content/news/', parse them and put
     them in a list for the template.
@@ -28,13 +29,7 @@ def show():
     """
     start = request.args.get('start', None, int)
     end = request.args.get('end', None, int)
-    cf_pages = current_app.cf_pages
-    news = sorted(
-        (article for article in cf_pages.get_articles_of_category('news')
-         if hasattr(article, 'date')),
-        key=attrgetter('date'),
-        reverse=True,
-    )
+    news = current_app.cf_pages.get_localized_articles('news').dated
     if len(news) == 0:
         return render_template(
             "news.html", articles=None, previous_range=0, next_range=0
@@ -77,20 +72,19 @@ def show():
 
 
 @bp_news.route("/<filename>")
+@cached_for_anonymous
 def show_news(filename):
-    news = current_app.cf_pages.get_articles_of_category('news')
-
-    for article in news:
-        if article.file_basename == filename:
-            return render_template("news.html", articles=[article])
-
-    abort(404)
+    news = current_app.cf_pages.get_localized_articles('news')
+    article = news.by_basename.get(filename)
+    if article is None:
+        abort(404)
+    return render_template("news.html", articles=[article])
 
 
 def try_get_content(cf_pages: CategorizedFlatPages, filename: str) -> str:
     """Reconstructs the content of a news article from the given filename."""
-    news = cf_pages.get_articles_of_category("news")
-    article = next((a for a in news if a.file_basename == filename), None)
+    news = cf_pages.get_localized_articles("news")
+    article = news.by_basename.get(filename)
     if not article:
         return ""
     assert isinstance(article, Article)
@@ -7,13 +7,16 @@ from logging import getLogger
 from flask import Blueprint, render_template, redirect, current_app
 from flask_login import current_user
 
+from sipa.page_cache import cached_for_anonymous
+
 
 logger = getLogger(__name__)
 
 bp_pages = Blueprint('pages', __name__, url_prefix='/pages')
 
 
-@bp_pages.route('/<category_id>/<article_id>')
+@bp_pages.route('/<path:category_id>/<article_id>')
+@cached_for_anonymous
 def show(category_id, article_id):
     """Display a flatpage and parse dynamic content if available
 
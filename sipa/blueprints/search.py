@@ -0,0 +1,20 @@
+"""
+Blueprint providing the full-text search over the content pages
+"""
+from flask import Blueprint, current_app, render_template, request
+from flask_babel import get_locale
+
+bp_search = Blueprint('search', __name__, url_prefix='/search')
+
+#: Longer queries are cut off
+MAX_QUERY_LENGTH = 200
+
+
+@bp_search.route("/")
+def show():
+    """Show the pages matching the `q` argument"""
+    query = request.args.get('q', "").strip()[:MAX_QUERY_LENGTH]
+    results = []
+    if query:
+        results = current_app.cf_pages.search(query, str(get_locale()))
+    return render_template("search.html", query=query, results=results)
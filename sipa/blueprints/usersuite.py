@@ -44,6 +44,27 @@ logger = logging.getLogger(__name__)
 
 bp_usersuite = Blueprint('usersuite', __name__, url_prefix='/usersuite')
 
+#: The views which may be used while only outdated user data is
+#: available, see :py:attr:`BaseUser.data_as_of
+#: <sipa.model.user.BaseUser.data_as_of>`
+READ_ONLY_ENDPOINTS = frozenset({
+    'usersuite.index',
+    'usersuite.finance_logs',
+    'usersuite.contact',
+    'usersuite.get_apple_wlan_mobileconfig',
+})
+
+
+@bp_usersuite.before_request
+def block_changes_with_outdated_data():
+    if getattr(current_user, 'data_as_of', None) is None:
+        return None
+    if request.endpoint in READ_ONLY_ENDPOINTS:
+        return None
+    flash(gettext("Diese Funktion ist derzeit nicht verfügbar, "
+                  "da unser Server nicht erreichbar ist."), 'error')
+    return redirect(url_for('.index'))
+
 
 def capability_or_403(active_property, capability):
     prop: ActiveProperty = getattr(current_user, active_property)
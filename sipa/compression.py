@@ -0,0 +1,199 @@
+"""Compressed responses for clients accepting them
+
+* Static files can be compressed ahead of time with
+  :py:func:`compress_directory` (see ``helpers/compress_static.py``),
+  which writes ``.br`` and ``.gz`` siblings.  The static view sends the
+  best of them the client accepts.
+* If ``COMPRESS_RESPONSES`` is set, html and json responses of at least
+  ``COMPRESS_MIN_SIZE`` bytes are compressed with gzip at
+  ``COMPRESS_LEVEL`` on the fly.  A body compressed ahead of time can
+  be handed to :py:func:`compress_response` as ``g.gzipped_body``, which
+  :py:mod:`sipa.page_cache` does for the pages it serves.
+
+Brotli is only used if the `brotli` package is installed.
+"""
+import gzip
+import mimetypes
+import os
+import typing as t
+
+from flask import Flask, current_app, g, request, send_from_directory
+from werkzeug import Response
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#: The files worth compressing, by extension
+COMPRESSIBLE_EXTENSIONS = frozenset({
+    '.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml',
+    '.ttf', '.otf', '.eot', '.ico',
+})
+#: Files smaller than that are left alone
+MIN_FILE_SIZE = 1024
+#: Compressed files are only kept if they save at least this fraction
+MIN_SAVINGS = 0.1
+#: The mimetypes compressed on the fly
+COMPRESSIBLE_MIMETYPES = frozenset({'text/html', 'application/json'})
+
+
+class Encoding(t.NamedTuple):
+    name: str
+    extension: str
+    compress: t.Callable[[bytes], bytes]
+
+
+def _gzip(data: bytes) -> bytes:
+    # without a timestamp, so that builds are reproducible
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+#: In the order of preference
+ENCODINGS: tuple[Encoding, ...] = (
+    *((Encoding('br', '.br', brotli.compress),) if brotli is not None else ()),
+    Encoding('gzip', '.gz', _gzip),
+)
+#: All extensions that may be written, whether brotli is available or not
+COMPRESSED_EXTENSIONS = frozenset({'.br', '.gz'})
+
+
+def compress_directory(directory: str) -> int:
+    """Write compressed siblings of the compressible files in ``directory``
+
+    Siblings that are up to date are skipped.
+
+    :return: The number of files written
+    """
+    written = 0
+    for parent, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(parent, name)
+            if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            stat = os.stat(path)
+            if stat.st_size < MIN_FILE_SIZE:
+                continue
+            data = None
+            for encoding in ENCODINGS:
+                target = path + encoding.extension
+                if _is_up_to_date(target, stat.st_mtime):
+                    continue
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                compressed = encoding.compress(data)
+                if len(compressed) > len(data) * (1 - MIN_SAVINGS):
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(compressed)
+                os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                written += 1
+    return written
+
+
+def _is_up_to_date(path: str, mtime: float) -> bool:
+    try:
+        return os.path.getmtime(path) >= mtime
+    except OSError:
+        return False
+
+
+def _accepted_encodings() -> list[Encoding]:
+    """The encodings the client accepts, best first"""
+    accepted = [(request.accept_encodings.quality(encoding.name), -index, encoding)
+                for index, encoding in enumerate(ENCODINGS)]
+    return [encoding for quality, _, encoding in sorted(accepted, reverse=True)
+            if quality > 0]
+
+
+def send_static_file(filename: str) -> Response:
+    """Send a static file, compressed if there is a sibling the client accepts
+
+    This replaces the view of the `static` endpoint.
+    """
+    directory = current_app.static_folder
+    max_age = current_app.get_send_file_max_age(filename)
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path) \
+            or os.path.splitext(filename)[1] in COMPRESSED_EXTENSIONS:
+        return send_from_directory(directory, filename, max_age=max_age)
+
+    mtime = os.path.getmtime(path)
+    siblings = [encoding for encoding in ENCODINGS
+                if _is_up_to_date(path + encoding.extension, mtime)]
+    if not siblings:
+        return send_from_directory(directory, filename, max_age=max_age)
+
+    for encoding in _accepted_encodings():
+        if encoding in siblings:
+            mimetype, _ = mimetypes.guess_type(filename)
+            response = send_from_directory(
+                directory, filename + encoding.extension, max_age=max_age,
+                mimetype=mimetype or 'application/octet-stream',
+            )
+            response.content_encoding = encoding.name
+            break
+    else:
+        response = send_from_directory(directory, filename, max_age=max_age)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def is_compressible(response: Response) -> bool:
+    """Whether :py:func:`compress_response` may compress ``response``"""
+    return (current_app.config['COMPRESS_RESPONSES']
+            and response.status_code == 200
+            and response.mimetype in COMPRESSIBLE_MIMETYPES
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and 'Content-Encoding' not in response.headers)
+
+
+def gzip_body(data: bytes) -> bytes | None:
+    """Compress the body of a compressible response
+
+    :return: ``None`` if ``data`` is too small to be worth it
+    """
+    config = current_app.config
+    if len(data) < config['COMPRESS_MIN_SIZE']:
+        return None
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'])
+
+
+def compress_response(response: Response) -> Response:
+    """Compress html and json responses with gzip, if the client accepts it
+
+    The body is only compressed if there is no ``g.gzipped_body``.
+
+    This is an `after_request` handler.
+    """
+    gzipped = g.pop('gzipped_body', None)
+    if not is_compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    if request.accept_encodings.quality('gzip') <= 0:
+        return response
+    if gzipped is None and (gzipped := gzip_body(response.get_data())) is None:
+        return response
+
+    response.set_data(gzipped)
+    response.content_encoding = 'gzip'
+    # the same resource in another encoding: only weakly equal
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app: Flask) -> None:
+    """Set up compression
+
+    Must be called before the other `after_request` handlers are
+    registered, so that it runs after them.
+    """
+    if app.static_folder is not None and 'static' in app.view_functions:
+        app.view_functions['static'] = send_static_file
+    if app.config['COMPRESS_RESPONSES']:
+        app.after_request(compress_response)
@@ -0,0 +1,117 @@
+"""HTTP validators for the pages rendered from the content
+
+The pages cached by :py:mod:`sipa.page_cache` only change with the
+content commit, the locale or a new release of sipa.  They get a
+strong `ETag` derived from the key of the page cache, and a
+`Last-Modified` from the time of the content commit or the release,
+whichever is later.  Conditional requests are answered with `304 Not
+Modified` before the view runs.
+"""
+import hashlib
+import logging
+import os
+import typing as t
+from datetime import UTC, datetime
+
+from flask import Flask, current_app, g, request
+from werkzeug import Response
+from werkzeug.http import is_resource_modified
+
+from sipa.page_cache import anonymous_page_key, is_shareable_response
+from sipa.utils.git_utils import get_commit_time
+
+logger = logging.getLogger(__name__)
+
+#: Subdirectories of the application not affecting the rendered pages
+IGNORED_DIRECTORIES = frozenset({'__pycache__'})
+
+
+class Release(t.NamedTuple):
+    """Identifies the code, templates and static files of the pages"""
+
+    token: str
+    time: datetime
+
+
+def current_release(root_path: str) -> Release:
+    """The release of the application in ``root_path``
+
+    Derived from the names, sizes and modification times of its files,
+    which are the same for every worker of a deployment.
+    """
+    digest = hashlib.sha256()
+    latest = 0
+    for directory, subdirectories, files in os.walk(root_path):
+        subdirectories[:] = sorted(d for d in subdirectories
+                                   if d not in IGNORED_DIRECTORIES)
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path, root_path)}:{stat.st_size}:"
+                          f"{stat.st_mtime_ns}\n".encode())
+            latest = max(latest, stat.st_mtime)
+    # `Last-Modified` has a resolution of seconds
+    time = datetime.fromtimestamp(int(latest), UTC)
+    return Release(token=digest.hexdigest()[:16], time=time)
+
+
+def page_validators() -> tuple[str, datetime | None] | None:
+    """The `ETag` and `Last-Modified` of the current request's page
+
+    :return: ``None`` if the page may differ between visitors
+    """
+    if (key := anonymous_page_key()) is None:
+        return None
+    release: Release = current_app.extensions['release']
+    etag = hashlib.sha256(repr((key, release.token)).encode()).hexdigest()[:32]
+    cf_pages = current_app.cf_pages
+    last_modified = get_commit_time(cf_pages.flat_pages.root, cf_pages.generation)
+    if last_modified is not None:
+        last_modified = max(last_modified, release.time)
+    return etag, last_modified
+
+
+def answer_conditional_request() -> Response | None:
+    """Answer with `304 Not Modified` if the client has the current page
+
+    This is a `before_request` handler.
+    """
+    if (validators := page_validators()) is None:
+        return None
+    etag, last_modified = validators
+    if is_resource_modified(request.environ, etag=etag,
+                            last_modified=last_modified):
+        g.page_validators = validators
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+
+def add_validators(response: Response) -> Response:
+    """Add the validators computed by :py:func:`answer_conditional_request`
+
+    This is an `after_request` handler.
+    """
+    if (validators := g.pop('page_validators', None)) is None:
+        return response
+    if response.status_code != 200 or not is_shareable_response(response):
+        return response
+    etag, last_modified = validators
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.vary.update(('Accept-Language', 'Cookie'))
+    return response
+
+
+def init_app(app: Flask) -> None:
+    """Set up the validators
+
+    Must be called before :py:func:`sipa.page_cache.init_app`, so that
+    conditional requests are answered before looking into the cache.
+    """
+    app.extensions['release'] = release = current_release(app.root_path)
+    logger.debug("Release %s of %s", release.token, release.time)
+    app.before_request(answer_conditional_request)
+    app.after_request(add_validators)
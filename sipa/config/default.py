@@ -18,6 +18,16 @@ NUM_PROXIES = 1
 BACKEND = "pycroft"
 
 FLATPAGES_ROOT = None
+# Directory to keep the parsed and rendered content in, so that workers
+# need not parse it again until the content repository changes.
+# `None` disables the cache.
+CONTENT_CACHE_DIR = None
+# How often (in seconds) each worker checks in a background thread
+# whether the content repository has been updated.  `None` disables
+# checking, and uwsgi is reloaded after an update instead.  Under uwsgi,
+# this needs `enable-threads` and `lazy-apps`; `uwsgi.ini` turns it on
+# with its `content-refresh-interval` option.
+CONTENT_REFRESH_INTERVAL = None
 FLATPAGES_EXTENSION = '.md'
 
 FLATPAGES_MARKDOWN_EXTENSIONS = [
@@ -44,6 +54,8 @@ MAILSERVER_SSL_CA_DATA = None
 MAILSERVER_SSL_CA_FILE = None
 MAILSERVER_USER = None
 MAILSERVER_PASSWORD = None
+# Timeout in seconds for talking to the mailserver
+MAILSERVER_TIMEOUT = 5
 # CONTACT_SENDER_MAIL  # Must be set
 
 # MySQL Helios configuration
@@ -56,6 +68,93 @@ SQL_CONNECTION_RECYCLE = 3600
 # PYCROFT_ENDPOINT  # Must be set
 # PYCROFT_API_KEY  # Must be set
 
+# `(connect, read)` timeouts in seconds for calls to the pycroft API.
+# Keep them well below uwsgi's `harakiri`.
+PYCROFT_TIMEOUT = (1, 3)
+# Overrides of `PYCROFT_TIMEOUT` keyed by endpoint template,
+# e.g. `{'user/{id}': (1, 2), 'user/authenticate': (1, 5)}`
+PYCROFT_ENDPOINT_TIMEOUTS = {}
+# The number of pooled connections per worker.
+# `None` means the number of uwsgi threads per worker.
+# It is doubled with hedging, which may send two calls per thread.
+PYCROFT_POOL_SIZE = None
+PYCROFT_KEEP_ALIVE = True
+# Retries of GET requests after connection errors or 502/503/504 responses.
+# The backoff is drawn uniformly from `[0, PYCROFT_RETRY_BACKOFF * 2**attempt]`.
+PYCROFT_RETRIES = 1
+PYCROFT_RETRY_BACKOFF = 0.1
+# Stop calling the pycroft API for `PYCROFT_CIRCUIT_COOLDOWN` seconds
+# once the given rate of the last `PYCROFT_CIRCUIT_WINDOW_SIZE` calls
+# (but at least `PYCROFT_CIRCUIT_MIN_CALLS`) failed.
+PYCROFT_CIRCUIT_BREAKER_ENABLED = True
+PYCROFT_CIRCUIT_FAILURE_THRESHOLD = 0.5
+PYCROFT_CIRCUIT_WINDOW_SIZE = 20
+PYCROFT_CIRCUIT_MIN_CALLS = 10
+PYCROFT_CIRCUIT_COOLDOWN = 15
+# Send a second request for user lookups which did not finish after
+# the given number of seconds, or "auto" for the observed p95 latency.
+# `None` disables hedging.  At most `PYCROFT_HEDGE_BUDGET` hedges are
+# sent per request.
+PYCROFT_HEDGE_DELAY = None
+PYCROFT_HEDGE_BUDGET = 1
+# "trusted" decodes pycroft responses with `orjson`, if installed,
+# instead of the standard library's json module.
+PYCROFT_DECODE_MODE = "validate"
+# Share of user lookups whose finance and traffic history is validated
+# right away instead of on access, to notice schema changes early.
+PYCROFT_VALIDATION_SAMPLE_RATE = 0.01
+
+# Per-process cache of pycroft user lookups.
+# Entries are invalidated by sipa's own write operations.
+# Set either value to 0 to disable the cache.
+PYCROFT_USER_CACHE_SIZE = 1024
+PYCROFT_USER_CACHE_TTL = 30
+# If pycroft fails, show cached user data up to this many seconds old
+# (read only).  Set to 0 to disable.
+PYCROFT_USER_STALE_MAX_AGE = 3600
+# Per-process cache of ips pycroft does not know a user for
+PYCROFT_IP_MISS_CACHE_SIZE = 4096
+PYCROFT_IP_MISS_CACHE_TTL = 120
+
+# Per-process cache of the display names of logged in users, so that
+# the navigation bar does not need to load the user.
+# Set either value to 0 to disable the cache.
+DISPLAY_NAME_CACHE_SIZE = 1024
+DISPLAY_NAME_CACHE_TTL = 300
+
+# Compress html and json responses of at least `COMPRESS_MIN_SIZE`
+# bytes with gzip, for deployments without a compressing proxy.
+# Static files are compressed ahead of time by
+# `helpers/compress_static.py` instead.
+COMPRESS_RESPONSES = False
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 1
+
+# Append a hash of the content to the urls of static files, and let
+# clients cache them for a year.
+STATIC_ASSET_HASHING = True
+
+# Let the front proxy send the files of `content/documents`,
+# `content/images` and `content/documents_restricted` after sipa has
+# checked the permissions.  `None` sends them from the worker.
+# 'x-accel-redirect' hands them to nginx at
+# `<STATIC_FILES_ACCEL_PREFIX>/<directory>/<filename>`, which must be
+# an `internal` location aliased to the content directory.
+# 'x-sendfile' hands their absolute path to uwsgi, which needs the
+# routing of the `x-sendfile` section in `uwsgi.ini`.  Both answer
+# `Range` requests themselves.
+STATIC_FILES_OFFLOAD = None
+STATIC_FILES_ACCEL_PREFIX = '/_content/'
+
+# Per-process cache of whole pages for visitors without a session, in
+# bytes.  Set to 0 to disable it.
+PAGE_CACHE_SIZE = 0
+
+# Whether the sidebar's traffic module is loaded asynchronously.
+# If disabled, rendering any page from inside a dormitory subnet
+# requires a backend call to look up the user behind the ip.
+TRAFFIC_DATA_DEFERRED = True
+
 # Whether to use the timer
 UWSGI_TIMER_ENABLED = False
 
@@ -63,6 +162,16 @@ UWSGI_TIMER_ENABLED = False
 # It is disabled if nothing provided
 GIT_UPDATE_HOOK_TOKEN = ""
 
+# The time in seconds after which a request should give up calling
+# external services.  If `None`, it is derived from the `harakiri`
+# timeout of uwsgi minus `REQUEST_DEADLINE_MARGIN`, leaving time to
+# render an error page.
+REQUEST_DEADLINE = None
+REQUEST_DEADLINE_MARGIN = 1.5
+
+# Token required to scrape `/metrics`.  Empty disables the endpoint.
+METRICS_TOKEN = ""
+
 # Languages
 LANGUAGES = {
     'de': 'Deutsch',
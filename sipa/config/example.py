@@ -31,6 +31,30 @@
 # The root for the flatpages
 # FLATPAGES_ROOT = None
 
+# Where to cache the parsed and rendered flatpages, keyed by the commit
+# of the content repository.  Must only be writable by sipa.
+# CONTENT_CACHE_DIR = "/var/cache/sipa/content"
+
+# How often (in seconds) each worker looks for a new commit of the
+# content repository.  `None` disables it, and uwsgi is reloaded after
+# an update instead.  `uwsgi.ini` sets it to 10.
+# CONTENT_REFRESH_INTERVAL = 10
+
+# Cache whole pages for visitors without a session, up to this many
+# bytes per worker.  0 disables it.
+# PAGE_CACHE_SIZE = 32 * 1024 * 1024
+
+# Compress html and json responses if no proxy in front does so
+# COMPRESS_RESPONSES = True
+# COMPRESS_MIN_SIZE = 1024
+# COMPRESS_LEVEL = 1
+
+# Let nginx send the documents and images after sipa has checked the
+# permissions, see `example/nginx.conf`.  Use 'x-sendfile' for uwsgi
+# started with the `x-sendfile` section of `uwsgi.ini`.
+# STATIC_FILES_OFFLOAD = 'x-accel-redirect'
+# STATIC_FILES_ACCEL_PREFIX = '/_content/'
+
 # The extension the flatpages have
 # FLATPAGES_EXTENSION = '.md'
 
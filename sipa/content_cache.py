@@ -0,0 +1,210 @@
+"""A persistent cache of the parsed content pages
+
+At startup, every uwsgi worker walks ``FLATPAGES_ROOT``, parses the
+meta data of each page and later renders its markdown on first
+access.  As the content only changes with a commit to the content
+repository, the result of all that is written to ``CONTENT_CACHE_DIR``,
+keyed by that commit and by the markdown configuration.  Workers
+starting later on load the file instead of parsing everything again.
+
+The cache is skipped if the content is not a clean git checkout, as
+there is no commit to identify it then.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from contextlib import suppress
+from dataclasses import dataclass
+from glob import glob
+
+import git
+import markdown
+from flask import has_request_context, request
+from flask_flatpages import FlatPages, Page
+from git.exc import InvalidGitRepositoryError, NoSuchPathError
+from werkzeug.utils import cached_property
+from yaml import YAMLError
+
+from sipa.utils.flatpages_internals import FlatPagesInternals
+
+logger = logging.getLogger(__name__)
+
+#: Increase when the format of the cache file changes
+CACHE_FORMAT = 1
+
+#: The `FlatPages` options which change how pages are parsed or rendered
+RENDER_OPTIONS = (
+    'extension',
+    'encoding',
+    'html_renderer',
+    'markdown_extensions',
+    'extension_configs',
+    'legacy_meta_parser',
+    'case_insensitive',
+)
+
+
+def content_commit(root: str) -> str | None:
+    """The commit checked out in ``root``, if it is a clean checkout"""
+    try:
+        repo = git.Repo(root)
+        if repo.is_dirty(untracked_files=True):
+            return None
+        return repo.head.commit.hexsha
+    except (InvalidGitRepositoryError, NoSuchPathError):
+        return None
+    except ValueError:
+        # no commit yet
+        return None
+
+
+def _describe_option(value) -> str:
+    if callable(value):
+        return f"{value.__module__}.{value.__qualname__}"
+    return repr(value)
+
+
+def render_config_hash(flat_pages: FlatPages) -> str:
+    """A hash of everything besides the content that the pages depend on"""
+    options = [f"{name}={_describe_option(flat_pages.config(name))}"
+               for name in RENDER_OPTIONS]
+    options.append(f"markdown={markdown.__version__}")
+    return hashlib.sha256("\n".join(options).encode()).hexdigest()
+
+
+def _script_root() -> str:
+    # `sipa.utils.link_patch` prefixes absolute links with it
+    return request.script_root.rstrip("/") if has_request_context() else ""
+
+
+@dataclass
+class PageRecord:
+    """What is kept of a :py:class:`Page` in the cache"""
+
+    path: str
+    folder: str
+    raw_meta: str
+    body: str
+    #: ``None`` if the meta data could not be parsed
+    meta: dict | None
+    #: ``None`` if the page could not be rendered
+    html: str | None
+
+
+class CachedPage(Page):
+    """A page restored from the cache
+
+    Its html has been rendered for ``script_root``, so it is only used
+    when served below the same path.
+    """
+
+    def __init__(self, record: PageRecord, html_renderer, script_root: str):
+        super().__init__(record.path, record.raw_meta, record.body,
+                         html_renderer, record.folder)
+        if record.meta is not None:
+            self.__dict__['meta'] = record.meta
+        self._cached_html = record.html
+        self._script_root = script_root
+
+    @cached_property
+    def html(self):
+        if self._cached_html is not None and _script_root() == self._script_root:
+            return self._cached_html
+        return self.html_renderer(self)
+
+
+def _record(page: Page) -> PageRecord:
+    try:
+        meta = page.meta
+    except (YAMLError, ValueError):
+        meta = None
+    try:
+        # don't use `page.html`, it would keep the html of the fake request
+        html = page.html_renderer(page)
+    except Exception:
+        logger.warning("Could not render page %s for the content cache",
+                       page.path, exc_info=True)
+        html = None
+    return PageRecord(path=page.path, folder=page.folder, raw_meta=page._meta,
+                      body=page.body, meta=meta, html=html)
+
+
+class ContentCache:
+    """Stores the pages of a :py:class:`FlatPages` instance in ``directory``
+
+    The files are loaded with :py:mod:`pickle`, so ``directory`` must
+    not be writable by anyone but sipa.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, flat_pages: FlatPages) -> str | None:
+        """The cache file of the current content, if it can be cached"""
+        if (commit := content_commit(flat_pages.root)) is None:
+            return None
+        key = hashlib.sha256(
+            f"{CACHE_FORMAT}:{commit}:{render_config_hash(flat_pages)}".encode()
+        ).hexdigest()[:32]
+        return os.path.join(self.directory, f"pages-{key}.pickle")
+
+    def load(self, flat_pages: FlatPages) -> dict[str, Page] | None:
+        """The cached pages, keyed by path like ``FlatPages`` does."""
+        if (path := self.path(flat_pages)) is None:
+            logger.info("Content is not a clean git checkout, not caching it")
+            return None
+        try:
+            with open(path, 'rb') as f:
+                script_root, records = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning("Could not load content cache %s", path, exc_info=True)
+            return None
+
+        logger.debug("Loaded %d pages from %s", len(records), path)
+        return self._restore(flat_pages, script_root, records)
+
+    def store(self, flat_pages: FlatPages) -> dict[str, Page] | None:
+        """Render all pages and write them to the cache.
+
+        :return: The pages as :py:meth:`load` would return them
+        """
+        if (path := self.path(flat_pages)) is None:
+            return None
+        # render the links like a request to the application root would
+        with flat_pages.app.test_request_context():
+            script_root = _script_root()
+            records = [_record(page) for page in flat_pages]
+
+        os.makedirs(self.directory, exist_ok=True)
+        # other workers may be loading the file at the same time
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((script_root, records), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.warning("Could not write content cache %s", path, exc_info=True)
+            os.unlink(tmp_path)
+        else:
+            logger.info("Stored %d pages in %s", len(records), path)
+            for outdated in glob(os.path.join(self.directory, "pages-*.pickle")):
+                if outdated != path:
+                    with suppress(FileNotFoundError):
+                        os.unlink(outdated)
+
+        # so that this worker need not render the pages again
+        return self._restore(flat_pages, script_root, records)
+
+    @staticmethod
+    def _restore(flat_pages: FlatPages, script_root: str,
+                 records: list[PageRecord]) -> dict[str, Page]:
+        html_renderer = FlatPagesInternals(flat_pages).html_renderer()
+        return {record.path: CachedPage(record, html_renderer, script_root)
+                for record in records}
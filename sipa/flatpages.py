@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 import logging
+import os
+import typing as t
 from dataclasses import dataclass, field
 from functools import cached_property, lru_cache
 from operator import attrgetter
 from os.path import basename, dirname, splitext
+from threading import Event, Lock, Thread
+from typing import NamedTuple
 
 from babel.core import Locale, UnknownLocaleError, negotiate_locale
 from flask import abort, request
@@ -13,6 +17,10 @@ from flask_flatpages import FlatPages, Page
 from yaml.scanner import ScannerError
 
 from sipa.babel import possible_locales, preferred_locales
+from sipa.content_cache import ContentCache
+from sipa.search import SearchIndex, SearchResult
+from sipa.utils.flatpages_internals import FlatPagesInternals
+from sipa.utils.git_utils import get_changed_files, get_head_commit
 
 logger = logging.getLogger(__name__)
 
@@ -201,6 +209,68 @@ def validate_page_meta(page: Page) -> bool:
         return False
 
 
+class LocalizedArticles(NamedTuple):
+    """The articles of a category as shown for certain preferred locales"""
+
+    #: The articles having a date, newest first
+    dated: list[Article]
+    #: The articles by the :py:attr:`~Article.file_basename` of the shown page
+    by_basename: dict[str, Article]
+
+
+class ArticleIndex:
+    """The articles of a category, indexed for each preference of locales
+
+    Which page of an article is shown depends on the locales a request
+    prefers.  Requests whose preferences lead to the same page being
+    shown for every article share one :py:class:`LocalizedArticles`,
+    which is built on first use.
+
+    :param articles: The articles in the order of the category
+    """
+
+    def __init__(self, articles: list[Article]):
+        self._articles = articles
+        #: The distinct locales the articles are available in
+        self._locale_sets = sorted({a.available_locales for a in articles})
+        self._localized: dict[tuple[str | None, ...], LocalizedArticles] = {}
+
+    def localized(self, preferred_locales: t.Sequence[str]) -> LocalizedArticles:
+        """The articles as shown to a request preferring ``preferred_locales``"""
+        preferred = tuple(preferred_locales)
+        key = tuple(cached_negotiate_locale(preferred, locales)
+                    for locales in self._locale_sets)
+        if (localized := self._localized.get(key)) is None:
+            localized = self._localized[key] = self._build(
+                dict(zip(self._locale_sets, key))
+            )
+        return localized
+
+    def _build(self, negotiated: dict[tuple[str, ...], str | None]) -> LocalizedArticles:
+        """Index the articles according to the locale negotiated per set of locales"""
+        shown = []
+        for article in self._articles:
+            locale = negotiated[article.available_locales]
+            page = (article.default_page if locale is None
+                    else article.localized_pages[locale])
+            if page is not None:
+                shown.append((article, page))
+
+        # `sorted` is stable, so articles of the same date keep their order
+        dated = sorted(
+            ((article, page) for article, page in shown if 'date' in page.meta),
+            key=lambda article_page: article_page[1].meta['date'],
+            reverse=True,
+        )
+        by_basename = {}
+        for article, page in shown:
+            by_basename.setdefault(splitext(basename(page.path))[0], article)
+        return LocalizedArticles(
+            dated=[article for article, _ in dated],
+            by_basename=by_basename,
+        )
+
+
 @dataclass
 class Category(Node):
     """The Category class
@@ -221,6 +291,12 @@ class Category(Node):
         """
         return iter(sorted(self._articles.values(), key=attrgetter('rank')))
 
+    @cached_property
+    def article_index(self) -> ArticleIndex:
+        """The articles besides ``index``, indexed by date and file name"""
+        return ArticleIndex([article for article in self._articles.values()
+                             if article.id != 'index'])
+
     def __getattr__(self, attr):
         """An attribute interface.
 
@@ -308,13 +384,22 @@ class CategorizedFlatPages:
     * What is it used for?
 
     - Looping: E.g. In the navbar
-    - get news → get_articles_of_category('news')
+    - get news → get_localized_articles('news')
     - get static page → get_or_404()
     """
     def __init__(self):
         self.flat_pages = FlatPages()
+        self._internals = FlatPagesInternals(self.flat_pages)
         self.root_category = None
+        #: The :py:class:`SearchIndex` of :py:attr:`root_category`
+        self.search_index = SearchIndex()
         self.app = None
+        self.content_cache = None
+        self.default_locale = None
+        #: The commit of the content repository the pages are from
+        self.generation = None
+        self._update_lock = Lock()
+        self._stop_refreshing: Event | None = None
 
     def init_app(self, app):
         assert self.app is None, "Already initialized with an app"
@@ -322,13 +407,14 @@ class CategorizedFlatPages:
         self.app = app
         app.cf_pages = self
         self.flat_pages.init_app(app)
-        babel = get_babel(app)
-        self.root_category = Category(
-            parent=None,
-            id="<root>",
-            default_locale=babel.default_locale,
-        )
-        self._init_categories()
+        self.default_locale = get_babel(app).default_locale
+        if cache_dir := app.config.get('CONTENT_CACHE_DIR'):
+            self.content_cache = ContentCache(cache_dir)
+        self.generation = get_head_commit(self.flat_pages.root)
+        self._init_pages()
+        self._swap_in(self._build_categories())
+        if (interval := app.config.get('CONTENT_REFRESH_INTERVAL')) is not None:
+            self.start_refreshing(interval)
 
     @property
     def categories(self):
@@ -338,9 +424,16 @@ class CategorizedFlatPages:
                       key=attrgetter('rank'))
 
     def get(self, category_id, article_id):
-        category = self.root_category.categories.get(category_id)
-        if category is None:
-            return None
+        """The article ``article_id`` of a category
+
+        :param category_id: The id of the category, or the ids of nested
+            categories joined by ``/``
+        """
+        category = self.root_category
+        for id in category_id.split('/'):
+            category = category.categories.get(id)
+            if category is None:
+                return None
         return category._articles.get(article_id)
 
     def get_category(self, category_id):
@@ -349,16 +442,23 @@ class CategorizedFlatPages:
         return self.root_category.categories.get(category_id)
 
     def get_articles_of_category(self, category_id):
-        """Get the articles of a category
-
-        - ONLY used for fetching news
-        """
+        """Get the articles of a category"""
         category = self.get_category(category_id)
         if category is None:
             return []
         return [article for article in category._articles.values()
                 if article.id != 'index']
 
+    def get_localized_articles(self, category_id) -> LocalizedArticles:
+        """Get the articles of a category as shown to the current request
+
+        - ONLY used for fetching news
+        """
+        category = self.get_category(category_id)
+        if category is None:
+            return LocalizedArticles(dated=[], by_basename={})
+        return category.article_index.localized(preferred_locales())
+
     def get_or_404(self, category_id, article_id):
         """Fetch a static page"""
         page = self.get(category_id, article_id)
@@ -366,18 +466,177 @@ class CategorizedFlatPages:
             abort(404)
         return page
 
-    def _init_categories(self):
+    def _init_pages(self):
+        """Load the pages from the content cache, or fill it."""
+        if self.content_cache is None:
+            return
+        pages = self.content_cache.load(self.flat_pages)
+        if pages is None:
+            pages = self.content_cache.store(self.flat_pages)
+        if pages is not None:
+            self._internals.replace_pages(pages)
+
+    def _build_categories(self) -> Category:
+        """Build a new category tree of the current pages"""
+        root_category = Category(
+            parent=None,
+            id="<root>",
+            default_locale=self.default_locale,
+        )
         # TODO: Store categories, not articles
         for page in self.flat_pages:
             # get category + page name
             # plus, assert that there is nothing more to that.
             components = page.path.split('/')
-            parent = self.root_category
+            parent = root_category
             for category_id in components[:-1]:
                 parent = parent.add_child_category(category_id)
             prefix = components[-1]
             parent.add_article(prefix, page)
 
+        # index the articles for the usual preferences right away
+        for category in root_category.categories.values():
+            try:
+                for locale in possible_locales():
+                    category.article_index.localized((str(locale),))
+            except TypeError:
+                logger.error("Dates of articles in %s are not comparable",
+                             category.id, exc_info=True)
+        return root_category
+
+    def _swap_in(self, root_category: Category):
+        """Replace the category tree and update the search index to it"""
+        search_index = self.search_index.updated(root_category)
+        self.root_category = root_category
+        self.search_index = search_index
+
+    def search(self, query: str, locale: str, limit: int = 20) -> list[SearchResult]:
+        """Search the pages as shown to users of ``locale``"""
+        return self.search_index.search(query, locale, limit)
+
     def reload(self):
+        """Read all pages again and swap in a new category tree"""
+        self.generation = get_head_commit(self.flat_pages.root)
         self.flat_pages.reload()
-        self._init_categories()
+        self._init_pages()
+        self._swap_in(self._build_categories())
+
+    def update(self, generation: str):
+        """Swap in the pages of another commit of the content repository
+
+        Only the files which differ from :py:attr:`generation` are read
+        again.  The category tree is built anew and replaces the old one
+        at once, so requests in other threads never see a mix of both.
+
+        :param generation: The commit which is checked out now
+        """
+        changed = None
+        if self.generation is not None:
+            changed = get_changed_files(self.flat_pages.root,
+                                        self.generation, generation)
+        if changed is None:
+            logger.info("Reloading all pages of content at %s", generation)
+            self.reload()
+            return
+
+        pages = dict(self._internals.pages())
+        for file_path in changed:
+            self._update_page(pages, file_path)
+        self._internals.replace_pages(pages)
+        self._swap_in(self._build_categories())
+        logger.info("Updated content from %s to %s", self.generation, generation,
+                    extra={'data': {'changed_files': changed}})
+        self.generation = generation
+
+    def _update_page(self, pages: dict[str, Page], file_path: str):
+        """Read the page at ``file_path`` again, or remove it if deleted"""
+        extension = next(
+            (ext for ext in self._extensions() if file_path.endswith(ext)), None
+        )
+        if extension is None:
+            return
+        path = file_path[:-len(extension)]
+        if self.flat_pages.config('case_insensitive'):
+            path = path.lower()
+        filename = os.path.join(self.flat_pages.root, file_path)
+        if os.path.isfile(filename):
+            pages[path] = self._internals.read_page(path, filename,
+                                                    dirname(file_path))
+        else:
+            pages.pop(path, None)
+
+    def _extensions(self) -> tuple[str, ...]:
+        extension = self.flat_pages.config('extension')
+        if isinstance(extension, str):
+            return tuple(extension.split(','))
+        return tuple(extension)
+
+    def refresh(self) -> bool:
+        """Swap in the content of a new commit, if there is one
+
+        Other threads keep serving the old pages during the update.
+
+        :return: Whether the pages have been updated
+        """
+        head = get_head_commit(self.flat_pages.root)
+        if head is None or head == self.generation:
+            return False
+        if not self._update_lock.acquire(blocking=False):
+            return False
+        try:
+            if head == self.generation:
+                return False
+            self.update(head)
+        except Exception:
+            logger.exception("Could not update the content to %s", head)
+            return False
+        finally:
+            self._update_lock.release()
+        return True
+
+    def start_refreshing(self, interval: float) -> None:
+        """Look for a new content commit every ``interval`` seconds
+
+        This happens in a daemon thread of this process, so that no
+        request has to wait for it.  Under uwsgi, that requires
+        ``enable-threads`` and ``lazy-apps``, so that every worker
+        starts its own thread.
+        """
+        if self._stop_refreshing is not None:
+            return
+        stop = self._stop_refreshing = Event()
+
+        def refresh_periodically():
+            while not stop.wait(interval):
+                try:
+                    with self.app.app_context():
+                        self.refresh()
+                except Exception:
+                    logger.exception("Could not look for new content")
+
+        Thread(target=refresh_periodically, name="content-refresh",
+               daemon=True).start()
+        logger.debug("Looking for new content every %ss", interval)
+
+    def stop_refreshing(self) -> None:
+        if self._stop_refreshing is not None:
+            self._stop_refreshing.set()
+            self._stop_refreshing = None
+
+    def refresh_all_workers(self) -> None:
+        """Make every worker serve the current content commit
+
+        If the workers look for new content on their own (see
+        :py:meth:`start_refreshing`), only this one is refreshed right
+        away.  Otherwise, uwsgi is reloaded, if sipa runs in it.
+        """
+        if self._stop_refreshing is None:
+            try:
+                import uwsgi
+            except ImportError:
+                pass
+            else:
+                logger.debug("Reloading uwsgi")
+                uwsgi.reload()
+                return
+        self.refresh()
@@ -8,30 +8,41 @@ from datetime import datetime, UTC
 import sentry_sdk
 from flask import g
 from flask_babel import Babel, get_locale
-from flask_login import current_user
+from flask_login import current_user, user_logged_in, user_logged_out
 from werkzeug import Response
 from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_qrcode import QRcode
 from sentry_sdk.integrations.flask import FlaskIntegration
 
+from sipa.assets import init_app as init_assets
 from sipa.babel import (
     possible_locales,
     select_locale,
     setup_request_locale_context,
 )
 from sipa.backends import Backends
-from sipa.base import IntegerConverter, login_manager
+from sipa.base import (
+    IntegerConverter,
+    forget_display_name,
+    login_manager,
+    remember_display_name,
+)
 from sipa.blueprints.usersuite import get_attribute_endpoint
+from sipa.compression import init_app as init_compression
+from sipa.conditional import init_app as init_conditional_requests
 from sipa.defaults import DEFAULT_CONFIG
 from sipa.flatpages import CategorizedFlatPages
 from sipa.forms import render_links
+from sipa.login_manager import DisplayNameCache
 from sipa.model import AVAILABLE_DATASOURCES
-from sipa.model.misc import should_display_traffic_data
+from sipa.model.misc import should_display_traffic_data, may_display_traffic_data
+from sipa.page_cache import init_app as init_page_cache
 from sipa.session import SeparateLocaleCookieSessionInterface
-from sipa.utils import url_self
+from sipa.utils import deadline, url_self
 from sipa.utils.babel_utils import get_weekday
 from sipa.utils.csp import ensure_items, NonceInfo
 from sipa.utils.git_utils import init_repo, update_repo
+from sipa.utils.metrics import MetricsRegistry
 from sipa.utils.graph_utils import generate_traffic_chart, provide_render_function
 
 logger = logging.getLogger(__name__)
@@ -53,22 +64,37 @@ def init_app(app, **kwargs):
     init_logging(app)
     init_env_and_config(app)
     logger.debug('Initializing app')
+    deadline.init_app(app)
     login_manager.init_app(app, add_context_processor=False)
+    app.extensions['display_names'] = DisplayNameCache(
+        maxsize=app.config['DISPLAY_NAME_CACHE_SIZE'],
+        ttl=app.config['DISPLAY_NAME_CACHE_TTL'],
+    )
+    user_logged_in.connect(remember_display_name, app)
+    user_logged_out.connect(forget_display_name, app)
     babel = Babel()
     babel.init_app(app, locale_selector=select_locale)
     app.before_request(setup_request_locale_context)
     app.after_request(ensure_csp)
     app.session_interface = SeparateLocaleCookieSessionInterface()
+    app.extensions['metrics'] = MetricsRegistry()
     cf_pages = CategorizedFlatPages()
-    cf_pages.init_app(app)
+    # let the first worker fill the content cache, the others load it
+    with maybe_uwsgi_lock():
+        cf_pages.init_app(app)
     backends = Backends(available_datasources=AVAILABLE_DATASOURCES)
     backends.init_app(app)
+    init_compression(app)
+    init_assets(app)
+    init_conditional_requests(app)
+    init_page_cache(app)
     QRcode(app)
 
     app.url_map.converters['int'] = IntegerConverter
 
     from sipa.blueprints import bp_features, bp_usersuite, \
-        bp_pages, bp_documents, bp_news, bp_generic, bp_hooks, bp_register
+        bp_pages, bp_documents, bp_news, bp_generic, bp_hooks, bp_register, \
+        bp_metrics, bp_search
 
     logger.debug('Registering blueprints')
     app.register_blueprint(bp_generic)
@@ -79,6 +105,8 @@ def init_app(app, **kwargs):
     app.register_blueprint(bp_news)
     app.register_blueprint(bp_hooks)
     app.register_blueprint(bp_register)
+    app.register_blueprint(bp_metrics)
+    app.register_blueprint(bp_search)
 
     logger.debug('Registering Jinja globals')
     form_label_width = 4
@@ -91,6 +119,7 @@ def init_app(app, **kwargs):
         possible_locales=possible_locales,
         get_attribute_endpoint=get_attribute_endpoint,
         should_display_traffic_data=should_display_traffic_data,
+        may_display_traffic_data=may_display_traffic_data,
         traffic_chart=provide_render_function(generate_traffic_chart),
         current_datasource=lambda: backends.datasource,
         form_label_width_class=f"col-sm-{form_label_width}",
@@ -192,12 +221,11 @@ def try_register_uwsgi_timer(app):
             logger.debug("Updating git repository at %s", flatpages_root)
             hasToReload = update_repo(flatpages_root)
             if hasToReload:
-                logger.debug("Reloading flatpages and uwsgi", extra={'data': {
-                    'uwsgi.numproc': uwsgi.numproc,
-                    'uwsgi.opt': uwsgi.opt,
-                    'uwsgi.applications': uwsgi.applications,
+                logger.debug("Updating flatpages", extra={'data': {
+                    'uwsgi.worker_id': uwsgi.worker_id(),
                 }})
-                uwsgi.reload()
+                with app.app_context():
+                    app.cf_pages.refresh_all_workers()
 
         logger.debug("Registered repo update to uwsgi signal")
 
@@ -235,6 +263,9 @@ def init_logging(app):
 
 
 def ensure_csp(r: Response) -> Response:
+    if r.status_code == 304:
+        # there is no document the policy could apply to
+        return r
     apply_nonces_to_csp(r)
 
     csp = r.content_security_policy
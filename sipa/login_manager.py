@@ -1,9 +1,130 @@
+import time
+from collections.abc import Callable
 from functools import wraps
+from threading import Lock
+from typing import Any
 
-from flask import request, Blueprint
+from cachetools import TTLCache
+from flask import request, current_app, Blueprint
 from flask_babel import gettext
 from flask_login import LoginManager
 
+#: The session key under which older versions kept the display name
+LEGACY_DISPLAY_NAME_KEY = 'user_display_name'
+
+
+class DisplayNameCache:
+    """A thread safe TTL cache of display names keyed by user id
+
+    It lets the navigation bar show the logged in user's name without
+    loading the user.  The names are kept on the server, because the
+    session cookie is only signed, not encrypted.  If ``maxsize`` or
+    ``ttl`` is zero, the cache is disabled.
+
+    :param maxsize: The maximum number of cached names
+    :param ttl: The time in seconds a name is remembered
+    :param timer: The clock used for expiry
+    """
+
+    def __init__(self, maxsize: int, ttl: float,
+                 timer: Callable[[], float] = time.monotonic):
+        self.enabled = maxsize > 0 and ttl > 0
+        self._cache = (TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+                       if self.enabled else None)
+        self._lock = Lock()
+
+    def get(self, user_id: str) -> str | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._cache.get(str(user_id))
+
+    def set(self, user_id: str, display_name: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._cache[str(user_id)] = display_name
+
+    def invalidate(self, user_id: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._cache.pop(str(user_id), None)
+
+
+class LazyUser:
+    """A logged in user that is loaded on first access of its data
+
+    :meth:`get_id` and the authentication flags are answered from the
+    session and :attr:`display_name` from the :py:class:`DisplayNameCache`,
+    so pages that merely show who is logged in do not query the backend.  Any other attribute is taken from the user
+    returned by ``loader``, which is called at most once.
+
+    :param user_id: The id stored in the session
+    :param loader: Loads the actual user for ``user_id``
+    """
+
+    _own_attributes = frozenset({'_user_id', '_loader', '_user'})
+
+    def __init__(self, user_id: str, loader: Callable[[str], Any]):
+        self._user_id = user_id
+        self._loader = loader
+        self._user = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._user is not None
+
+    def _load(self):
+        if self._user is None:
+            self._user = self._loader(self._user_id)
+        return self._user
+
+    def _loaded_flag(self, name: str, default: bool) -> bool:
+        # the loader may find that the user does not exist anymore
+        return default if self._user is None else getattr(self._user, name)
+
+    @property
+    def is_authenticated(self) -> bool:
+        return self._loaded_flag('is_authenticated', True)
+
+    @property
+    def is_active(self) -> bool:
+        return self._loaded_flag('is_active', True)
+
+    @property
+    def is_anonymous(self) -> bool:
+        return self._loaded_flag('is_anonymous', False)
+
+    def get_id(self) -> str:
+        return self._user_id
+
+    @property
+    def display_name(self) -> str:
+        display_names: DisplayNameCache = current_app.extensions['display_names']
+        if (name := display_names.get(self._user_id)) is None:
+            name = self._load().display_name
+            display_names.set(self._user_id, name)
+        return name
+
+    def __getattr__(self, name):
+        # only called for attributes not defined on the proxy itself
+        if name in self._own_attributes or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyUser):
+            other = other._load()
+        return self._load() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        if self._user is None:
+            return f"<LazyUser {self._user_id!r} (not loaded)>"
+        return f"<LazyUser {self._user!r}>"
+
 
 class SipaLoginManager(LoginManager):
     def __init__(self, *a, **kw):
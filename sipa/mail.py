@@ -24,6 +24,7 @@ from flask_login import current_user
 
 from sipa.backends.extension import backends
 from sipa.model.user import BaseUser
+from sipa.utils.deadline import DeadlineExceeded, deadline_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -106,12 +107,22 @@ def send_mail(author: str, recipient: str, subject: str, message: str,
             })
             return False
 
+    try:
+        timeout = deadline_timeout(current_app.config['MAILSERVER_TIMEOUT'],
+                                   "sending mail")
+    except DeadlineExceeded:
+        logger.error('Not sending mail, no time left in this request', extra={
+            'tags': {'from': author, 'to': recipient},
+        })
+        return False
+
     try:
         if use_ssl:
             smtp = smtplib.SMTP_SSL(host=mailserver_host, port=mailserver_port,
-                                    context=ssl_context)
+                                    context=ssl_context, timeout=timeout)
         else:
-            smtp = smtplib.SMTP(host=mailserver_host, port=mailserver_port)
+            smtp = smtplib.SMTP(host=mailserver_host, port=mailserver_port,
+                                timeout=timeout)
 
         if use_starttls:
             smtp.starttls(context=ssl_context)
@@ -17,3 +17,14 @@ def has_connection(user):
 def should_display_traffic_data():
     return has_connection(current_user) or has_connection(
         backends.user_from_ip(request.remote_addr))
+
+
+def may_display_traffic_data():
+    """Whether :py:func:`should_display_traffic_data` can be true at all.
+
+    In contrast to the former, this does not look up the user behind
+    the request's ip, and thus does not cause a backend call for
+    anonymous visitors.
+    """
+    return (current_user.is_authenticated
+            or backends.dormitory_from_ip(request.remote_addr) is not None)
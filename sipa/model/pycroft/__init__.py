@@ -3,26 +3,151 @@ from ipaddress import IPv4Network
 from sipa.backends import DataSource, Dormitory
 from sipa.backends.exceptions import InvalidConfiguration
 from sipa.backends.datasource import SubnetCollection
-from . import user, api, userdb
+from sipa.utils.circuit_breaker import CircuitBreaker, CircuitState
+from sipa.utils.hedging import Hedger
+from . import user, api, userdb, cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def uwsgi_thread_count() -> int | None:
+    """The number of threads per uwsgi worker, if running in uwsgi"""
+    try:
+        import uwsgi
+    except ImportError:
+        return None
+    threads = uwsgi.opt.get('threads')
+    return int(threads) if threads else 1
+
+
+def init_circuit_breaker(app) -> CircuitBreaker | None:
+    if not app.config['PYCROFT_CIRCUIT_BREAKER_ENABLED']:
+        return None
+    return CircuitBreaker(
+        failure_threshold=app.config['PYCROFT_CIRCUIT_FAILURE_THRESHOLD'],
+        window_size=app.config['PYCROFT_CIRCUIT_WINDOW_SIZE'],
+        min_calls=app.config['PYCROFT_CIRCUIT_MIN_CALLS'],
+        cooldown=app.config['PYCROFT_CIRCUIT_COOLDOWN'],
+        name="pycroft",
+    )
+
+
+def init_hedger(app, max_workers: int) -> Hedger | None:
+    if app.config['PYCROFT_HEDGE_DELAY'] is None:
+        return None
+    return Hedger(
+        delay=app.config['PYCROFT_HEDGE_DELAY'],
+        budget=app.config['PYCROFT_HEDGE_BUDGET'],
+        # a hedged call may occupy two workers
+        max_workers=2 * max_workers,
+    )
+
+
+def json_loads(app):
+    """The faster json parser to use in trusted decode mode, if available"""
+    if app.config['PYCROFT_DECODE_MODE'] != 'trusted' or orjson is None:
+        return None
+    return orjson.loads
 
 
 def init_pycroft_api(app):
+    threads = app.config['PYCROFT_POOL_SIZE'] or uwsgi_thread_count() or 10
+    hedger = init_hedger(app, threads)
+    # with hedging, the calls are made from the hedger's threads
+    pool_size = hedger.max_workers if hedger is not None else threads
     try:
         app.extensions['pycroft_api'] = api.PycroftApi(
             endpoint=app.config['PYCROFT_ENDPOINT'],
             api_key=app.config['PYCROFT_API_KEY'],
+            timeout=app.config['PYCROFT_TIMEOUT'],
+            endpoint_timeouts=app.config['PYCROFT_ENDPOINT_TIMEOUTS'],
+            pool_maxsize=pool_size,
+            keep_alive=app.config['PYCROFT_KEEP_ALIVE'],
+            retries=app.config['PYCROFT_RETRIES'],
+            retry_backoff=app.config['PYCROFT_RETRY_BACKOFF'],
+            circuit_breaker=init_circuit_breaker(app),
+            hedger=hedger,
+            metrics=app.extensions.get('metrics'),
+            json_loads=json_loads(app),
         )
     except KeyError as exception:
         raise InvalidConfiguration(*exception.args) from exception
 
 
+def init_user_cache(app):
+    app.extensions['pycroft_user_cache'] = cache.UserDataCache(
+        maxsize=app.config['PYCROFT_USER_CACHE_SIZE'],
+        ttl=app.config['PYCROFT_USER_CACHE_TTL'],
+        max_staleness=app.config['PYCROFT_USER_STALE_MAX_AGE'],
+    )
+    app.extensions['pycroft_ip_miss_cache'] = cache.IpMissCache(
+        maxsize=app.config['PYCROFT_IP_MISS_CACHE_SIZE'],
+        ttl=app.config['PYCROFT_IP_MISS_CACHE_TTL'],
+    )
+
+
 def init_userdb(app):
     userdb.register_userdb_extension(app)
 
 
+def init_metrics(app):
+    """Expose the state of the pycroft client as gauges and counters"""
+    if (registry := app.extensions.get('metrics')) is None:
+        return
+    pycroft_api: api.PycroftApi = app.extensions['pycroft_api']
+    user_cache: cache.UserDataCache = app.extensions['pycroft_user_cache']
+    ip_miss_cache: cache.IpMissCache = app.extensions['pycroft_ip_miss_cache']
+
+    def pool_stats():
+        return {
+            (host, stat): value
+            for host, stats in pycroft_api.pool_stats().items()
+            for stat, value in stats.items()
+        }
+
+    def client_events():
+        events = dict(pycroft_api.counters)
+        events['coalesced'] = pycroft_api.coalesced_calls
+        if (hedger := pycroft_api.hedger) is not None:
+            events['hedges_sent'] = hedger.hedges_sent
+            events['hedges_won'] = hedger.hedges_won
+        return {(event,): count for event, count in events.items()}
+
+    def circuit_state():
+        if (breaker := pycroft_api.circuit_breaker) is None:
+            return {}
+        return {(state.value,): int(breaker.state is state) for state in CircuitState}
+
+    registry.gauge('sipa_pycroft_pool', "Connection pool statistics",
+                   ['host', 'stat'], collect=pool_stats)
+    registry.counter('sipa_pycroft_client_events',
+                   "Retries, timeouts and other events of the pycroft client",
+                   ['event'], collect=client_events)
+    registry.gauge('sipa_pycroft_circuit_state',
+                   "Whether the pycroft circuit breaker is in the given state",
+                   ['state'], collect=circuit_state)
+    registry.gauge('sipa_pycroft_user_cache_entries',
+                   "Number of cached pycroft users",
+                   collect=lambda: {(): len(user_cache)})
+    registry.counter('sipa_pycroft_ip_miss_cache_lookups',
+                   "Lookups by ip answered from (hit) or passed on by (miss)"
+                   " the cache of ips without a user",
+                   ['result'],
+                   collect=lambda: {('hit',): ip_miss_cache.hits,
+                                    ('miss',): ip_miss_cache.misses})
+    registry.gauge('sipa_pycroft_ip_miss_cache_entries',
+                   "Number of cached ips without a user",
+                   collect=lambda: {(): len(ip_miss_cache)})
+
+
 def init_app(app):
     init_pycroft_api(app)
+    init_user_cache(app)
     init_userdb(app)
+    init_metrics(app)
 
 
 datasource = DataSource(
@@ -1,6 +1,10 @@
 import logging
+import random
+import time
 import typing as t
+from collections import Counter
 from collections.abc import Callable
+from copy import deepcopy
 from dataclasses import dataclass
 from datetime import date
 from functools import partial
@@ -8,14 +12,34 @@ from typing import Any
 
 import requests
 import requests.auth
-from requests import ConnectionError, HTTPError
+from requests import ConnectionError, HTTPError, Timeout
+from requests.adapters import HTTPAdapter
 
 from sipa.backends.exceptions import InvalidConfiguration
 from sipa.utils import dataclass_from_dict
-from .exc import PycroftBackendError
+from sipa.utils.circuit_breaker import CircuitBreaker
+from sipa.utils.deadline import Deadline, DeadlineExceeded, current_deadline
+from sipa.utils.hedging import Hedger
+from sipa.utils.metrics import SIZE_BUCKETS, MetricsRegistry
+from sipa.utils.single_flight import SingleFlight, WaitTimeout
+from .exc import PycroftBackendError, PycroftCircuitOpenError, PycroftUnavailableError
 
 logger = logging.getLogger(__name__)
 
+#: A ``(connect, read)`` timeout in seconds
+TimeoutConfig = tuple[float, float]
+
+#: Statuses indicating that the pycroft API is temporarily unavailable
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+
+def endpoint_template(url: str) -> str:
+    """Replace the ids in an API url by a placeholder.
+
+    Example: ``user/42/change-mac/7`` → ``user/{id}/change-mac/{id}``
+    """
+    return "/".join("{id}" if part.isdigit() else part for part in url.split("/"))
+
 
 class PycroftApiError(RuntimeError):
     def __init__(self, code: str, message: str, *a, **kw):
@@ -43,6 +67,31 @@ class MatchPersonResult:
         return dataclass_from_dict(MatchPersonResult, json)
 
 
+class PycroftApiMetrics:
+    """The metrics recorded for calls to the pycroft API
+
+    All of them are labeled by the :py:func:`endpoint_template`.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.requests = registry.histogram(
+            'sipa_pycroft_request_duration_seconds',
+            "Duration of requests to the pycroft API, including failed attempts",
+            ['endpoint', 'method', 'status'],
+        )
+        self.response_size = registry.histogram(
+            'sipa_pycroft_response_size_bytes',
+            "Size of pycroft API response bodies",
+            ['endpoint', 'method'],
+            buckets=SIZE_BUCKETS,
+        )
+        self.decode = registry.histogram(
+            'sipa_pycroft_json_decode_seconds',
+            "Time spent decoding pycroft API responses",
+            ['endpoint', 'method'],
+        )
+
+
 class PycroftAuthorization(requests.auth.AuthBase):
     def __init__(self, api_key: str):
         super().__init__()
@@ -54,18 +103,102 @@ class PycroftAuthorization(requests.auth.AuthBase):
 
 
 class PycroftApi:
-    def __init__(self, endpoint: str, api_key: str):
+    """Client of the pycroft API
+
+    :param endpoint: The base url of the API, ending with a ``/``
+    :param api_key: The key to authenticate against the API
+    :param timeout: The default ``(connect, read)`` timeout
+    :param endpoint_timeouts: Timeouts overriding ``timeout`` for
+        certain endpoints, keyed by :py:func:`endpoint_template`.
+    :param pool_maxsize: How many connections to keep open.  This
+        should match the number of threads making calls, i.e. the
+        threads per worker or the ``max_workers`` of ``hedger``.
+    :param keep_alive: Whether to reuse connections
+    :param retries: How often to retry idempotent requests after a
+        connection error or a 502/503/504 response.
+    :param retry_backoff: The base of the exponential backoff between
+        retries in seconds.  The actual delay is drawn uniformly from
+        ``[0, retry_backoff * 2**attempt]``.
+    :param circuit_breaker: If given, calls fail fast without
+        contacting the API while the circuit is open.
+    :param hedger: If given, slow lookups of users are sent a second
+        time, see :py:class:`~sipa.utils.hedging.Hedger`.
+    :param metrics: The registry to record request metrics in
+    :param json_loads: Decodes response bodies instead of
+        :py:meth:`requests.Response.json`, e.g. a faster parser.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: str,
+        timeout: TimeoutConfig = (1, 3),
+        endpoint_timeouts: dict[str, TimeoutConfig] | None = None,
+        pool_maxsize: int = 10,
+        keep_alive: bool = True,
+        retries: int = 1,
+        retry_backoff: float = 0.1,
+        circuit_breaker: CircuitBreaker | None = None,
+        hedger: Hedger | None = None,
+        metrics: MetricsRegistry | None = None,
+        json_loads: Callable[[bytes], Any] | None = None,
+    ):
         if not endpoint.endswith("/"):
             raise InvalidConfiguration("API endpoint must end with a '/'")
         self._endpoint = endpoint
+        self.timeout = tuple(timeout)
+        self.endpoint_timeouts = {
+            template: tuple(t) for template, t in (endpoint_timeouts or {}).items()
+        }
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.circuit_breaker = circuit_breaker
+        self.hedger = hedger
+        self._get_flight = SingleFlight()
+        self.metrics = PycroftApiMetrics(metrics or MetricsRegistry())
+        self.json_loads = json_loads
+        #: Counts of retries, timeouts and connection errors
+        self.counters: Counter[str] = Counter()
+
         self.session = requests.Session()
         self.session.auth = PycroftAuthorization(api_key)
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount(endpoint, self._adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def timeout_for(self, url: str) -> TimeoutConfig:
+        """The ``(connect, read)`` timeout to use for ``url``"""
+        return self.endpoint_timeouts.get(endpoint_template(url), self.timeout)
+
+    def pool_stats(self) -> dict[str, dict[str, int]]:
+        """Statistics about the connection pools, keyed by host"""
+        pools = self._adapter.poolmanager.pools
+        stats = {}
+        for key in pools.keys():
+            if (pool := pools.get(key)) is None:
+                continue
+            # the queue is padded with `None` for connections not yet opened
+            idle = sum(conn is not None for conn in list(pool.pool.queue))
+            stats[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                'maxsize': pool.pool.maxsize,
+                'idle_connections': idle,
+                'connections_created': pool.num_connections,
+                'requests': pool.num_requests,
+            }
+        return stats
+
+    @property
+    def coalesced_calls(self) -> int:
+        """How many read-only GET requests shared the call of another thread"""
+        return self._get_flight.coalesced
 
     def get_user(self, username: str) -> tuple[int, dict]:
-        return self.get(f'user/{username}')
+        return self.get(f'user/{username}', hedge=True, read_only=True)
 
     def get_user_from_ip(self, ip):
-        return self.get("user/from-ip", params={"ip": ip})
+        return self.get("user/from-ip", params={"ip": ip}, hedge=True,
+                        read_only=True)
 
     def authenticate(self, username, password):
         return self.post('user/authenticate',
@@ -91,7 +224,7 @@ class PycroftApi:
 
     def estimate_balance_at_end_of_membership(self, user_id, end_date):
         return self.get(f"user/{user_id}/terminate-membership",
-                        params={'end_date': end_date})
+                        params={'end_date': end_date}, hedge=True, read_only=True)
 
     def terminate_membership(self, user_id, end_date):
         return self.post(f"user/{user_id}/terminate-membership",
@@ -144,7 +277,7 @@ class PycroftApi:
         if previous_dorm is not None:
             params['previous_dorm'] = previous_dorm
 
-        status, result = self.get("register", params)
+        status, result = self.get("register", params, read_only=True)
 
         if status != 200:
             raise PycroftApiError(result['code'], result['message'])
@@ -193,6 +326,7 @@ class PycroftApi:
             return
 
     def resend_confirm_email(self, user_id: int) -> bool:
+        # sends a mail, so neither `read_only` nor hedged
         status, _ = self.get("register/confirm", params={'user_id': user_id})
         return status == 200
 
@@ -219,37 +353,175 @@ class PycroftApi:
 
         return result
 
-    def get(self, url: t.LiteralString, params=None):
-        request_function = partial(self.session.get, params=params or {})
-        return self._do_api_call(request_function, url)
+    def get(self, url: t.LiteralString, params=None, hedge: bool = False,
+            read_only: bool = False):
+        """Perform a GET request.
+
+        :param hedge: Whether to send a duplicate request if the first
+            one is slow.  Requires a ``hedger`` and ``read_only``.
+        :param read_only: Whether the request has no side effects.
+            Only those are retried, and concurrent identical ones of
+            the same process share a single call to the API.  Some GET
+            endpoints of pycroft do have side effects, e.g. sending a
+            mail.
+        """
+        params = params or {}
+        request_function = partial(self.session.get, params=params)
+        # looked up here, as `fetch` may run in another thread
+        deadline = current_deadline()
+
+        def fetch():
+            return self._do_api_call(request_function, url, 'GET',
+                                     idempotent=read_only, deadline=deadline)
+
+        if not read_only:
+            return fetch()
+        if hedge and self.hedger is not None:
+            fetch = partial(self.hedger.call, endpoint_template(url), fetch)
+
+        key = (url, tuple(sorted(params.items())))
+        timeout = deadline.remaining() if deadline is not None else None
+        try:
+            return self._get_flight.do(key, fetch, share=deepcopy, timeout=timeout)
+        except WaitTimeout as e:
+            raise DeadlineExceeded(f"Deadline exceeded waiting for {url}") from e
+        except DeadlineExceeded:
+            if deadline is None or deadline.expired:
+                raise
+            # the call we waited for ran out of its caller's time, not ours
+            return fetch()
 
     def post(self, url: t.LiteralString, data=None):
         request_function = partial(self.session.post, data=data or {})
-        return self._do_api_call(request_function, url)
+        return self._do_api_call(request_function, url, 'POST',
+                                 deadline=current_deadline())
 
     def delete(self, url: t.LiteralString, data=None):
         request_function = partial(self.session.delete, data=data or {})
-        return self._do_api_call(request_function, url)
+        return self._do_api_call(request_function, url, 'DELETE',
+                                 deadline=current_deadline())
 
     def patch(self, url: t.LiteralString, data=None):
         request_function = partial(self.session.patch, data=data or {})
-        return self._do_api_call(request_function, url)
+        return self._do_api_call(request_function, url, 'PATCH',
+                                 deadline=current_deadline())
 
     def _do_api_call(
-        self, request_function: Callable, url: t.LiteralString
+        self, request_function: Callable, url: t.LiteralString, method: str,
+        idempotent: bool = False, deadline: Deadline | None = None,
     ) -> tuple[int, Any]:
+        """Perform a request and return its status and decoded json.
+
+        If the circuit breaker is open, fail without contacting the API.
+        Only :py:class:`PycroftUnavailableError` s count as failures of
+        the API; running out of the request's own time does not.
+
+        :param deadline: If given, timeouts are shrunk to the time left.
+        :raises PycroftBackendError: if the API is unreachable or
+            returned an unexpected status.
+        :raises DeadlineExceeded: if the deadline passed before the
+            request could be sent.
+        """
+        if deadline is not None:
+            deadline.check(f"calling {endpoint_template(url)}")
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return self._request(request_function, url, method, idempotent, deadline)
+
+        if not breaker.allow_request():
+            self.counters['short_circuited'] += 1
+            raise PycroftCircuitOpenError("Pycroft API considered unavailable")
         try:
-            response = request_function(self._endpoint + url)
-        except ConnectionError as e:
-            logger.error("Caught a ConnectionError when accessing Pycroft API",
-                         extra={'data': {'endpoint': self._endpoint + url}})
-            raise PycroftBackendError("Pycroft API unreachable") from e
+            result = self._request(request_function, url, method, idempotent, deadline)
+        except PycroftUnavailableError:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+    def _request(
+        self, request_function: Callable, url: t.LiteralString, method: str,
+        idempotent: bool, deadline: Deadline | None,
+    ) -> tuple[int, Any]:
+        """Perform a request and return its status and decoded json.
+
+        Idempotent requests are retried on connection errors and
+        502/503/504 responses.  Read timeouts are not retried, as
+        they most likely mean that pycroft is overloaded.
+
+        :raises PycroftUnavailableError: if the API is unreachable, timed
+            out without the deadline shrinking the timeout, or returned
+            a 5xx status.
+        :raises PycroftBackendError: if the API returned another
+            unexpected status, or timed out after the deadline shrunk
+            the timeout.
+        """
+        template = endpoint_template(url)
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            configured = timeout = self.timeout_for(url)
+            if deadline is not None:
+                what = f"calling {template}"
+                timeout = tuple(deadline.timeout(t, what) for t in configured)
+            start = time.perf_counter()
+            try:
+                response = request_function(self._endpoint + url, timeout=timeout)
+            except Timeout as e:
+                self._observe_request(template, method, 'timeout', start)
+                self.counters['timeouts'] += 1
+                # a connect timeout is a `ConnectionError` as well
+                if timeout != configured:
+                    # the API might just have been slower than our time left
+                    logger.warning("Pycroft API did not answer in the time left",
+                                   extra={'data': {'endpoint': self._endpoint + url}})
+                    raise PycroftBackendError("Pycroft API timed out"
+                                              " at the request's deadline") from e
+                if not isinstance(e, ConnectionError) or last_attempt:
+                    logger.error("Timeout when accessing Pycroft API",
+                                 extra={'data': {'endpoint': self._endpoint + url}})
+                    raise PycroftUnavailableError("Pycroft API timed out") from e
+            except ConnectionError as e:
+                self._observe_request(template, method, 'connection_error', start)
+                self.counters['connection_errors'] += 1
+                if last_attempt:
+                    logger.error("Caught a ConnectionError when accessing Pycroft API",
+                                 extra={'data': {'endpoint': self._endpoint + url}})
+                    raise PycroftUnavailableError("Pycroft API unreachable") from e
+            else:
+                self._observe_request(template, method,
+                                      str(response.status_code), start)
+                if last_attempt or response.status_code not in RETRY_STATUSES:
+                    break
+
+            self.counters['retries'] += 1
+            time.sleep(random.uniform(0, self.retry_backoff * 2 ** attempt))
 
         if response.status_code not in [200, 400, 401, 403, 404, 412, 422]:
             try:
                 response.raise_for_status()
             except HTTPError as e:
-                raise PycroftBackendError(f"Pycroft API returned status"
-                                          f" {response.status_code}") from e
-
-        return response.status_code, response.json()
+                error = (PycroftUnavailableError if response.status_code >= 500
+                         else PycroftBackendError)
+                raise error(f"Pycroft API returned status"
+                            f" {response.status_code}") from e
+
+        self.metrics.response_size.observe(len(response.content),
+                                           endpoint=template, method=method)
+        start = time.perf_counter()
+        if self.json_loads is None:
+            result = response.json()
+        else:
+            result = self.json_loads(response.content)
+        self.metrics.decode.observe(time.perf_counter() - start,
+                                    endpoint=template, method=method)
+        return response.status_code, result
+
+    def _observe_request(self, template: str, method: str, status: str,
+                         start: float) -> None:
+        self.metrics.requests.observe(time.perf_counter() - start,
+                                      endpoint=template, method=method,
+                                      status=status)
@@ -0,0 +1,165 @@
+"""Per-process caching of pycroft user lookups
+
+Every authenticated request loads its user via :py:meth:`User.get
+<sipa.model.pycroft.user.User.get>`, which costs a round-trip to the
+pycroft API and a full validation of the response.  Since the user's
+data rarely changes between two page views, the validated
+:py:class:`~sipa.model.pycroft.schema.UserData` is kept in a bounded
+TTL/LRU cache for a short while.
+
+Additionally, the data is kept for a longer time to be shown instead
+if pycroft cannot be reached (“stale-if-error”).
+"""
+import logging
+import time
+import typing as t
+from collections.abc import Callable
+from datetime import UTC, datetime
+from threading import Lock
+
+from cachetools import TTLCache
+
+from .schema import UserData
+
+logger = logging.getLogger(__name__)
+
+
+class StaleUserData(t.NamedTuple):
+    user_data: UserData
+    #: When the data has been fetched from pycroft
+    fetched_at: datetime
+
+
+class UserDataCache:
+    """A thread safe TTL cache of validated :py:class:`UserData` keyed by user id
+
+    If ``maxsize`` or ``ttl`` is zero, the cache is disabled and every
+    lookup misses.  The same holds for stale lookups and
+    ``max_staleness``.
+
+    :param maxsize: The maximum number of cached users.  If exceeded,
+        the least recently used entry is evicted.
+    :param ttl: The time in seconds an entry stays valid.
+    :param max_staleness: The time in seconds an entry may be used
+        if the user cannot be fetched.
+    :param timer: The clock used for expiry
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_staleness: float = 0,
+                 timer: Callable[[], float] = time.monotonic):
+        self.enabled = maxsize > 0 and ttl > 0
+        self._cache = (TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+                       if self.enabled else None)
+        self.stale_enabled = maxsize > 0 and max_staleness > 0
+        self._stale = (TTLCache(maxsize=maxsize, ttl=max_staleness, timer=timer)
+                       if self.stale_enabled else None)
+        self._lock = Lock()
+
+    def get(self, user_id: int | str) -> UserData | None:
+        """Return a copy of the cached user data or ``None``.
+
+        A (shallow) copy is returned so that local modifications by a
+        :py:class:`User` object do not leak into the cache.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            user_data = self._cache.get(str(user_id))
+        if user_data is None:
+            return None
+        return user_data.model_copy()
+
+    def get_stale(self, user_id: int | str) -> StaleUserData | None:
+        """Return a copy of the last known user data, however old.
+
+        Entries older than ``max_staleness`` are not returned.
+        """
+        if not self.stale_enabled:
+            return None
+        with self._lock:
+            stale = self._stale.get(str(user_id))
+        if stale is None:
+            return None
+        return stale._replace(user_data=stale.user_data.model_copy())
+
+    def set(self, user_data: UserData) -> None:
+        key = str(user_data.id)
+        with self._lock:
+            if self.enabled:
+                self._cache[key] = user_data
+            if self.stale_enabled:
+                self._stale[key] = StaleUserData(user_data, datetime.now(UTC))
+
+    def invalidate(self, user_id: int | str) -> None:
+        logger.debug("Invalidating cached user data of user %s", user_id)
+        with self._lock:
+            if self.enabled:
+                self._cache.pop(str(user_id), None)
+            if self.stale_enabled:
+                self._stale.pop(str(user_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            if self.enabled:
+                self._cache.clear()
+            if self.stale_enabled:
+                self._stale.clear()
+
+    def __len__(self):
+        if not self.enabled:
+            return 0
+        with self._lock:
+            return len(self._cache)
+
+
+class IpMissCache:
+    """A thread safe TTL cache of ips pycroft does not know a user for
+
+    Guest devices and monitoring probes inside the dormitories' subnets
+    would otherwise cause a lookup on every request.  If ``maxsize`` or
+    ``ttl`` is zero, the cache is disabled.
+
+    :param maxsize: The maximum number of cached ips
+    :param ttl: The time in seconds an ip is remembered
+    :param timer: The clock used for expiry
+    """
+
+    def __init__(self, maxsize: int, ttl: float,
+                 timer: Callable[[], float] = time.monotonic):
+        self.enabled = maxsize > 0 and ttl > 0
+        self._cache = (TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+                       if self.enabled else None)
+        self._lock = Lock()
+        #: How many lookups have been answered from the cache
+        self.hits = 0
+        #: How many lookups had to be passed on
+        self.misses = 0
+
+    def __contains__(self, ip: str) -> bool:
+        if not self.enabled:
+            return False
+        with self._lock:
+            known = str(ip) in self._cache
+            if known:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return known
+
+    def add(self, ip: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._cache[str(ip)] = True
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self):
+        if not self.enabled:
+            return 0
+        with self._lock:
+            return len(self._cache)
@@ -4,3 +4,14 @@ from sipa.backends.exceptions import BackendError
 class PycroftBackendError(BackendError):
     def __init__(self, *a, **kw):
         super().__init__('pycroft', *a, **kw)
+
+
+class PycroftUnavailableError(PycroftBackendError):
+    """The API could not be reached, timed out or had an internal error
+
+    Only these errors count as failures for the circuit breaker.
+    """
+
+
+class PycroftCircuitOpenError(PycroftBackendError):
+    """Raised instead of calling the API while it is considered down"""
@@ -0,0 +1,119 @@
+"""Lazily validated list fields for pydantic models
+
+Most pages only need a few scalar fields of a user, but validating
+the finance and traffic history of a long-standing member costs more
+than everything else together.  Fields annotated as
+:py:class:`LazyList` are only checked to be a list when the model is
+validated; their items are validated on first access.  As that
+access usually happens while rendering a template, schema errors are
+raised as :py:class:`~sipa.model.pycroft.exc.PycroftBackendError`,
+just like those of the eagerly validated fields.
+"""
+from __future__ import annotations
+
+import typing as t
+from collections.abc import Iterator, Sequence
+from functools import cache
+from threading import Lock
+
+from pydantic import GetCoreSchemaHandler, TypeAdapter, ValidationError
+from pydantic_core import PydanticCustomError, core_schema
+
+from .exc import PycroftBackendError
+
+T = t.TypeVar('T')
+
+
+@cache
+def list_adapter(item_type: type[T]) -> TypeAdapter[list[T]]:
+    return TypeAdapter(list[item_type])
+
+
+class LazyList(Sequence[T]):
+    """A read-only list whose items are validated on first access
+
+    Validation errors of the items are raised on first access rather
+    than when validating the surrounding model, as
+    :py:class:`~sipa.model.pycroft.exc.PycroftBackendError`.
+
+    :param raw: The unvalidated items
+    :param adapter: Validates ``raw`` as ``list[T]``
+    """
+
+    def __init__(self, raw: list, adapter: TypeAdapter[list[T]]):
+        self._raw: list | None = raw
+        self._adapter = adapter
+        self._items: list[T] | None = None
+        self._lock = Lock()
+
+    @property
+    def validated(self) -> bool:
+        return self._items is not None
+
+    def validate(self) -> list[T]:
+        """Validate the items now, if not done yet
+
+        :raises ValidationError: if the items do not match the schema
+        """
+        if self._items is None:
+            # copies share the lazy list, so validate it only once
+            with self._lock:
+                if self._items is None:
+                    self._items = self._adapter.validate_python(self._raw)
+                    self._raw = None
+        return self._items
+
+    def _validated_items(self) -> list[T]:
+        try:
+            return self.validate()
+        except ValidationError as e:
+            raise PycroftBackendError("Error when parsing user lookup response") from e
+
+    @t.overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @t.overload
+    def __getitem__(self, index: slice) -> list[T]: ...
+
+    def __getitem__(self, index):
+        return self._validated_items()[index]
+
+    def __len__(self) -> int:
+        # no need to validate for that
+        return len(self._raw) if self._items is None else len(self._items)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._validated_items())
+
+    def __eq__(self, other):
+        if isinstance(other, LazyList):
+            other = other._validated_items()
+        if not isinstance(other, list):
+            return NotImplemented
+        return self._validated_items() == other
+
+    def __repr__(self):
+        if self._items is None:
+            return f"<LazyList ({len(self)} items, not validated)>"
+        return f"LazyList({self._items!r})"
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: type, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        (item_type,) = t.get_args(source) or (t.Any,)
+        adapter = list_adapter(item_type)
+
+        def validate(value: t.Any) -> LazyList:
+            if isinstance(value, LazyList):
+                return value
+            if not isinstance(value, list):
+                raise PydanticCustomError('list_type', "Input should be a valid list")
+            return cls(value, adapter)
+
+        return core_schema.no_info_plain_validator_function(
+            validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda value: adapter.dump_python(list(value)),
+            ),
+        )
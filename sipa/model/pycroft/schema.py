@@ -3,8 +3,12 @@ from __future__ import annotations
 from datetime import date
 from decimal import Decimal
 
+import typing as t
+
 from pydantic import BaseModel
 
+from .lazy import LazyList
+
 
 class UserData(BaseModel):
     id: int
@@ -17,10 +21,11 @@ class UserData(BaseModel):
     mail_forwarded: bool
     mail_confirmed: bool
     properties: list[str]
-    traffic_history: list[TrafficHistoryEntry]
-    interfaces: list[Interface]
+    # the long lists are validated on first access only
+    traffic_history: LazyList[TrafficHistoryEntry]
+    interfaces: LazyList[Interface]
     finance_balance: Decimal
-    finance_history: list[FinanceHistoryEntry]
+    finance_history: LazyList[FinanceHistoryEntry]
     last_finance_update: date
 
     # TODO introduce properties once they can be excluded
@@ -55,3 +60,12 @@ class FinanceHistoryEntry(BaseModel):
     valid_on: str
     amount: Decimal
     description: str
+
+
+def validate_user_data_fully(data: dict[str, t.Any]) -> UserData:
+    """Validate ``data`` including all items of the lazy lists"""
+    user_data = UserData.model_validate(data)
+    for field in (user_data.traffic_history, user_data.interfaces,
+                  user_data.finance_history):
+        field.validate()
+    return user_data
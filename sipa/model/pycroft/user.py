@@ -1,6 +1,8 @@
 from __future__ import annotations
 import logging
+import random
 from datetime import date
+from functools import wraps
 
 from pydantic import ValidationError
 
@@ -17,8 +19,9 @@ from sipa.model.exceptions import UserNotFound, PasswordInvalid, \
     MacAlreadyExists, NetworkAccessAlreadyActive, TerminationNotPossible, UnknownError, \
     ContinuationNotPossible, SubnetFull, UserNotContactableError, TokenNotFound, LoginNotAllowed
 from .api import PycroftApi
+from .cache import IpMissCache, UserDataCache
 from .exc import PycroftBackendError
-from .schema import UserData, UserStatus
+from .schema import UserData, UserStatus, validate_user_data_fully
 from .userdb import UserDB
 
 from flask_login import AnonymousUserMixin
@@ -30,14 +33,71 @@ from werkzeug.http import parse_date
 logger = logging.getLogger(__name__)
 
 api: PycroftApi = LocalProxy(lambda: current_app.extensions['pycroft_api'])
+user_cache: UserDataCache = LocalProxy(lambda: current_app.extensions['pycroft_user_cache'])
+ip_miss_cache: IpMissCache = LocalProxy(
+    lambda: current_app.extensions['pycroft_ip_miss_cache']
+)
+
+
+def invalidates_user_cache(f):
+    """Drop the user's cached data after calling the decorated method.
+
+    Use this on methods modifying the user on pycroft's side.
+    """
+    @wraps(f)
+    def wrapped(self, *a, **kw):
+        try:
+            return f(self, *a, **kw)
+        finally:
+            user_cache.invalidate(self.user_data.id)
+
+    return wrapped
+
+
+def invalidates_ip_misses(f):
+    """Forget the ips without a user after calling the decorated method.
+
+    Use this on methods which may give an ip to a device of the user.
+    Which ip that is, is not known beforehand.
+    """
+    @wraps(f)
+    def wrapped(self, *a, **kw):
+        try:
+            return f(self, *a, **kw)
+        finally:
+            ip_miss_cache.clear()
+
+    return wrapped
+
+
+def parse_user_data(data: dict | UserData) -> UserData:
+    """Turn a pycroft user response into :py:class:`UserData`.
+
+    The lists of the user data are only validated on access.  So that
+    a changed schema is noticed anyway, a share of
+    ``PYCROFT_VALIDATION_SAMPLE_RATE`` of the responses is validated
+    completely.
+
+    :raises ValidationError: if the data does not match the schema
+    """
+    if isinstance(data, UserData):
+        return data
+    if random.random() >= current_app.config['PYCROFT_VALIDATION_SAMPLE_RATE']:
+        return UserData.model_validate(data)
+    try:
+        return validate_user_data_fully(data)
+    except ValidationError:
+        logger.error("Pycroft user data does not match the schema",
+                     exc_info=True, extra={'data': {'user_id': data.get('id')}})
+        raise
 
 
 class User(BaseUser):
     user_data: UserData
 
-    def __init__(self, user_data: dict):
+    def __init__(self, user_data: dict | UserData):
         try:
-            self.user_data: UserData = UserData.model_validate(user_data)
+            self.user_data: UserData = parse_user_data(user_data)
             self._userdb: UserDB = UserDB(self)
         except ValidationError as e:
             raise PycroftBackendError("Error when parsing user lookup response") from e
@@ -45,21 +105,43 @@ class User(BaseUser):
 
     @classmethod
     def get(cls, username):
-        status, user_data = api.get_user(username)
+        """Fetch a user, falling back to stale data if pycroft fails."""
+        if (user_data := user_cache.get(username)) is not None:
+            return cls(user_data)
+
+        try:
+            status, user_data = api.get_user(username)
+        except PycroftBackendError:
+            if (stale := user_cache.get_stale(username)) is None:
+                raise
+            logger.warning("Pycroft unavailable, using data of user %s as of %s",
+                           username, stale.fetched_at, exc_info=True)
+            user = cls(stale.user_data)
+            user.data_as_of = stale.fetched_at
+            return user
 
         if status != 200:
             raise UserNotFound
 
-        return cls(user_data)
+        user = cls(user_data)
+        user_cache.set(user.user_data)
+        return user
 
     @classmethod
     def from_ip(cls, ip):
+        if ip in ip_miss_cache:
+            return AnonymousUserMixin()
+
         status, user_data = api.get_user_from_ip(ip)
 
+        if status == 404:
+            ip_miss_cache.add(ip)
         if status != 200:
             return AnonymousUserMixin()
 
-        return cls(user_data)
+        user = cls(user_data)
+        user_cache.set(user.user_data)
+        return user
 
     def re_authenticate(self, password):
         self.authenticate(self.user_data.login, password)
@@ -71,7 +153,12 @@ class User(BaseUser):
         if status != 200:
             raise PasswordInvalid
 
-        user = cls.get(result['id'])
+        if UserData.model_fields.keys() <= result.keys():
+            # the API included the user's data, no need to fetch it again
+            user = cls(result)
+            user_cache.set(user.user_data)
+        else:
+            user = cls.get(result['id'])
 
         if not user.has_property('sipa_login'):
             raise LoginNotAllowed
@@ -125,6 +212,8 @@ class User(BaseUser):
             capabilities=Capabilities.edit_if(len(self.user_data.interfaces) <= 1),
         )
 
+    @invalidates_user_cache
+    @invalidates_ip_misses
     def change_mac_address(self, new_mac, host_name, password):
         assert len(self.user_data.interfaces) == 1
 
@@ -155,6 +244,8 @@ class User(BaseUser):
             capabilities=Capabilities.edit_if(can_edit),
         )
 
+    @invalidates_user_cache
+    @invalidates_ip_misses
     def activate_network_access(self, password, mac, birthdate, host_name):
         status, result = api.activate_network_access(self.user_data.id, password, mac,
                                                      birthdate, host_name)
@@ -168,6 +259,7 @@ class User(BaseUser):
         elif status == 422:
             raise SubnetFull
 
+    @invalidates_user_cache
     def terminate_membership(self, end_date):
         status, result = api.terminate_membership(self.user_data.id, end_date)
 
@@ -184,6 +276,7 @@ class User(BaseUser):
         else:
             raise UnknownError
 
+    @invalidates_user_cache
     def continue_membership(self):
         status, result = api.continue_membership(self.user_data.id)
 
@@ -200,6 +293,7 @@ class User(BaseUser):
             capabilities=Capabilities.edit_if(self.has_property("mail")),
         )
 
+    @invalidates_user_cache
     def change_mail(self, password: str, new_mail: str, mail_forwarded: bool):
         status, result = api.change_mail(
             self.user_data.id,
@@ -366,6 +460,7 @@ class User(BaseUser):
             capabilities=Capabilities(edit=True, delete=False),
         )
 
+    @invalidates_user_cache
     def reset_wifi_password(self):
         status, result = api.reset_wifi_password(self.user_data.id)
 
@@ -7,6 +7,7 @@ from sqlalchemy.exc import OperationalError
 
 from sipa.model.user import BaseUserDB
 from sipa.backends.exceptions import InvalidConfiguration
+from sipa.utils.deadline import DeadlineExceeded, current_deadline
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +44,12 @@ class UserDB(BaseUserDB):
         :param query: See :py:meth:`pymysql.cursors.Cursor.execute`.
         :param args: is a tuple needed for string replacement.
             See :py:meth:`pymysql.cursors.Cursor.execute`.
+        :raises DeadlineExceeded: if the request's deadline has passed.
+            The deadline is only checked before the query; the query
+            itself is bounded by ``SQL_TIMEOUT`` for connecting only.
         """
+        if (deadline := current_deadline()) is not None:
+            deadline.check("helios query")
         database = current_app.extensions['db_helios']
         # Connection.__enter__ returns Cursor, Cursor.__enter__ returns itself
         # and we need both things for their `__exit__` commands
@@ -53,6 +59,7 @@ class UserDB(BaseUserDB):
 
     @property
     def has_db(self):
+        """Whether the user has a database, ``None`` if that is unknown"""
         try:
             userdb = self.sql_query(
                 "SELECT SCHEMA_NAME "
@@ -66,6 +73,10 @@ class UserDB(BaseUserDB):
             logger.critical("User db of user %s unreachable", self.db_name(),
                             exc_info=True)
             return None
+        except DeadlineExceeded:
+            logger.warning("Deadline exceeded before looking up user db of %s",
+                           self.db_name())
+            return None
 
     def create(self, password):
         self.sql_query(
@@ -3,7 +3,7 @@ from __future__ import annotations
 import typing as t
 # noinspection PyMethodMayBeStatic
 from abc import ABCMeta, abstractmethod
-from datetime import date
+from datetime import date, datetime
 from typing import TypeVar
 
 from sipa.model.fancy_property import UnsupportedProperty, PropertyBase
@@ -61,9 +61,19 @@ class BaseUser(AuthenticatedUserMixin, metaclass=ABCMeta):
         #: :meth:`get_id`
         self.uid: str = uid
 
+    #: If the datasource could not be reached, the time the user's
+    #: (outdated) data shown instead has been fetched.  Such a user
+    #: must not be modified.
+    data_as_of: datetime | None = None
+
     def __eq__(self, other):
         return self.uid == other.uid and self.datasource == other.datasource
 
+    @property
+    def display_name(self) -> str:
+        """The name to show in the navigation bar"""
+        return self.realname.value
+
     datasource = None
 
     def get_id(self) -> str:
@@ -0,0 +1,246 @@
+"""A per-process cache of whole pages for anonymous visitors
+
+Most requests are anonymous reads of the content pages, which render
+the same html for everyone with the same locale.  Views decorated with
+:py:func:`cached_for_anonymous` keep their responses in a
+:py:class:`PageCache`, keyed by
+
+* the url,
+* the locale from :py:func:`~sipa.babel.select_locale`,
+* the commit of the content repository and
+* whether the visitor is inside a dormitory's subnet, which changes the
+  sidebar.
+
+Only requests without a session or “remember me” cookie are answered
+from the cache.  Responses are not stored if they changed the session
+(e.g. flashed a message) or set a cookie.  The `Content-Security-Policy`
+is applied anew to every response, so responses carrying per-response
+nonces (see :py:class:`~sipa.utils.csp.NonceInfo`) are never stored.
+
+With ``COMPRESS_RESPONSES``, a gzipped body is stored alongside the
+plain one and handed to :py:func:`~sipa.compression.compress_response`,
+so that hits are not compressed again.
+"""
+import logging
+import typing as t
+from threading import Lock
+
+from cachetools import LRUCache
+from flask import Flask, current_app, g, request, session
+from flask_babel import get_locale
+from flask_login import COOKIE_NAME as REMEMBER_COOKIE_NAME
+from werkzeug import Response
+
+from sipa.backends import backends
+from sipa.compression import gzip_body, is_compressible
+
+logger = logging.getLogger(__name__)
+
+#: The attribute marking a view function as cacheable
+CACHEABLE_ATTRIBUTE = 'cached_for_anonymous'
+CACHEABLE_STATUS = frozenset({200, 301, 302, 308})
+#: Headers set anew for every response
+VOLATILE_HEADERS = frozenset({'content-security-policy', 'set-cookie'})
+#: Roughly what an entry costs besides the body
+ENTRY_OVERHEAD = 1024
+
+
+def cached_for_anonymous(view):
+    """Mark ``view`` to be cached for anonymous visitors
+
+    The view must render the same response for everyone whose requests
+    share the key described in :py:mod:`sipa.page_cache`.
+    """
+    setattr(view, CACHEABLE_ATTRIBUTE, True)
+    return view
+
+
+class CachedResponse(t.NamedTuple):
+    body: bytes
+    status: int
+    headers: list[tuple[str, str]]
+    #: The body compressed by :py:func:`~sipa.compression.gzip_body`
+    gzipped: bytes | None = None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped or b'') + ENTRY_OVERHEAD
+
+    def to_response(self) -> Response:
+        return Response(self.body, status=self.status, headers=self.headers)
+
+
+class PageCache:
+    """A thread safe LRU cache of responses bounded by their size
+
+    :param maxsize: The maximum size of all cached responses in bytes.
+        If zero, the cache is disabled.
+    """
+
+    def __init__(self, maxsize: int):
+        self.enabled = maxsize > 0
+        self._cache = (LRUCache(maxsize=maxsize, getsizeof=lambda e: e.size)
+                       if self.enabled else None)
+        self._lock = Lock()
+        #: How many requests have been answered from the cache
+        self.hits = 0
+        #: How many cacheable requests had to be rendered
+        self.misses = 0
+
+    def get(self, key: t.Hashable) -> CachedResponse | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key: t.Hashable, entry: CachedResponse) -> None:
+        if not self.enabled or entry.size > self._cache.maxsize:
+            return
+        with self._lock:
+            self._cache[key] = entry
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self):
+        if not self.enabled:
+            return 0
+        with self._lock:
+            return len(self._cache)
+
+    @property
+    def currsize(self) -> int:
+        """The size of all cached responses in bytes"""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            return self._cache.currsize
+
+
+def _is_anonymous_request() -> bool:
+    cookies = request.cookies
+    return (current_app.config['SESSION_COOKIE_NAME'] not in cookies
+            and current_app.config.get('REMEMBER_COOKIE_NAME',
+                                       REMEMBER_COOKIE_NAME) not in cookies)
+
+
+def anonymous_page_key() -> t.Hashable | None:
+    """What the response to the current request depends on
+
+    :return: ``None`` if the response may differ between requests with
+        the same key, e.g. because the visitor is logged in
+    """
+    if request.method not in ('GET', 'HEAD') or request.endpoint is None:
+        return None
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, CACHEABLE_ATTRIBUTE, False):
+        return None
+    if not _is_anonymous_request():
+        return None
+    if (generation := current_app.cf_pages.generation) is None:
+        # without a commit, changes of the content would go unnoticed
+        return None
+    in_dormitory = backends.dormitory_from_ip(request.remote_addr) is not None
+    if in_dormitory and not current_app.config['TRAFFIC_DATA_DEFERRED']:
+        # the sidebar shows the traffic of the user behind the ip
+        return None
+    return (request.host, request.script_root, request.path,
+            request.query_string, str(get_locale()), generation, in_dormitory)
+
+
+def serve_cached_page() -> Response | None:
+    """Answer the request from the cache, if possible
+
+    This is a `before_request` handler.
+    """
+    page_cache: PageCache = current_app.extensions['page_cache']
+    if not page_cache.enabled or (key := anonymous_page_key()) is None:
+        return None
+    if (entry := page_cache.get(key)) is not None:
+        if entry.gzipped is not None:
+            g.gzipped_body = entry.gzipped
+        return entry.to_response()
+    g.page_cache_key = key
+    return None
+
+
+def _uses_nonces() -> bool:
+    nonce_info = g.get('nonce_info')
+    return nonce_info is not None and bool(
+        nonce_info.script_nonces or nonce_info.style_nonces
+    )
+
+
+def is_shareable_response(response: Response) -> bool:
+    """Whether ``response`` is the same for every request with its key
+
+    That is not the case if it changed the session (e.g. flashed a
+    message), sets a cookie or contains nonces.
+    """
+    return not (response.direct_passthrough
+                or response.is_streamed
+                or session.modified
+                or '_flashes' in session
+                or 'Set-Cookie' in response.headers
+                or _uses_nonces())
+
+
+def store_cached_page(response: Response) -> Response:
+    """Store the response of a cache miss, if it is the same for everyone
+
+    This is an `after_request` handler.
+    """
+    if (key := g.pop('page_cache_key', None)) is None:
+        return response
+    if (response.status_code not in CACHEABLE_STATUS
+            or not is_shareable_response(response)):
+        return response
+
+    headers = [(name, value) for name, value in response.headers
+               if name.lower() not in VOLATILE_HEADERS]
+    body = response.get_data()
+    gzipped = gzip_body(body) if is_compressible(response) else None
+    if gzipped is not None:
+        g.gzipped_body = gzipped
+    entry = CachedResponse(body, response.status_code, headers, gzipped)
+    current_app.extensions['page_cache'].set(key, entry)
+    return response
+
+
+def init_metrics(app: Flask, page_cache: PageCache) -> None:
+    if (registry := app.extensions.get('metrics')) is None:
+        return
+    registry.counter('sipa_page_cache_lookups',
+                   "Anonymous requests answered from (hit) or rendered for"
+                   " (miss) the page cache",
+                   ['result'],
+                   collect=lambda: {('hit',): page_cache.hits,
+                                    ('miss',): page_cache.misses})
+    registry.gauge('sipa_page_cache_entries', "Number of cached pages",
+                   collect=lambda: {(): len(page_cache)})
+    registry.gauge('sipa_page_cache_bytes', "Size of the cached pages",
+                   collect=lambda: {(): page_cache.currsize})
+
+
+def init_app(app: Flask) -> None:
+    """Set up the page cache
+
+    Must be called after the locale and the content pages have been
+    set up, so that their `before_request` handlers run first.
+    """
+    page_cache = PageCache(maxsize=app.config['PAGE_CACHE_SIZE'])
+    app.extensions['page_cache'] = page_cache
+    if not page_cache.enabled:
+        return
+    logger.debug("Page cache of %d bytes", page_cache._cache.maxsize)
+    app.before_request(serve_cached_page)
+    app.after_request(store_cached_page)
+    init_metrics(app, page_cache)
@@ -0,0 +1,372 @@
+"""Full-text search over the content pages
+
+For each possible locale, an inverted index of the pages shown to a
+user of that locale is kept in memory and ranked with BM25.  The
+posting lists are kept in :py:class:`array.array` s.  When the content
+changes, only the articles whose page has changed are indexed again,
+and only the posting lists of their terms are rebuilt.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import typing as t
+import unicodedata
+from array import array
+from collections import Counter
+from functools import lru_cache
+from os.path import basename, splitext
+
+from markupsafe import Markup, escape
+
+from sipa.babel import possible_locales
+
+if t.TYPE_CHECKING:
+    from flask_flatpages import Page
+
+    from sipa.flatpages import Category
+
+#: The category whose articles are shown by the news blueprint
+NEWS_CATEGORY = 'news'
+
+#: How often the words of the title count
+TITLE_WEIGHT = 3
+#: BM25 parameters
+K1 = 1.2
+B = 0.75
+
+WORD_RE = re.compile(r"\w+")
+
+STOPWORDS = {
+    'de': frozenset("""
+        aber als am an auch auf aus bei bin bis bist da dann das dass dein
+        dem den der des dich die dir du ein eine einem einen einer eines er
+        es für hat hier ich ihr im in ist ja kann mein mich mir mit nach
+        nicht noch nur ob oder sich sie sind so um und uns von vor war was
+        wie wir wird zu zum zur
+    """.split()),
+    'en': frozenset("""
+        a an and are as at be by can do for from has have how i if in is it
+        my not of on or so that the this to was we what when where which
+        who will with you your
+    """.split()),
+}
+
+
+def _fold(word: str) -> str:
+    """Remove diacritics, e.g. so that ``Gebühr`` matches ``Gebuhr``"""
+    decomposed = unicodedata.normalize('NFKD', word)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _stem_de(word: str) -> str:
+    word = word.replace('ß', 'ss')
+    for suffix in ('ern', 'em', 'en', 'er', 'es', 'e', 'n', 's'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def _stem_en(word: str) -> str:
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+STEMMERS: dict[str, t.Callable[[str], str]] = {
+    'de': _stem_de,
+    'en': _stem_en,
+}
+
+
+@lru_cache(maxsize=1 << 16)
+def normalize(word: str, locale: str) -> str | None:
+    """The term of ``word`` in the index of ``locale``
+
+    :return: ``None`` for stop words
+    """
+    word = word.casefold()
+    if word in STOPWORDS.get(locale, ()):
+        return None
+    return _fold(STEMMERS.get(locale, str)(word))
+
+
+def tokenize(text: str, locale: str) -> list[str]:
+    """The terms of ``text`` in the order they appear, without stop words"""
+    terms = (normalize(word, locale) for word in WORD_RE.findall(text))
+    return [term for term in terms if term]
+
+
+_MD_IMAGE_OR_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_MD_ATTR_LIST = re.compile(r"\{:[^}]*\}")
+_HTML_TAG = re.compile(r"<[^>]+>")
+_MD_BLOCK = re.compile(r"^\s*(?:[#>]+|[-+*]|\d+\.)\s|^[-=|: ]{3,}$|\|",
+                       re.MULTILINE)
+_MD_EMPHASIS = re.compile(r"[*_`~]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def plain_text(markdown: str) -> str:
+    """Roughly strip the markup off ``markdown``"""
+    text = _MD_IMAGE_OR_LINK.sub(r"\1", markdown)
+    text = _MD_ATTR_LIST.sub("", text)
+    text = _HTML_TAG.sub(" ", text)
+    text = _MD_BLOCK.sub(" ", text)
+    text = _MD_EMPHASIS.sub("", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class Entry(t.NamedTuple):
+    """An article as shown in one locale"""
+
+    #: The path of the category and the article id
+    key: tuple[str, str]
+    page: Page
+    #: Where to find it, as arguments to `url_for`
+    endpoint: str
+    values: tuple[tuple[str, str], ...]
+
+
+class Document(t.NamedTuple):
+    entry: Entry
+    title: str
+    text: str
+    #: The number of terms, counting the title :py:data:`TITLE_WEIGHT` times
+    length: int
+    #: The distinct terms, to remove the document again
+    terms: frozenset[str]
+
+
+class SearchResult(t.NamedTuple):
+    title: str
+    endpoint: str
+    values: dict[str, str]
+    snippet: Markup
+    score: float
+
+
+def _categories(category: Category,
+                path: tuple[str, ...] = ()) -> t.Iterator[tuple[str, Category]]:
+    """The categories below ``category`` at any level, by their path"""
+    for child in category.categories.values():
+        child_path = (*path, child.id)
+        yield "/".join(child_path), child
+        yield from _categories(child, child_path)
+
+
+def _entries(root_category: Category, locale: str) -> t.Iterator[Entry]:
+    """The articles to be found, as shown to users of ``locale``"""
+    for category_path, category in _categories(root_category):
+        for article in category._articles.values():
+            page = article.localized_pages.get(locale, article.default_page)
+            if page is None:
+                continue
+            meta = page.meta
+            if meta.get('hidden') or meta.get('restricted') or meta.get('link'):
+                continue
+            if category_path == NEWS_CATEGORY:
+                if article.id == 'index':
+                    continue
+                # how `news.show_news` finds it
+                filename = splitext(basename(page.path))[0]
+                yield Entry((category_path, article.id), page,
+                            'news.show_news', (('filename', filename),))
+            elif article.id != 'index':
+                yield Entry((category_path, article.id), page, 'pages.show',
+                            (('category_id', category_path),
+                             ('article_id', article.id)))
+
+
+def _freeze(postings: dict[int, int]) -> tuple[array, array]:
+    doc_ids = sorted(postings)
+    return array('I', doc_ids), array('I', (postings[d] for d in doc_ids))
+
+
+class LocaleIndex:
+    """An inverted index of the documents of one locale
+
+    Instances are not changed once built; :py:meth:`updated` returns a
+    new one, so searches running meanwhile see a consistent state.
+    """
+
+    def __init__(self, locale: str):
+        self.locale = locale
+        #: By id; removed documents leave a ``None`` until compacted
+        self._documents: list[Document | None] = []
+        self._ids: dict[tuple[str, str], int] = {}
+        #: term → (document ids, term frequencies)
+        self._postings: dict[str, tuple[array, array]] = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _document(self, entry: Entry) -> tuple[Document, Counter]:
+        title = str(entry.page.meta.get('title', ""))
+        text = plain_text(entry.page.body)
+        frequencies = Counter(tokenize(text, self.locale))
+        for term in tokenize(title, self.locale):
+            frequencies[term] += TITLE_WEIGHT
+        document = Document(entry=entry, title=title, text=text,
+                            length=sum(frequencies.values()),
+                            terms=frozenset(frequencies))
+        return document, frequencies
+
+    def updated(self, entries: t.Iterable[Entry]) -> LocaleIndex:
+        """A copy of this index containing exactly ``entries``
+
+        Entries whose page is the same as in this index are kept as
+        they are.
+        """
+        entries = {entry.key: entry for entry in entries}
+        removed = {doc_id for key, doc_id in self._ids.items()
+                   if key not in entries
+                   or entries[key].page is not self._documents[doc_id].entry.page}
+        added = [entry for key, entry in entries.items()
+                 if key not in self._ids or self._ids[key] in removed]
+
+        new = LocaleIndex(self.locale)
+        new._documents = list(self._documents)
+        new._ids = dict(self._ids)
+        new._postings = dict(self._postings)
+        new._total_length = self._total_length
+        if removed or added:
+            new._apply(removed, added)
+        if removed:
+            new._compact()
+        return new
+
+    def _apply(self, removed: set[int], added: list[Entry]) -> None:
+        # term → changes of its postings; `None` removes the document
+        changes: dict[str, dict[int, int | None]] = {}
+        for doc_id in removed:
+            document = self._documents[doc_id]
+            self._documents[doc_id] = None
+            del self._ids[document.entry.key]
+            self._total_length -= document.length
+            for term in document.terms:
+                changes.setdefault(term, {})[doc_id] = None
+        for entry in added:
+            document, frequencies = self._document(entry)
+            doc_id = len(self._documents)
+            self._documents.append(document)
+            self._ids[entry.key] = doc_id
+            self._total_length += document.length
+            for term, frequency in frequencies.items():
+                changes.setdefault(term, {})[doc_id] = frequency
+
+        for term, term_changes in changes.items():
+            doc_ids, frequencies = self._postings.get(term, ((), ()))
+            postings = dict(zip(doc_ids, frequencies))
+            for doc_id, frequency in term_changes.items():
+                if frequency is None:
+                    postings.pop(doc_id, None)
+                else:
+                    postings[doc_id] = frequency
+            if postings:
+                self._postings[term] = _freeze(postings)
+            else:
+                self._postings.pop(term, None)
+
+    def _compact(self) -> None:
+        """Drop the slots of removed documents, renumbering the others"""
+        new_ids: dict[int, int] = {}
+        documents = []
+        for doc_id, document in enumerate(self._documents):
+            if document is not None:
+                new_ids[doc_id] = len(documents)
+                documents.append(document)
+        self._documents = documents
+        self._ids = {key: new_ids[doc_id] for key, doc_id in self._ids.items()}
+        # the order is kept, so the document ids stay sorted
+        self._postings = {
+            term: (array('I', (new_ids[doc_id] for doc_id in doc_ids)), frequencies)
+            for term, (doc_ids, frequencies) in self._postings.items()
+        }
+
+    def search(self, query: str, limit: int = 20) -> list[SearchResult]:
+        """The documents best matching ``query``, best first"""
+        terms = set(tokenize(query, self.locale))
+        if not terms or not self._ids:
+            return []
+        count = len(self._ids)
+        average_length = self._total_length / count
+        scores: dict[int, float] = {}
+        for term in terms:
+            if (postings := self._postings.get(term)) is None:
+                continue
+            doc_ids, frequencies = postings
+            idf = math.log(1 + (count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            for doc_id, frequency in zip(doc_ids, frequencies):
+                length = self._documents[doc_id].length
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * (
+                    frequency * (K1 + 1)
+                    / (frequency + K1 * (1 - B + B * length / average_length))
+                )
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [self._result(self._documents[doc_id], terms, score)
+                for doc_id, score in best]
+
+    def _result(self, document: Document, terms: set[str],
+                score: float) -> SearchResult:
+        entry = document.entry
+        return SearchResult(
+            title=document.title,
+            endpoint=entry.endpoint,
+            values=dict(entry.values),
+            snippet=self.snippet(document.text, terms),
+            score=score,
+        )
+
+    def snippet(self, text: str, terms: set[str], width: int = 200) -> Markup:
+        """An excerpt of ``text`` around the first of ``terms``, highlighted"""
+        words = WORD_RE.finditer(text)
+        first = next((m for m in words if normalize(m.group(), self.locale) in terms),
+                     None)
+        start = 0
+        if first is not None and first.start() > width // 4:
+            start = text.rfind(" ", 0, first.start() - width // 4) + 1
+        end = text.find(" ", start + width)
+        end = len(text) if end == -1 else end
+
+        parts = ["… " if start > 0 else ""]
+        position = start
+        if first is not None:
+            matches = (m for m in WORD_RE.finditer(text, first.start(), end)
+                       if normalize(m.group(), self.locale) in terms)
+            for match in matches:
+                parts += [escape(text[position:match.start()]),
+                          Markup("<mark>%s</mark>") % match.group()]
+                position = match.end()
+        parts.append(escape(text[position:end]))
+        parts.append(" …" if end < len(text) else "")
+        return Markup("").join(parts)
+
+
+class SearchIndex:
+    """The :py:class:`LocaleIndex` of every possible locale"""
+
+    def __init__(self, indexes: dict[str, LocaleIndex] | None = None):
+        self._indexes = indexes or {}
+
+    def updated(self, root_category: Category) -> SearchIndex:
+        """The index of the articles in ``root_category``
+
+        Only articles whose pages have changed since this index has been
+        built are indexed again.
+        """
+        indexes = {}
+        for locale in map(str, possible_locales()):
+            index = self._indexes.get(locale) or LocaleIndex(locale)
+            indexes[locale] = index.updated(_entries(root_category, locale))
+        return SearchIndex(indexes)
+
+    def search(self, query: str, locale: str, limit: int = 20) -> list[SearchResult]:
+        if (index := self._indexes.get(locale)) is None:
+            return []
+        return index.search(query, limit)
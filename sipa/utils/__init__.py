@@ -25,6 +25,8 @@ from werkzeug.http import parse_date as parse_datetime
 
 from flask.globals import current_app
 
+from .deadline import DeadlineExceeded, deadline_timeout
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,10 +38,11 @@ def get_bustimes(stopname, count=10):
     :param stopname: Requested stop.
     :param count: Limit the entries for the stop.
     """
-    conn = http.client.HTTPConnection('widgets.vvo-online.de', timeout=1)
-
     stopname = stopname.replace(' ', '%20')
     try:
+        # `DeadlineExceeded` is an `OSError` as well
+        timeout = deadline_timeout(1, "fetching bus times")
+        conn = http.client.HTTPConnection('widgets.vvo-online.de', timeout=timeout)
         conn.request(
             'GET',
             f'/abfahrtsmonitor/Abfahrten.do?ort=Dresden&hst={stopname}'
@@ -75,9 +78,14 @@ def support_hotline_available():
 
 @cached(cache=TTLCache(maxsize=1, ttl=300))
 def try_fetch_calendar(url: str) -> Calendar | None:
-    """Fetch an ICAL calendar from a given URL."""
+    """Fetch an ICAL calendar from a given URL.
+
+    :raises DeadlineExceeded: if the request's deadline has passed.
+        Unlike a failed fetch, this is not cached.
+    """
+    timeout = deadline_timeout(1, "fetching calendar")
     try:
-        response = requests.get(url, timeout=1)
+        response = requests.get(url, timeout=timeout)
     except requests.exceptions.RequestException:
         logger.exception("Error when fetching calendar at %s", url)
         return
@@ -122,9 +130,21 @@ def events_from_calendar(calendar: icalendar.Calendar) -> list[Event]:
     )
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=300))
 def meetingcal():
-    """Returns the calendar events got form the url in the config"""
+    """Returns the calendar events got form the url in the config
+
+    If the request's deadline passed before the calendar could be
+    fetched, there are no events, without caching that.
+    """
+    try:
+        return _fetch_meetings()
+    except DeadlineExceeded:
+        logger.warning("Deadline exceeded before fetching the meetings")
+        return []
+
+
+@cached(cache=TTLCache(maxsize=1, ttl=300))
+def _fetch_meetings():
     if not (calendar := try_fetch_calendar(current_app.config['MEETINGS_ICAL_URL'])):
         return []
 
@@ -0,0 +1,151 @@
+"""A failure rate based circuit breaker
+
+If a remote service is down, waiting for every single call to time out
+ties up workers for nothing.  A :py:class:`CircuitBreaker` keeps track
+of the outcomes of recent calls and, once too many of them failed,
+rejects calls right away for a cooldown period.
+"""
+import logging
+import time
+from collections import deque
+from collections.abc import Callable
+from enum import Enum
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(Enum):
+    #: Calls pass, outcomes are recorded
+    CLOSED = "closed"
+    #: Calls are rejected until the cooldown has passed
+    OPEN = "open"
+    #: A limited number of probe calls decides whether to close again
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Decides whether calls to a remote service should be attempted.
+
+    Usage::
+
+        if not breaker.allow_request():
+            raise ServiceUnavailable
+        try:
+            result = call()
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+
+    :param failure_threshold: The failure rate (between 0 and 1) among
+        the last ``window_size`` calls at which the circuit opens.
+    :param window_size: How many recent outcomes to consider
+    :param min_calls: The minimum number of recorded outcomes before
+        the circuit may open.
+    :param cooldown: The time in seconds the circuit stays open
+        before probe calls are let through.
+    :param half_open_calls: How many concurrent probe calls are
+        allowed in the half open state.
+    :param name: A name used in log messages
+    :param clock: The clock used for the cooldown
+    """
+
+    def __init__(
+        self,
+        failure_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        cooldown: float = 15,
+        half_open_calls: int = 1,
+        name: str = "circuit",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.half_open_calls = half_open_calls
+        self.name = name
+        self._clock = clock
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = Lock()
+        #: How many calls have been rejected
+        self.rejected_calls = 0
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state()
+
+    @property
+    def failure_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def _current_state(self) -> CircuitState:
+        if (self._state is CircuitState.OPEN
+                and self._clock() - self._opened_at >= self.cooldown):
+            self._state = CircuitState.HALF_OPEN
+            self._probes = 0
+            logger.info("Circuit %s half open", self.name)
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a call may be attempted.
+
+        Every call for which this returns ``True`` must be followed by
+        :py:meth:`record_success`, :py:meth:`record_failure` or
+        :py:meth:`release`.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state is CircuitState.CLOSED:
+                return True
+            if state is CircuitState.HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return True
+            self.rejected_calls += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state is CircuitState.HALF_OPEN:
+                logger.info("Circuit %s closed", self.name)
+                self._state = CircuitState.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state is CircuitState.HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            if self._state is CircuitState.CLOSED and self._threshold_reached():
+                self._open()
+
+    def release(self) -> None:
+        """End a call whose outcome says nothing about the service
+
+        E.g. because the caller ran out of time or sent an invalid
+        request.  Frees the probe slot of a half open circuit.
+        """
+        with self._lock:
+            if self._state is CircuitState.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _threshold_reached(self) -> bool:
+        if len(self._outcomes) < self.min_calls:
+            return False
+        failures = self._outcomes.count(False)
+        return failures / len(self._outcomes) >= self.failure_threshold
+
+    def _open(self) -> None:
+        logger.warning("Circuit %s opened for %ss", self.name, self.cooldown)
+        self._state = CircuitState.OPEN
+        self._opened_at = self._clock()
@@ -0,0 +1,114 @@
+"""Per-request deadlines
+
+uwsgi kills a worker whose request takes longer than ``harakiri``
+seconds, no matter whether it is in the middle of sending a mail or
+changing a password.  Each request therefore gets a
+:py:class:`Deadline` slightly before that, which calls to external
+services consult to shrink their timeouts or to not start at all.
+"""
+import logging
+import time
+from collections.abc import Callable
+
+from flask import Flask, current_app, g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The time budget of the current request has been used up"""
+
+
+class Deadline:
+    """A point in time by which the current request should be done
+
+    :param seconds: The budget in seconds, starting now
+    :param clock: The clock to measure the budget with
+    """
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - self._clock(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, what: str = "operation") -> None:
+        """Raise :py:class:`DeadlineExceeded` if the deadline has passed.
+
+        :param what: Describes what could not be started anymore
+        """
+        if self.expired:
+            raise DeadlineExceeded(f"Deadline exceeded before {what}")
+
+    def timeout(self, default: float | None, what: str = "operation") -> float:
+        """Shrink ``default`` to the remaining time.
+
+        :param default: The timeout to use without a deadline.  ``None``
+            means no timeout.
+        :raises DeadlineExceeded: if no time is left
+        """
+        self.check(what)
+        remaining = self.remaining()
+        return remaining if default is None else min(default, remaining)
+
+    def __repr__(self):
+        return f"<Deadline remaining={self.remaining():.3f}s>"
+
+
+def current_deadline() -> Deadline | None:
+    """The deadline of the current request, if there is one."""
+    if not has_request_context():
+        return None
+    return g.get('deadline')
+
+
+def deadline_timeout(default: float | None, what: str = "operation") -> float | None:
+    """Shrink ``default`` to the time left in the current request.
+
+    Outside of a request or without a deadline, return ``default``.
+
+    :raises DeadlineExceeded: if no time is left
+    """
+    if (deadline := current_deadline()) is None:
+        return default
+    return deadline.timeout(default, what)
+
+
+def harakiri_timeout() -> int | None:
+    """The `harakiri` timeout of uwsgi, if running in uwsgi"""
+    try:
+        import uwsgi
+    except ImportError:
+        return None
+    harakiri = uwsgi.opt.get('harakiri')
+    return int(harakiri) if harakiri else None
+
+
+def request_budget(app: Flask) -> float | None:
+    """The time in seconds each request may take, if limited.
+
+    Either configured via ``REQUEST_DEADLINE`` or derived from the
+    uwsgi `harakiri` timeout minus ``REQUEST_DEADLINE_MARGIN``.
+    """
+    if (budget := app.config['REQUEST_DEADLINE']) is not None:
+        return budget
+    if (harakiri := harakiri_timeout()) is None:
+        return None
+    return max(harakiri - app.config['REQUEST_DEADLINE_MARGIN'], 0)
+
+
+def start_request_deadline() -> None:
+    if (budget := current_app.extensions['request_budget']) is not None:
+        g.deadline = Deadline(budget)
+
+
+def init_app(app: Flask) -> None:
+    budget = request_budget(app)
+    logger.debug("Request deadline: %s", budget)
+    app.extensions['request_budget'] = budget
+    app.before_request(start_request_deadline)
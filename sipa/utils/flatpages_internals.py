@@ -0,0 +1,54 @@
+"""Access to the internals of :py:class:`~flask_flatpages.FlatPages`
+
+Flask-FlatPages has no public way to replace its pages, to read a
+single file again or to get the renderer it gives to each page.  Sipa
+needs all three, to restore pages from the content cache and to update
+only the changed pages of a new content commit.  Everything relying on
+private attributes of `FlatPages` goes through
+:py:class:`FlatPagesInternals`, whose behavior is pinned by
+``tests/test_flatpages_internals.py`` for the supported version
+(``Flask-FlatPages~=0.8.1``).
+"""
+import typing as t
+
+from flask_flatpages import FlatPages, Page
+from werkzeug.utils import import_string
+
+
+class FlatPagesInternals:
+    """The private parts of ``flat_pages`` sipa depends on"""
+
+    def __init__(self, flat_pages: FlatPages):
+        self.flat_pages = flat_pages
+
+    def pages(self) -> dict[str, Page]:
+        """The pages, keyed by their path without extension"""
+        return self.flat_pages._pages
+
+    def replace_pages(self, pages: dict[str, Page]) -> None:
+        """Make ``pages`` the pages of ``flat_pages``
+
+        `FlatPages` keeps its pages in the cached property ``_pages``.
+        """
+        self.flat_pages.__dict__['_pages'] = pages
+
+    def read_page(self, path: str, filename: str, rel_path: str) -> Page:
+        """Read and parse the page in ``filename`` again
+
+        `FlatPages` caches parsed files by their mtime, which may not
+        have changed if the file changed in the same instant it was read
+        before, so the cached entry is dropped first.
+
+        :param path: The path of the page, without extension
+        :param filename: The file to read
+        :param rel_path: The directory of the page relative to the root
+        """
+        self.flat_pages._file_cache.pop(filename, None)
+        return self.flat_pages._load_file(path, filename, rel_path)
+
+    def html_renderer(self) -> t.Callable[[Page], str]:
+        """The renderer `FlatPages` gives to each page it parses"""
+        html_renderer = self.flat_pages.config('html_renderer')
+        if not callable(html_renderer):
+            html_renderer = import_string(html_renderer)
+        return self.flat_pages._smart_html_renderer(html_renderer)
@@ -1,6 +1,9 @@
-from datetime import datetime
+import os
+from datetime import UTC, datetime
+from functools import lru_cache
 from logging import getLogger
 from subprocess import call
+from typing import NamedTuple
 
 import git
 from flask_babel import format_datetime
@@ -59,6 +62,120 @@ def update_repo(repo_dir):
         }})
 
 
+def get_head_commit(repo_dir: str) -> str | None:
+    """
+    :param repo_dir: path of repo
+
+    :return: hexsha of the checked out commit, or ``None`` if
+             `repo_dir` is no git repository or has no commits
+    """
+    try:
+        return git.Repo(repo_dir).head.commit.hexsha
+    except (InvalidGitRepositoryError, NoSuchPathError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=64)
+def get_commit_time(repo_dir: str, commit: str) -> datetime | None:
+    """
+    :param repo_dir: path of repo
+    :param commit: hexsha of the commit
+
+    :return: when `commit` has been committed, or ``None`` if it is
+             not known
+    """
+    try:
+        return git.Repo(repo_dir).commit(commit).committed_datetime.astimezone(UTC)
+    except (InvalidGitRepositoryError, NoSuchPathError, ValueError):
+        return None
+
+
+class FileVersion(NamedTuple):
+    #: The sha of the blob
+    sha: str
+    #: When the last commit changing the file has been committed
+    modified: datetime
+
+
+@lru_cache(maxsize=16)
+def get_working_tree(path: str) -> str | None:
+    """
+    :param path: path of a directory in a repository
+
+    :return: The real path of the repository's working tree, or
+             ``None`` if `path` is not in a repository.  Cached, as
+             opening the repository is comparatively slow.
+    """
+    try:
+        repo = git.Repo(path, search_parent_directories=True)
+    except (InvalidGitRepositoryError, NoSuchPathError):
+        return None
+    return os.path.realpath(repo.working_tree_dir)
+
+
+def get_file_version(path: str, working_tree: str, commit: str) -> FileVersion | None:
+    """
+    :param path: path of a file
+    :param working_tree: the real path of the working tree of the
+                         repository `path` is in, see
+                         :py:func:`get_working_tree`
+    :param commit: hexsha of the checked out commit, e.g. the
+                   generation of the content pages
+
+    :return: The version of the file in `commit`, or ``None`` if it is
+             not tracked by git, not in `working_tree` or has been
+             changed since
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return None
+    rel_path = os.path.relpath(os.path.realpath(path), working_tree)
+    if rel_path.startswith(os.pardir + os.sep):
+        return None
+    version = _get_file_version(working_tree, commit, rel_path.replace(os.sep, '/'))
+    # a cheap check that the file has not been changed since
+    if version is None or version[1] != size:
+        return None
+    return version[0]
+
+
+@lru_cache(maxsize=1024)
+def _get_file_version(repo_dir: str, commit: str,
+                      rel_path: str) -> tuple[FileVersion, int] | None:
+    repo = git.Repo(repo_dir)
+    try:
+        blob = repo.commit(commit).tree / rel_path
+        timestamp = repo.git.log('-1', '--format=%ct', commit, '--', rel_path)
+    except (KeyError, GitCommandError):
+        return None
+    if blob.type != 'blob' or not timestamp:
+        return None
+    modified = datetime.fromtimestamp(int(timestamp), UTC)
+    return FileVersion(sha=blob.hexsha, modified=modified), blob.size
+
+
+def get_changed_files(repo_dir: str, old: str, new: str) -> list[str] | None:
+    """
+    :param repo_dir: path of repo
+    :param old: hexsha of the old commit
+    :param new: hexsha of the new commit
+
+    :return: paths relative to `repo_dir` which differ between both
+             commits, or ``None`` if they cannot be compared, e.g.
+             because `old` is not known anymore
+    """
+    try:
+        diff = git.Repo(repo_dir).git.diff(
+            '--name-only', '--no-renames', '-z', old, new
+        )
+    except (GitCommandError, InvalidGitRepositoryError, NoSuchPathError):
+        logger.warning("Could not compare commits", extra={'data': {
+            'repo_dir': repo_dir, 'old': old, 'new': new}})
+        return None
+    return [path for path in diff.split('\0') if path]
+
+
 def get_repo_active_branch(repo_dir: str) -> str:
     """
     :param repo_dir: path of repo
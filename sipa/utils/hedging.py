@@ -0,0 +1,147 @@
+"""Hedged requests
+
+A small share of calls to a remote service take much longer than the
+rest.  A :py:class:`Hedger` sends a duplicate of a call which did not
+finish within a delay, e.g. the observed 95th percentile, and uses
+whichever of both finishes first.
+"""
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Lock
+from typing import Any, Literal
+
+from flask import g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyWindow:
+    """The most recent latencies of successful calls"""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, p: float) -> float | None:
+        """The ``p``-th percentile of the recorded latencies, if any"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[max(math.ceil(p / 100 * len(samples)) - 1, 0)]
+
+
+class Hedger:
+    """Sends a duplicate of slow calls, the first result wins.
+
+    Only idempotent calls may be hedged.  The number of hedges is
+    limited per flask request; outside of a request, no hedges are sent.
+
+    :param delay: The time in seconds after which a duplicate is sent,
+        or ``"auto"`` to use the ``percentile`` of the latencies
+        observed for the same key.
+    :param budget: How many duplicates a single request may send
+    :param max_workers: How many calls may run concurrently
+    :param percentile: Which percentile to use for ``"auto"``
+    :param min_samples: How many latencies need to be known before
+        hedging with ``"auto"``.
+    """
+
+    def __init__(
+        self,
+        delay: float | Literal['auto'] = 'auto',
+        budget: int = 1,
+        max_workers: int = 10,
+        percentile: float = 95,
+        min_samples: int = 20,
+    ):
+        self.delay = delay
+        self.budget = budget
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.latencies: dict[str, LatencyWindow] = {}
+        self._lock = Lock()
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="hedge")
+        #: How many duplicates have been sent
+        self.hedges_sent = 0
+        #: How often the duplicate finished first
+        self.hedges_won = 0
+
+    def _window(self, key: str) -> LatencyWindow:
+        with self._lock:
+            return self.latencies.setdefault(key, LatencyWindow())
+
+    def delay_for(self, key: str) -> float | None:
+        """The hedging delay for ``key`` or ``None`` if unknown yet"""
+        if self.delay != 'auto':
+            return self.delay
+        window = self._window(key)
+        if len(window) < self.min_samples:
+            return None
+        return window.percentile(self.percentile)
+
+    def take_budget(self) -> bool:
+        """Use up one hedge of the current request's budget, if possible."""
+        if not has_request_context():
+            return False
+        left = g.get('hedges_left', self.budget)
+        if left <= 0:
+            return False
+        g.hedges_left = left - 1
+        return True
+
+    def _timed(self, key: str, fn: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        result = fn()
+        self._window(key).record(time.perf_counter() - start)
+        return result
+
+    def call(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Call ``fn``, hedging it if it takes longer than the delay.
+
+        :param key: Identifies calls with similar latencies, e.g. the
+            endpoint
+        :param fn: An idempotent call
+        """
+        delay = self.delay_for(key)
+        if delay is None:
+            return self._timed(key, fn)
+
+        primary = self._executor.submit(self._timed, key, fn)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        if not self.take_budget():
+            return primary.result()
+
+        logger.debug("Hedging call to %s after %.3fs", key, delay)
+        with self._lock:
+            self.hedges_sent += 1
+        hedge = self._executor.submit(self._timed, key, fn)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedges_won += 1
+                    return future.result()
+                error = future.exception()
+        raise error
@@ -0,0 +1,204 @@
+"""Minimal in-process metrics in the prometheus text format
+
+Every uwsgi worker keeps its own metrics, so a scrape reports the
+values of whichever worker answered it.  Samples carry the ``pid`` of
+the worker so that they are not mistaken for the values of another.
+"""
+import os
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Sequence
+from threading import Lock
+
+#: Default buckets for durations in seconds
+DURATION_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+#: Default buckets for sizes in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+#: A sample as ``(name, labels, value)``
+Sample = tuple[str, dict[str, str], float]
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+        for value in labels.values()
+    )
+    return "{" + ",".join(f'{key}="{value}"'
+                          for key, value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames},"
+                             f" got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterable[Sample]:
+        """The current samples, with the metric's name or a suffix of it"""
+
+
+class Counter(Metric):
+    """A monotonically increasing count
+
+    :param collect: If given, the current counts are read from it on
+        collection, keyed by the tuple of label values, instead of
+        being increased with :py:meth:`inc`.  For counts kept by other
+        objects anyway.
+    """
+    type = "counter"
+
+    def __init__(self, *a,
+                 collect: Callable[[], dict[tuple[str, ...], float]] | None = None,
+                 **kw):
+        super().__init__(*a, **kw)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._collect = collect
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if self._collect is not None:
+            raise TypeError(f"{self.name} is collected, not increased")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        if self._collect is not None:
+            return self._collect().get(self._key(labels), 0)
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[Sample]:
+        if self._collect is not None:
+            values = list(self._collect().items())
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}_total", dict(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, *a, buckets: Sequence[float] = DURATION_BUCKETS, **kw):
+        super().__init__(*a, **kw)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: bucket counts (last one is +Inf), sum
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        counts, _ = self._values.get(self._key(labels), ([0], None))
+        return sum(counts)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = [(key, list(counts), total[0])
+                      for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                yield (f"{self.name}_bucket",
+                       {**labels, 'le': _format_value(bound)}, cumulative)
+            yield f"{self.name}_count", labels, cumulative
+            yield f"{self.name}_sum", labels, total
+
+
+class Gauge(Metric):
+    """A metric whose samples are read from a callback on collection
+
+    :param collect: Returns the current value for each label set,
+        keyed by the tuple of label values.
+    """
+    type = "gauge"
+
+    def __init__(self, *a,
+                 collect: Callable[[], dict[tuple[str, ...], float]], **kw):
+        super().__init__(*a, **kw)
+        self._collect = collect
+
+    def samples(self) -> Iterable[Sample]:
+        for key, value in self._collect().items():
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class MetricsRegistry:
+    """A collection of metrics which can be rendered for prometheus"""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str,
+                labelnames: Sequence[str] = (), *,
+                collect: Callable[[], dict[tuple[str, ...], float]] | None = None,
+                ) -> Counter:
+        return self.register(Counter(name, documentation, labelnames,
+                                     collect=collect))
+
+    def histogram(self, name: str, documentation: str,
+                  labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames,
+                                       buckets=buckets))
+
+    def gauge(self, name: str, documentation: str,
+              labelnames: Sequence[str] = (), *,
+              collect: Callable[[], dict[tuple[str, ...], float]]) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames,
+                                   collect=collect))
+
+    def get(self, name: str) -> Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the prometheus text exposition format"""
+        pid = str(os.getpid())
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                labels = {**labels, 'pid': pid}
+                lines.append(f"{name}{_format_labels(labels)}"
+                             f" {_format_value(value)}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,81 @@
+"""Coalescing of concurrent identical calls
+
+If several threads ask for the same thing at the same moment, only the
+first one (the “leader”) actually performs the call.  The others wait
+for it to finish and receive its result, or its exception.
+"""
+from collections.abc import Callable, Hashable
+from threading import Event, Lock
+from typing import Any
+
+
+class WaitTimeout(TimeoutError):
+    """A waiting caller gave up before the leader's call finished"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Makes sure only one call per key is in flight at any time.
+
+    Usage::
+
+        flight = SingleFlight()
+        result = flight.do(url, lambda: fetch(url))
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        #: How many calls did not have to be performed
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any],
+           share: Callable[[Any], Any] = lambda result: result,
+           timeout: float | None = None) -> Any:
+        """Call ``fn`` unless a call for ``key`` is already in flight.
+
+        :param key: Identifies calls that may be coalesced
+        :param fn: The call to perform
+        :param share: Applied to the leader's result before handing it
+            to each waiting caller, e.g. to copy mutable results.
+        :param timeout: How long to wait for another caller's call in
+            seconds.  Does not limit the call of the leader.
+        :return: The result of ``fn``
+        :raises WaitTimeout: if the call in flight took longer than
+            ``timeout``
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise WaitTimeout(f"Gave up waiting for the call of {key!r}")
+            if call.error is not None:
+                raise call.error
+            return share(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -2,6 +2,8 @@ from unittest.mock import patch, MagicMock
 
 import pytest
 
+from sipa.model.pycroft.exc import PycroftUnavailableError
+from sipa.utils.deadline import DeadlineExceeded
 from tests.assertions import TestClient
 
 
@@ -23,3 +25,32 @@ def test_meetingcal(client: TestClient):
     with client.renders_template("meetingcal.html"):
         resp = client.assert_ok("features.render_meetingcal")
     assert "Teamsitzung" in resp.data.decode()
+
+
+def test_traffic_fragment(client: TestClient):
+    resp = client.assert_ok("features.traffic")
+    assert "Traffic" in resp.data.decode()
+
+
+def test_traffic_fragment_empty_outside_dormitories(client: TestClient):
+    resp = client.assert_ok(
+        "features.traffic", environ_base={"REMOTE_ADDR": "192.0.2.1"}
+    )
+    assert resp.data == b""
+
+
+@pytest.mark.parametrize("error", [PycroftUnavailableError("down"),
+                                   DeadlineExceeded("too late")])
+def test_traffic_fragment_empty_on_backend_error(client: TestClient, error):
+    with patch("sipa.model.misc.backends.user_from_ip", side_effect=error):
+        resp = client.assert_ok("features.traffic")
+    assert resp.data == b""
+    with client.session_transaction() as session:
+        assert "_flashes" not in session
+
+
+def test_page_does_not_look_up_ip_user(client: TestClient):
+    with patch("sipa.model.misc.backends.user_from_ip") as mock:
+        resp = client.assert_url_ok("/news/")
+    assert not mock.called
+    assert "traffic-fragment" in resp.data.decode()
@@ -0,0 +1,49 @@
+import logging
+
+import pytest
+
+from tests.assertions import TestClient
+from ..base import disable_logs
+from ..fixture_helpers import make_testing_app, DEFAULT_TESTING_CONFIG
+
+
+def test_metrics_disabled_by_default(module_test_client: TestClient):
+    module_test_client.assert_url_response_code("/metrics", code=404)
+
+
+class TestAppWithMetrics:
+    @pytest.fixture(scope="class")
+    def token(self) -> str:
+        return "metrics-token"
+
+    @pytest.fixture(scope="class")
+    def app(self, token):
+        return make_testing_app(
+            config=(DEFAULT_TESTING_CONFIG | {"METRICS_TOKEN": token})
+        )
+
+    @pytest.fixture(scope="class")
+    def client(self, class_test_client) -> TestClient:
+        return class_test_client
+
+    def test_no_token_auth_required(self, client):
+        client.assert_url_response_code("/metrics", code=401)
+
+    def test_wrong_token_permission_denied(self, client, token):
+        with disable_logs(logging.WARNING):
+            client.assert_url_response_code(f"/metrics?token={token}wrong",
+                                            code=403)
+
+    def test_token_argument(self, client, token):
+        client.assert_url_ok(f"/metrics?token={token}")
+
+    def test_bearer_token(self, client, token):
+        resp = client.assert_url_ok(
+            "/metrics", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert resp.mimetype == "text/plain"
+        text = resp.get_data(as_text=True)
+        assert "# TYPE sipa_pycroft_request_duration_seconds histogram" in text
+        assert "sipa_pycroft_user_cache_entries" in text
+        assert "# TYPE sipa_pycroft_client_events counter" in text
+        assert 'sipa_pycroft_circuit_state{state="closed"' in text
@@ -3,6 +3,7 @@ from unittest.mock import patch
 
 import pytest
 
+from sipa.flatpages import CategorizedFlatPages
 from tests.assertions import TestClient
 from ..base import disable_logs
 from ..fixture_helpers import make_testing_app, DEFAULT_TESTING_CONFIG
@@ -73,3 +74,9 @@ class TestAppWithGitHook:
         """Test that the hook returns HTTP 204 and calls `update_repo`"""
         assert_hook_status(client, status=204, token=token)
         assert update_repo_mock.called
+
+    def test_new_commit_refreshes_pages(self, client, token, update_repo_mock):
+        update_repo_mock.return_value = True
+        with patch.object(CategorizedFlatPages, "refresh_all_workers") as refresh:
+            assert_hook_status(client, status=204, token=token)
+        refresh.assert_called_once_with()
@@ -1,4 +1,5 @@
 import re
+from datetime import UTC, datetime
 import typing as t
 from unittest.mock import patch
 
@@ -101,3 +102,26 @@ def test_usersuite_contains_urls(usersuite_response):
         assert re.search(
             f'href="[^"]*{url}[^"]*"', usersuite_response.data.decode()
         ), f"Usersuite does not contain any reference to url {url!r}"
+
+
+class TestOutdatedUserData:
+    @pytest.fixture(autouse=True)
+    def outdated(self):
+        with patch("sipa.model.sample.user.User.data_as_of",
+                   datetime(2024, 1, 1, 12, 0, tzinfo=UTC)):
+            yield
+
+    def test_index_shows_banner(self, client):
+        resp = client.assert_ok("usersuite.index")
+        assert "alert-warning" in resp.get_data(as_text=True)
+
+    @pytest.mark.parametrize("endpoint", [
+        "usersuite.change_password",
+        "usersuite.change_mac",
+        "usersuite.reset_wifi_password",
+    ])
+    def test_changes_blocked(self, client, endpoint):
+        client.assert_redirects(endpoint, expected_location=url_for("usersuite.index"))
+
+    def test_contact_available(self, client):
+        client.assert_ok("usersuite.contact")
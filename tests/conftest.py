@@ -1,6 +1,7 @@
 # This file contains parts of the module `tests.frontend.conftest`
 # (pycroft@ded11d489de02e8c670990abc46f07beaea064f7)
 import typing as t
+from pathlib import Path
 
 import pytest
 from flask import Flask
@@ -11,6 +12,9 @@ from .fixture_helpers import (
     _test_client,
     make_testing_app,
     DEFAULT_TESTING_CONFIG,
+    SAMPLE_PAGES,
+    commit_pages,
+    run_git,
 )
 
 
@@ -43,3 +47,13 @@ def bare_app() -> Flask:
 def app() -> Flask:
     """App with `sample` backend"""
     return make_testing_app(DEFAULT_TESTING_CONFIG | {"BACKEND": "sample"})
+
+
+@pytest.fixture
+def content(tmp_path: Path) -> Path:
+    """A content repository with `SAMPLE_PAGES` committed"""
+    root = tmp_path / "content"
+    root.mkdir()
+    run_git(root, "init", "-q")
+    commit_pages(root, SAMPLE_PAGES, "initial content")
+    return root
@@ -7,10 +7,14 @@ import contextlib
 import random
 import string
 import typing as t
+from pathlib import Path
+from subprocess import check_call
 
 from flask import url_for, Flask
+from flask_babel import Babel
 from sipa import create_app
 from sipa.defaults import WARNINGS_ONLY_CONFIG
+from sipa.flatpages import CategorizedFlatPages
 from .assertions import TestClient
 
 
@@ -65,3 +69,44 @@ DEFAULT_TESTING_CONFIG = {
     "CONTACT_SENDER_MAIL": "test@foo.de",
     "MEETINGS_ICAL_URL": "https://agdsn.de/cloud/remote.php/dav/public-calendars/bgiQmBstmfzRdMeH?export",
 }
+
+
+#: A small content repository, by path relative to the root
+SAMPLE_PAGES = {
+    "news/index.md": "title: News\nrank: 1\n\n",
+    "news/first.de.md": "title: Erste Meldung\ndate: 2024-01-01\n\nSiehe [hier](/pages/about).\n",
+    "news/first.en.md": "title: First news\ndate: 2024-01-01\n\nSee [here](/pages/about).\n",
+    "about/index.md": "title: About\nrank: 2\n\n* foo\n* bar\n",
+    "about/broken.md": "title: @broken\n\nBroken meta\n",
+}
+
+
+def run_git(root: Path, *args: str) -> None:
+    check_call(["git", "-C", str(root), "-c", "user.name=Test",
+                "-c", "user.email=test@example.invalid", *args])
+
+
+def write_pages(root: Path, pages: dict[str, str]) -> None:
+    for path, content in pages.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(content)
+
+
+def commit_pages(root: Path, pages: dict[str, str], message: str = "update") -> None:
+    write_pages(root, pages)
+    run_git(root, "add", "--all")
+    run_git(root, "commit", "-q", "-m", message)
+
+
+def make_cf_pages(content: Path, **config: t.Any) -> CategorizedFlatPages:
+    """`CategorizedFlatPages` of `content` on a minimal app"""
+    app = Flask("test")
+    app.config.update({
+        "FLATPAGES_ROOT": str(content),
+        "FLATPAGES_EXTENSION": ".md",
+        "FLATPAGES_MARKDOWN_EXTENSIONS": ["sipa.utils.link_patch"],
+    } | config)
+    Babel(app)
+    cf_pages = CategorizedFlatPages()
+    cf_pages.init_app(app)
+    return cf_pages
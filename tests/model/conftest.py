@@ -0,0 +1,58 @@
+import typing as t
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+
+def pycroft_user_json(id: int = 1, **kw) -> dict[str, t.Any]:
+    """A user as returned by the pycroft API's `user/<id>` endpoint"""
+    return {
+        "id": id,
+        "user_id": f"{id}-0",
+        "login": f"user{id}",
+        "name": "Test User",
+        "status": {
+            "member": True,
+            "traffic_exceeded": False,
+            "network_access": True,
+            "account_balanced": True,
+            "violation": False,
+        },
+        "room": "Wu 5 / 0 01",
+        "mail": "test@example.com",
+        "mail_forwarded": False,
+        "mail_confirmed": True,
+        "properties": ["sipa_login", "member", "network_access", "mail"],
+        "traffic_history": [
+            {"timestamp": "2023-11-01T00:00:00+00:00", "ingress": 1024, "egress": 2048},
+        ],
+        "interfaces": [{"id": 1, "mac": "aa:bb:cc:dd:ee:ff", "ips": ["141.30.228.39"]}],
+        "finance_balance": "-3.50",
+        "finance_history": [
+            {"valid_on": "2023-11-01", "amount": "-3.50", "description": "Membership fee"},
+        ],
+        "last_finance_update": "2023-11-02",
+        "birthdate": "2000-01-01",
+        "membership_end_date": None,
+        "membership_begin_date": "2020-01-01",
+        "wifi_password": None,
+    } | kw
+
+
+@pytest.fixture
+def pycroft_app(bare_app: Flask) -> t.Iterator[Flask]:
+    """The app with the pycroft backend, inside a request context"""
+    with bare_app.test_request_context():
+        bare_app.extensions["pycroft_user_cache"].clear()
+        bare_app.extensions["pycroft_ip_miss_cache"].clear()
+        yield bare_app
+
+
+@pytest.fixture
+def api_mock(pycroft_app) -> t.Iterator[MagicMock]:
+    """A mock replacing the pycroft API client"""
+    with patch("sipa.model.pycroft.user.api", new_callable=MagicMock) as mock:
+        mock.get_user.side_effect = lambda id: (200, pycroft_user_json(int(id)))
+        mock.get_user_from_ip.return_value = (404, {})
+        yield mock
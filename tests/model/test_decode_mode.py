@@ -0,0 +1,52 @@
+import logging
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+from sipa.model.pycroft import json_loads, orjson
+from sipa.model.pycroft import user as user_module
+from sipa.model.pycroft.exc import PycroftBackendError
+from sipa.model.pycroft.user import User, parse_user_data
+from .conftest import pycroft_user_json
+
+
+@pytest.fixture
+def sample_rate(pycroft_app: Flask):
+    def configure(rate: float):
+        return patch.dict(pycroft_app.config, {"PYCROFT_VALIDATION_SAMPLE_RATE": rate})
+    return configure
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("validate", None),
+    ("trusted", orjson and orjson.loads),
+])
+def test_json_loads(mode, expected):
+    app = Flask(__name__)
+    app.config["PYCROFT_DECODE_MODE"] = mode
+    assert json_loads(app) is expected
+
+
+def test_unsampled_lists_not_validated(sample_rate):
+    with sample_rate(0), patch.object(user_module, "validate_user_data_fully") as validate:
+        user_data = parse_user_data(pycroft_user_json())
+    validate.assert_not_called()
+    assert not user_data.finance_history.validated
+
+
+def test_sampled_lists_validated(sample_rate):
+    with sample_rate(1):
+        user_data = parse_user_data(pycroft_user_json())
+    assert user_data.finance_history.validated
+    assert user_data.traffic_history.validated
+
+
+def test_sampled_validation_catches_drift(sample_rate, caplog):
+    drifted = pycroft_user_json(
+        finance_history=[{"valid_on": "2023-11-01", "amount": "-3.50"}],
+    )
+    with sample_rate(1), caplog.at_level(logging.ERROR), \
+            pytest.raises(PycroftBackendError):
+        User(drifted)
+    assert "does not match the schema" in caplog.text
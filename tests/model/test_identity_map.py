@@ -0,0 +1,88 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask, g
+from flask_login import AnonymousUserMixin
+
+from sipa.backends.extension import backends
+from sipa.backends.identity_map import IdentityMap
+
+
+class User:
+    is_authenticated = True
+
+    def __init__(self, uid):
+        self.uid = uid
+
+    def get_id(self):
+        return self.uid
+
+
+@pytest.fixture
+def identity_map() -> IdentityMap:
+    return IdentityMap()
+
+
+def test_get_memoized(identity_map):
+    loader = MagicMock(side_effect=User)
+    first = identity_map.get("1", loader)
+    assert identity_map.get("1", loader) is first
+    assert loader.call_count == 1
+    assert identity_map.saved_calls == 1
+    assert identity_map.lookups == 2
+
+
+def test_from_ip_memoized(identity_map):
+    loader = MagicMock(return_value=User("1"))
+    first = identity_map.from_ip("10.0.0.1", loader)
+    assert identity_map.from_ip("10.0.0.1", loader) is first
+    assert loader.call_count == 1
+
+
+def test_from_ip_cross_links_id(identity_map):
+    ip_user = identity_map.from_ip("10.0.0.1", lambda ip: User("1"))
+    loader = MagicMock()
+    assert identity_map.get("1", loader) is ip_user
+    assert not loader.called
+
+
+def test_from_ip_prefers_known_object(identity_map):
+    user = identity_map.get("1", User)
+    assert identity_map.from_ip("10.0.0.1", lambda ip: User("1")) is user
+
+
+def test_anonymous_not_linked(identity_map):
+    identity_map.from_ip("10.0.0.1", lambda ip: AnonymousUserMixin())
+    assert identity_map.by_id == {}
+
+
+def test_failing_lookup_not_memoized(identity_map):
+    loader = MagicMock(side_effect=[LookupError, User("1")])
+    with pytest.raises(LookupError):
+        identity_map.get("1", loader)
+    assert identity_map.get("1", loader).uid == "1"
+
+
+class TestBackendsIntegration:
+    @pytest.fixture
+    def request_context(self, app: Flask):
+        with app.test_request_context():
+            yield
+
+    @pytest.mark.usefixtures("request_context")
+    def test_lookups_share_one_call(self):
+        user_class = backends.datasource.user_class
+        with patch.object(user_class, "from_ip", wraps=user_class.from_ip) as from_ip, \
+                patch.object(user_class, "get", wraps=user_class.get) as get:
+            ip_user = backends.user_from_ip("127.0.0.1")
+            assert backends.user_from_ip("127.0.0.1") is ip_user
+            assert backends.user_from_id(ip_user.get_id()) is ip_user
+
+        assert from_ip.call_count == 1
+        # the sample datasource's `from_ip` delegates to `get` once
+        assert get.call_count == 1
+        assert g.user_identity_map.saved_calls == 2
+
+    def test_no_request_context(self, app: Flask):
+        with app.app_context():
+            assert backends.user_from_id("test").get_id() == "test"
@@ -0,0 +1,96 @@
+import logging
+from decimal import Decimal
+
+import pytest
+from flask import render_template_string
+from pydantic import ValidationError
+
+from sipa.model.pycroft.exc import PycroftBackendError
+from sipa.model.pycroft.lazy import LazyList
+from sipa.model.pycroft.schema import FinanceHistoryEntry, UserData
+from sipa.model.pycroft.user import User
+from ..base import disable_logs
+from ..fixture_helpers import make_testing_app
+from .conftest import pycroft_user_json
+
+
+@pytest.fixture
+def user_data() -> UserData:
+    return UserData.model_validate(pycroft_user_json())
+
+
+def test_history_not_validated_eagerly(user_data):
+    assert isinstance(user_data.finance_history, LazyList)
+    assert not user_data.finance_history.validated
+    assert len(user_data.finance_history) == 1
+    assert not user_data.finance_history.validated
+
+
+def test_items_validated_on_access(user_data):
+    entry = user_data.finance_history[0]
+    assert isinstance(entry, FinanceHistoryEntry)
+    assert entry.amount == Decimal("-3.50")
+    assert user_data.finance_history.validated
+
+
+BAD_FINANCE_HISTORY = [{"valid_on": "2023-11-01", "amount": "lots"}]
+
+
+def test_invalid_items_raise_on_access():
+    user_data = UserData.model_validate(pycroft_user_json(
+        finance_history=BAD_FINANCE_HISTORY,
+    ))
+    with pytest.raises(PycroftBackendError) as e:
+        list(user_data.finance_history)
+    assert isinstance(e.value.__cause__, ValidationError)
+
+
+def test_invalid_items_raise_on_validate():
+    user_data = UserData.model_validate(pycroft_user_json(
+        finance_history=BAD_FINANCE_HISTORY,
+    ))
+    with pytest.raises(ValidationError):
+        user_data.finance_history.validate()
+
+
+def test_invalid_items_handled_while_rendering():
+    app = make_testing_app()
+
+    @app.route("/finance")
+    def finance():
+        user = User(pycroft_user_json(finance_history=BAD_FINANCE_HISTORY))
+        return render_template_string(
+            "{% for t in user.user_data.finance_history %}{{ t.amount }}{% endfor %}",
+            user=user,
+        )
+
+    with disable_logs(logging.CRITICAL):
+        response = app.test_client().get("/finance")
+    # handled like any other backend error, with a flash message
+    assert response.status_code == 302
+    assert response.location.endswith("/")
+
+
+def test_non_list_rejected_eagerly():
+    with pytest.raises(ValidationError):
+        UserData.model_validate(pycroft_user_json(traffic_history=None))
+
+
+def test_copies_share_validation(user_data):
+    copy = user_data.model_copy()
+    list(copy.interfaces)
+    assert user_data.interfaces.validated
+
+
+def test_equality(user_data):
+    other = UserData.model_validate(pycroft_user_json())
+    assert user_data.interfaces == other.interfaces
+    assert user_data.interfaces == list(other.interfaces)
+
+
+def test_dump_roundtrip(user_data):
+    dumped = user_data.model_dump(mode="json")
+    assert dumped["finance_history"] == [
+        {"valid_on": "2023-11-01", "amount": "-3.50", "description": "Membership fee"},
+    ]
+    assert UserData.model_validate(dumped) == user_data
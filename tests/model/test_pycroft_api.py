@@ -0,0 +1,274 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask, g
+from requests import ConnectionError, ConnectTimeout, HTTPError, ReadTimeout
+
+from sipa.config import default
+from sipa.model.pycroft import init_pycroft_api
+from sipa.model.pycroft.api import PycroftApi, endpoint_template
+from sipa.model.pycroft.exc import (
+    PycroftBackendError,
+    PycroftCircuitOpenError,
+    PycroftUnavailableError,
+)
+from sipa.utils.circuit_breaker import CircuitBreaker, CircuitState
+from sipa.utils.deadline import Deadline, DeadlineExceeded
+from sipa.utils.hedging import Hedger
+
+ENDPOINT = "http://pycroft.test/api/v0/"
+
+
+def response(status_code: int = 200, json=None) -> MagicMock:
+    mock = MagicMock(status_code=status_code)
+    mock.json.return_value = json if json is not None else {}
+    return mock
+
+
+@pytest.fixture
+def api() -> PycroftApi:
+    api = PycroftApi(
+        endpoint=ENDPOINT,
+        api_key="secret",
+        timeout=(1, 3),
+        endpoint_timeouts={"user/authenticate": (1, 5)},
+        retries=2,
+        retry_backoff=0,
+    )
+    with patch.object(api, "session") as session:
+        session.get.return_value = response()
+        session.post.return_value = response()
+        yield api
+
+
+@pytest.mark.parametrize("url, template", [
+    ("user/42", "user/{id}"),
+    ("user/42/change-mac/7", "user/{id}/change-mac/{id}"),
+    ("user/from-ip", "user/from-ip"),
+    ("register", "register"),
+])
+def test_endpoint_template(url, template):
+    assert endpoint_template(url) == template
+
+
+def test_default_timeout_passed(api):
+    api.get_user("42")
+    assert api.session.get.call_args.kwargs["timeout"] == (1, 3)
+
+
+def test_endpoint_timeout_passed(api):
+    api.authenticate("user", "password")
+    assert api.session.post.call_args.kwargs["timeout"] == (1, 5)
+
+
+@pytest.mark.parametrize("error", [ConnectionError, ConnectTimeout])
+def test_get_retried_after_connection_error(api, error):
+    api.session.get.side_effect = [error, response(json={"id": 42})]
+    assert api.get_user("42") == (200, {"id": 42})
+    assert api.session.get.call_count == 2
+    assert api.counters["retries"] == 1
+
+
+def test_get_retried_after_unavailable(api):
+    api.session.get.side_effect = [response(503), response(json={"id": 42})]
+    assert api.get_user("42") == (200, {"id": 42})
+
+
+def test_retries_bounded(api):
+    api.session.get.side_effect = ConnectionError
+    with pytest.raises(PycroftBackendError):
+        api.get_user("42")
+    assert api.session.get.call_count == 3
+
+
+def test_read_timeout_not_retried(api):
+    api.session.get.side_effect = ReadTimeout
+    with pytest.raises(PycroftBackendError):
+        api.get_user("42")
+    assert api.session.get.call_count == 1
+    assert api.counters["timeouts"] == 1
+
+
+def test_post_not_retried(api):
+    api.session.post.side_effect = ConnectionError
+    with pytest.raises(PycroftBackendError):
+        api.authenticate("user", "password")
+    assert api.session.post.call_count == 1
+
+
+def test_pool_stats_empty():
+    assert PycroftApi(endpoint=ENDPOINT, api_key="secret").pool_stats() == {}
+
+
+def test_pool_size():
+    api = PycroftApi(endpoint=ENDPOINT, api_key="secret", pool_maxsize=3)
+    assert api.session.get_adapter(ENDPOINT + "user/1")._pool_maxsize == 3
+
+
+@pytest.mark.parametrize("hedge_delay, pool_size", [(None, 4), (0.1, 8)])
+def test_pool_sized_for_hedged_calls(hedge_delay, pool_size):
+    app = Flask(__name__)
+    app.config.from_object(default)
+    app.config.update(PYCROFT_POOL_SIZE=4, PYCROFT_HEDGE_DELAY=hedge_delay)
+    init_pycroft_api(app)
+    api: PycroftApi = app.extensions["pycroft_api"]
+    adapter = api.session.get_adapter(app.config["PYCROFT_ENDPOINT"] + "user/1")
+    assert adapter._pool_maxsize == pool_size
+    if api.hedger is not None:
+        assert api.hedger.max_workers == pool_size
+
+
+@pytest.fixture
+def guarded_api(api) -> PycroftApi:
+    api.retries = 0
+    api.circuit_breaker = CircuitBreaker(failure_threshold=0.5, window_size=2,
+                                         min_calls=2, cooldown=60)
+    return api
+
+
+def test_circuit_opens_on_connection_errors(guarded_api):
+    guarded_api.session.get.side_effect = ConnectionError
+    for _ in range(2):
+        with pytest.raises(PycroftBackendError):
+            guarded_api.get_user("42")
+    assert guarded_api.circuit_breaker.state is CircuitState.OPEN
+
+    guarded_api.session.get.reset_mock()
+    with pytest.raises(PycroftCircuitOpenError):
+        guarded_api.get_user("42")
+    guarded_api.session.get.assert_not_called()
+    assert guarded_api.counters["short_circuited"] == 1
+
+
+def test_circuit_opens_on_server_errors(guarded_api):
+    guarded_api.session.get.return_value = response(500)
+    guarded_api.session.get.return_value.raise_for_status.side_effect = HTTPError
+    for _ in range(2):
+        with pytest.raises(PycroftBackendError):
+            guarded_api.get_user("42")
+    assert guarded_api.circuit_breaker.state is CircuitState.OPEN
+
+
+def test_client_errors_do_not_open_circuit(guarded_api):
+    guarded_api.session.get.return_value = response(404)
+    for _ in range(3):
+        assert guarded_api.get_user("42")[0] == 404
+    assert guarded_api.circuit_breaker.state is CircuitState.CLOSED
+
+
+def test_get_with_side_effects_not_retried(api):
+    api.session.get.side_effect = ConnectionError
+    with pytest.raises(PycroftBackendError):
+        api.resend_confirm_email(42)
+    assert api.session.get.call_count == 1
+
+
+def test_get_with_side_effects_not_coalesced(api):
+    with patch.object(api._get_flight, "do") as do:
+        assert api.resend_confirm_email(42)
+    do.assert_not_called()
+    api.session.get.assert_called_once()
+
+
+def test_leader_deadline_not_shared(api):
+    with Flask(__name__).test_request_context():
+        g.deadline = Deadline(10)
+        with patch.object(api._get_flight, "do", side_effect=DeadlineExceeded):
+            assert api.get_user("42") == (200, {})
+    api.session.get.assert_called_once()
+
+
+def test_unexpected_client_errors_do_not_open_circuit(guarded_api):
+    guarded_api.session.get.return_value = response(409)
+    guarded_api.session.get.return_value.raise_for_status.side_effect = HTTPError
+    for _ in range(3):
+        with pytest.raises(PycroftBackendError):
+            guarded_api.get_user("42")
+    assert guarded_api.circuit_breaker.state is CircuitState.CLOSED
+
+
+def test_timeout_at_deadline_does_not_open_circuit(guarded_api):
+    guarded_api.session.get.side_effect = ReadTimeout
+    for _ in range(3):
+        with Flask(__name__).test_request_context():
+            g.deadline = Deadline(0.5)
+            with pytest.raises(PycroftBackendError) as e:
+                guarded_api.get_user("42")
+        assert not isinstance(e.value, PycroftUnavailableError)
+    assert guarded_api.circuit_breaker.state is CircuitState.CLOSED
+
+
+def test_timeout_within_deadline_opens_circuit(guarded_api):
+    guarded_api.session.get.side_effect = ReadTimeout
+    for _ in range(2):
+        with Flask(__name__).test_request_context():
+            g.deadline = Deadline(60)
+            with pytest.raises(PycroftUnavailableError):
+                guarded_api.get_user("42")
+    assert guarded_api.circuit_breaker.state is CircuitState.OPEN
+
+
+def test_deadline_exceeded_does_not_open_circuit(guarded_api):
+    deadline = MagicMock(spec=Deadline)
+    deadline.timeout.side_effect = DeadlineExceeded
+    for _ in range(3):
+        with Flask(__name__).test_request_context():
+            g.deadline = deadline
+            with pytest.raises(DeadlineExceeded):
+                guarded_api.authenticate("user", "password")
+    assert guarded_api.circuit_breaker.state is CircuitState.CLOSED
+    assert guarded_api.circuit_breaker.failure_rate == 0
+
+
+def test_get_key_includes_params(api):
+    api.get("user/from-ip", params={"ip": "10.0.0.1"}, read_only=True)
+    api.get("user/from-ip", params={"ip": "10.0.0.2"}, read_only=True)
+    assert api.session.get.call_count == 2
+    assert api._get_flight.in_flight() == 0
+
+
+def test_user_lookups_hedged(api):
+    api.hedger = MagicMock(spec=Hedger)
+    api.hedger.call.return_value = (200, {"id": 42})
+    assert api.get_user("42") == (200, {"id": 42})
+    assert api.hedger.call.call_args.args[0] == "user/{id}"
+
+
+def test_other_gets_not_hedged(api):
+    api.hedger = MagicMock(spec=Hedger)
+    api.get("finance/bank-account")
+    api.hedger.call.assert_not_called()
+
+
+def test_request_metrics_recorded(api):
+    api.get_user("42")
+    api.session.get.side_effect = ReadTimeout
+    with pytest.raises(PycroftBackendError):
+        api.get_user("42")
+
+    requests = api.metrics.requests
+    assert requests.count(endpoint="user/{id}", method="GET", status="200") == 1
+    assert requests.count(endpoint="user/{id}", method="GET", status="timeout") == 1
+    assert api.metrics.decode.count(endpoint="user/{id}", method="GET") == 1
+
+
+def test_timeout_shrunk_to_deadline(api):
+    with Flask(__name__).test_request_context():
+        g.deadline = Deadline(0.5)
+        api.get_user("42")
+    connect, read = api.session.get.call_args.kwargs["timeout"]
+    assert connect <= 0.5 and read <= 0.5
+
+
+def test_expired_deadline_fails_fast(api):
+    with Flask(__name__).test_request_context():
+        g.deadline = Deadline(0)
+        with pytest.raises(DeadlineExceeded):
+            api.authenticate("user", "password")
+    api.session.post.assert_not_called()
+
+
+def test_custom_json_loads(api):
+    api.json_loads = lambda content: {"decoded": content}
+    api.session.get.return_value.content = b"{}"
+    assert api.get_user("42") == (200, {"decoded": b"{}"})
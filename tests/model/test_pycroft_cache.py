@@ -0,0 +1,186 @@
+from unittest.mock import patch
+
+import pytest
+
+from sipa.model.pycroft.cache import IpMissCache, UserDataCache
+from sipa.model.pycroft.exc import PycroftBackendError
+from sipa.model.pycroft.schema import UserData
+from sipa.model.pycroft.user import User
+from .conftest import pycroft_user_json
+
+
+@pytest.fixture
+def user_data() -> UserData:
+    return UserData.model_validate(pycroft_user_json(id=3))
+
+
+class TestUserDataCache:
+    def test_miss(self):
+        assert UserDataCache(maxsize=8, ttl=60).get(3) is None
+
+    def test_hit_returns_copy(self, user_data):
+        cache = UserDataCache(maxsize=8, ttl=60)
+        cache.set(user_data)
+        cached = cache.get("3")
+        assert cached == user_data
+        cached.mail = "other@example.com"
+        assert cache.get(3).mail == user_data.mail
+
+    def test_invalidate(self, user_data):
+        cache = UserDataCache(maxsize=8, ttl=60)
+        cache.set(user_data)
+        cache.invalidate(3)
+        assert cache.get(3) is None
+
+    def test_lru_eviction(self):
+        cache = UserDataCache(maxsize=2, ttl=60)
+        for id in (1, 2):
+            cache.set(UserData.model_validate(pycroft_user_json(id=id)))
+        cache.get(1)
+        cache.set(UserData.model_validate(pycroft_user_json(id=3)))
+        assert cache.get(1) is not None
+        assert cache.get(2) is None
+
+    def test_expiry(self, user_data):
+        now = [0]
+        cache = UserDataCache(maxsize=8, ttl=30, timer=lambda: now[0])
+        cache.set(user_data)
+        now[0] = 31
+        assert cache.get(3) is None
+
+    @pytest.mark.parametrize("maxsize, ttl", [(0, 30), (8, 0)])
+    def test_disabled(self, user_data, maxsize, ttl):
+        cache = UserDataCache(maxsize=maxsize, ttl=ttl)
+        cache.set(user_data)
+        assert cache.get(3) is None
+        assert len(cache) == 0
+
+
+class TestUserGetCaching:
+    def test_second_get_served_from_cache(self, api_mock):
+        assert User.get("1").user_data.id == 1
+        assert User.get("1").user_data.id == 1
+        assert api_mock.get_user.call_count == 1
+
+    def test_write_operation_invalidates(self, api_mock):
+        api_mock.change_mail.return_value = (200, {})
+        user = User.get("1")
+        user.change_mail("password", "new@example.com", mail_forwarded=True)
+        User.get("1")
+        assert api_mock.get_user.call_count == 2
+
+    def test_failed_write_operation_invalidates(self, api_mock):
+        api_mock.reset_wifi_password.return_value = (500, {})
+        user = User.get("1")
+        with pytest.raises(Exception):
+            user.reset_wifi_password()
+        User.get("1")
+        assert api_mock.get_user.call_count == 2
+
+    def test_from_ip_seeds_cache(self, api_mock):
+        api_mock.get_user_from_ip.return_value = (200, pycroft_user_json(id=1))
+        User.from_ip("141.30.228.39")
+        User.get("1")
+        assert not api_mock.get_user.called
+
+
+class TestStaleUserData:
+    def test_stale_outlives_fresh(self, user_data):
+        now = [0]
+        cache = UserDataCache(maxsize=8, ttl=30, max_staleness=600,
+                              timer=lambda: now[0])
+        cache.set(user_data)
+        now[0] = 31
+        assert cache.get(3) is None
+        assert cache.get_stale(3).user_data == user_data
+        now[0] = 601
+        assert cache.get_stale(3) is None
+
+    def test_invalidate_drops_stale(self, user_data):
+        cache = UserDataCache(maxsize=8, ttl=30, max_staleness=600)
+        cache.set(user_data)
+        cache.invalidate(3)
+        assert cache.get_stale(3) is None
+
+    def test_disabled_by_default(self, user_data):
+        cache = UserDataCache(maxsize=8, ttl=30)
+        cache.set(user_data)
+        assert cache.get_stale(3) is None
+
+
+class TestUserGetStaleIfError:
+    @pytest.fixture(autouse=True)
+    def stale_cache(self, pycroft_app):
+        cache = UserDataCache(maxsize=8, ttl=30, max_staleness=600)
+        with patch.dict(pycroft_app.extensions, {"pycroft_user_cache": cache}):
+            yield cache
+
+    def test_stale_data_on_backend_error(self, api_mock, stale_cache):
+        User.get("1")
+        stale_cache._cache.clear()
+        api_mock.get_user.side_effect = PycroftBackendError("down")
+        user = User.get("1")
+        assert user.user_data.id == 1
+        assert user.data_as_of is not None
+
+    def test_fresh_data_has_no_date(self, api_mock):
+        assert User.get("1").data_as_of is None
+
+    def test_error_without_stale_data(self, api_mock):
+        api_mock.get_user.side_effect = PycroftBackendError("down")
+        with pytest.raises(PycroftBackendError):
+            User.get("1")
+
+
+class TestIpMissCache:
+    def test_counts_hits_and_misses(self):
+        cache = IpMissCache(maxsize=8, ttl=60)
+        assert "10.0.0.1" not in cache
+        cache.add("10.0.0.1")
+        assert "10.0.0.1" in cache
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_expiry(self):
+        now = [0]
+        cache = IpMissCache(maxsize=8, ttl=60, timer=lambda: now[0])
+        cache.add("10.0.0.1")
+        now[0] = 61
+        assert "10.0.0.1" not in cache
+
+    def test_disabled(self):
+        cache = IpMissCache(maxsize=0, ttl=60)
+        cache.add("10.0.0.1")
+        assert "10.0.0.1" not in cache
+
+
+class TestUserFromIpMisses:
+    def test_miss_cached(self, api_mock):
+        for _ in range(3):
+            assert not User.from_ip("141.30.228.1").is_authenticated
+        assert api_mock.get_user_from_ip.call_count == 1
+
+    def test_hit_not_cached_as_miss(self, api_mock):
+        api_mock.get_user_from_ip.return_value = (200, pycroft_user_json(id=1))
+        User.from_ip("141.30.228.39")
+        User.from_ip("141.30.228.39")
+        assert api_mock.get_user_from_ip.call_count == 2
+
+    @pytest.mark.parametrize("status", [401, 500])
+    def test_other_statuses_not_cached(self, api_mock, status):
+        api_mock.get_user_from_ip.return_value = (status, {})
+        User.from_ip("141.30.228.1")
+        User.from_ip("141.30.228.1")
+        assert api_mock.get_user_from_ip.call_count == 2
+
+    @pytest.mark.parametrize("method, args", [
+        ("activate_network_access",
+         ("password", "aa:bb:cc:dd:ee:00", "2000-01-01", "host")),
+        ("change_mac_address", ("aa:bb:cc:dd:ee:00", "host", "password")),
+    ])
+    def test_network_changes_forget_misses(self, api_mock, method, args):
+        api_mock.activate_network_access.return_value = (200, {})
+        api_mock.change_mac.return_value = (200, {})
+        User.from_ip("141.30.228.1")
+        getattr(User.get("1"), method)(*args)
+        User.from_ip("141.30.228.1")
+        assert api_mock.get_user_from_ip.call_count == 2
@@ -0,0 +1,50 @@
+import pytest
+
+from sipa.backends import identity_map
+from sipa.backends.extension import backends
+from sipa.model.exceptions import LoginNotAllowed, PasswordInvalid
+from sipa.model.pycroft.user import User
+from .conftest import pycroft_user_json
+
+
+def test_full_user_data_used(api_mock):
+    api_mock.authenticate.return_value = (200, pycroft_user_json(id=1))
+    user = User.authenticate("user1", "password")
+    assert user.user_data.login == "user1"
+    assert not api_mock.get_user.called
+
+
+def test_full_user_data_seeds_cache(api_mock):
+    api_mock.authenticate.return_value = (200, pycroft_user_json(id=1))
+    User.authenticate("user1", "password")
+    User.get("1")
+    assert not api_mock.get_user.called
+
+
+def test_falls_back_to_fetching_user(api_mock):
+    api_mock.authenticate.return_value = (200, {"id": 1})
+    user = User.authenticate("user1", "password")
+    assert user.user_data.id == 1
+    api_mock.get_user.assert_called_once_with(1)
+
+
+def test_login_permission_checked(api_mock):
+    api_mock.authenticate.return_value = (
+        200, pycroft_user_json(id=1, properties=["member"]),
+    )
+    with pytest.raises(LoginNotAllowed):
+        User.authenticate("user1", "password")
+
+
+def test_wrong_password(api_mock):
+    api_mock.authenticate.return_value = (401, {})
+    with pytest.raises(PasswordInvalid):
+        User.authenticate("user1", "password")
+
+
+def test_remembered_user_not_loaded_again(api_mock):
+    api_mock.authenticate.return_value = (200, pycroft_user_json(id=1))
+    user = User.authenticate("user1", "password")
+    backends.remember_user(user)
+    assert backends.user_from_id("1") is user
+    assert identity_map.request_identity_map().saved_calls == 1
@@ -0,0 +1,124 @@
+import random
+from ipaddress import IPv4Address, ip_address, ip_network
+
+import pytest
+
+from sipa.backends import DataSource, Dormitory
+from sipa.backends.datasource import SubnetIndex, SubnetCollection
+from sipa.model.pycroft import datasource as pycroft_datasource
+
+
+@pytest.fixture(scope="module")
+def index() -> SubnetIndex[str]:
+    return SubnetIndex([
+        (ip_network("141.30.228.0/24"), "wu"),
+        (ip_network("141.30.226.0/23"), "zw"),
+        (ip_network("141.30.234.128/26"), "zeu"),
+        (ip_network("141.30.234.192/27"), "zeu"),
+        (ip_network("2001:db8:1::/48"), "v6"),
+    ])
+
+
+@pytest.mark.parametrize("ip, expected", [
+    ("141.30.228.0", "wu"),
+    ("141.30.228.255", "wu"),
+    ("141.30.227.17", "zw"),
+    ("141.30.234.200", "zeu"),
+    ("141.30.234.127", None),
+    ("141.30.234.224", None),
+    ("141.30.229.1", None),
+    ("0.0.0.0", None),
+    ("2001:db8:1:ffff::1", "v6"),
+    ("2001:db8:2::1", None),
+    # the integer value of 141.30.228.39, which must not match the IPv4 range
+    ("::8d1e:e427", None),
+])
+def test_lookup(index, ip, expected):
+    assert index.lookup(ip_address(ip)) == expected
+
+
+def test_overlapping_networks_of_same_value_merged():
+    index = SubnetIndex([
+        (ip_network("10.0.0.0/16"), "a"),
+        (ip_network("10.0.1.0/24"), "a"),
+    ])
+    assert len(index) == 1
+    assert index.lookup(ip_address("10.0.255.1")) == "a"
+
+
+@pytest.mark.parametrize("entries, expected", [
+    ([("10.0.0.0/16", "a"), ("10.0.1.0/24", "b")],
+     {"10.0.0.1": "a", "10.0.1.1": "a", "10.0.2.1": "a"}),
+    ([("10.0.1.0/24", "b"), ("10.0.0.0/16", "a")],
+     {"10.0.0.1": "a", "10.0.1.1": "b", "10.0.2.1": "a"}),
+])
+def test_first_overlapping_network_wins(entries, expected):
+    index = SubnetIndex([(ip_network(net), value) for net, value in entries])
+    for ip, value in expected.items():
+        assert index.lookup(ip_address(ip)) == value
+
+
+def test_agrees_with_linear_search():
+    rng = random.Random(0)
+    entries = [
+        (ip_network(f"10.0.{rng.randrange(16)}.0/{rng.randrange(20, 25)}",
+                    strict=False), rng.choice("abc"))
+        for _ in range(30)
+    ]
+    index = SubnetIndex(entries)
+    for ip in range(int(IPv4Address("10.0.0.0")), int(IPv4Address("10.0.20.0")), 7):
+        address = IPv4Address(ip)
+        first = next((value for network, value in entries if address in network),
+                     None)
+        assert index.lookup(address) == first
+
+
+def test_collection_ignores_other_ip_version():
+    collection = SubnetCollection([ip_network("141.30.228.0/24")])
+    assert ip_address("141.30.228.39") in collection
+    assert ip_address("::8d1e:e427") not in collection
+
+
+class TestDataSourceLookup:
+    @pytest.fixture(scope="class")
+    def datasource(self) -> DataSource:
+        return DataSource(
+            name="test",
+            user_class=object,
+            mail_server="",
+            dormitories=[
+                Dormitory(name="v4", display_name="",
+                          subnets=SubnetCollection([ip_network("141.30.228.0/24")])),
+                Dormitory(name="v6", display_name="",
+                          subnets=SubnetCollection([ip_network("2001:db8::/32")])),
+            ],
+        )
+
+    @pytest.mark.parametrize("ip, name", [
+        ("141.30.228.39", "v4"),
+        ("::ffff:141.30.228.39", "v4"),
+        ("2001:db8::1", "v6"),
+    ])
+    def test_lookup(self, datasource, ip, name):
+        assert datasource.dormitory_from_ip(ip).name == name
+
+    @pytest.mark.parametrize("ip", ["141.30.229.1", "not an ip", "", None])
+    def test_lookup_misses(self, datasource, ip):
+        assert datasource.dormitory_from_ip(ip) is None
+
+    def test_first_of_overlapping_dormitories_wins(self):
+        subnets = SubnetCollection([ip_network("10.0.0.0/8")])
+        datasource = DataSource(name="test", user_class=object, mail_server="",
+                                dormitories=[
+                                    Dormitory(name="a", display_name="", subnets=subnets),
+                                    Dormitory(name="b", display_name="", subnets=subnets),
+                                ])
+        assert datasource.dormitory_from_ip("10.1.2.3").name == "a"
+
+
+@pytest.mark.parametrize("dormitory", pycroft_datasource.dormitories,
+                         ids=lambda d: d.name)
+def test_pycroft_index_agrees_with_subnets(dormitory):
+    for subnet in dormitory.subnets.subnets:
+        for address in (subnet.network_address, subnet.broadcast_address):
+            assert pycroft_datasource.dormitory_from_ip(address) == dormitory
@@ -0,0 +1,86 @@
+import hashlib
+
+import pytest
+from flask import Flask, url_for
+
+from sipa import assets
+from sipa.assets import AssetManifest
+
+from .fixture_helpers import DEFAULT_TESTING_CONFIG, make_testing_app
+
+
+def short_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:assets.HASH_LENGTH]
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_text("body {}")
+    return tmp_path
+
+
+class TestAssetManifest:
+    def test_hashes(self, static_dir):
+        manifest = AssetManifest(str(static_dir))
+        assert manifest.get("css/style.css") == short_hash(b"body {}")
+        assert manifest.get("css/missing.css") is None
+
+    def test_changes_are_ignored(self, static_dir):
+        manifest = AssetManifest(str(static_dir))
+        (static_dir / "css" / "style.css").write_text("p {}")
+        assert manifest.get("css/style.css") == short_hash(b"body {}")
+
+    def test_changes_are_checked(self, static_dir):
+        manifest = AssetManifest(str(static_dir), check_changes=True)
+        (static_dir / "css" / "style.css").write_text("p {}")
+        assert manifest.get("css/style.css") == short_hash(b"p {}")
+
+
+@pytest.fixture(scope="module")
+def app() -> Flask:
+    return make_testing_app(DEFAULT_TESTING_CONFIG | {"BACKEND": "sample"})
+
+
+@pytest.fixture
+def css_url(app) -> str:
+    with app.test_request_context():
+        return url_for("static", filename="css/style.css")
+
+
+def test_url_has_hash(app, css_url):
+    with open(f"{app.static_folder}/css/style.css", "rb") as f:
+        assert css_url.endswith(f"?v={short_hash(f.read())}")
+
+
+def test_url_of_unknown_file(app):
+    with app.test_request_context():
+        assert url_for("static", filename="missing.css") == "/static/missing.css"
+
+
+def test_pages_use_hashed_urls(app):
+    response = app.test_client().get("/news/")
+    assert "css/style.css?v=" in response.text
+
+
+def test_hashed_url_is_immutable(app, css_url):
+    response = app.test_client().get(css_url)
+    assert response.status_code == 200
+    assert response.cache_control.immutable
+    assert response.cache_control.public
+    assert response.cache_control.max_age == assets.IMMUTABLE_MAX_AGE
+
+
+@pytest.mark.parametrize("query", ["", "?v=0123456789ab"])
+def test_other_urls_are_revalidated(app, query):
+    response = app.test_client().get(f"/static/css/style.css{query}")
+    assert response.status_code == 200
+    assert not response.cache_control.immutable
+
+
+def test_disabled():
+    app = make_testing_app(DEFAULT_TESTING_CONFIG | {
+        "BACKEND": "sample", "STATIC_ASSET_HASHING": False,
+    })
+    with app.test_request_context():
+        assert url_for("static", filename="css/style.css") == "/static/css/style.css"
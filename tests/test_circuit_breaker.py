@@ -0,0 +1,95 @@
+import pytest
+
+from sipa.utils.circuit_breaker import CircuitBreaker, CircuitState
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock) -> CircuitBreaker:
+    return CircuitBreaker(failure_threshold=0.5, window_size=4, min_calls=4,
+                          cooldown=10, clock=clock)
+
+
+def fail(breaker: CircuitBreaker, times: int = 1):
+    for _ in range(times):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+
+def test_stays_closed_below_min_calls(breaker):
+    fail(breaker, 3)
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_stays_closed_below_threshold(breaker):
+    for _ in range(3):
+        breaker.record_success()
+    fail(breaker)
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.failure_rate == 0.25
+
+
+def test_opens_at_threshold(breaker):
+    breaker.record_success()
+    breaker.record_success()
+    fail(breaker, 2)
+    assert breaker.state is CircuitState.OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejected_calls == 1
+
+
+def test_half_open_after_cooldown(breaker, clock):
+    fail(breaker, 4)
+    clock.now = 10
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+    # only a single probe at a time
+    assert not breaker.allow_request()
+
+
+def test_successful_probe_closes(breaker, clock):
+    fail(breaker, 4)
+    clock.now = 10
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.failure_rate == 0
+
+
+def test_failed_probe_reopens(breaker, clock):
+    fail(breaker, 4)
+    clock.now = 10
+    fail(breaker)
+    assert breaker.state is CircuitState.OPEN
+    clock.now = 19
+    assert not breaker.allow_request()
+    clock.now = 20
+    assert breaker.allow_request()
+
+
+def test_released_probe_frees_slot(breaker, clock):
+    fail(breaker, 4)
+    clock.now = 10
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_release_records_no_outcome(breaker):
+    for _ in range(4):
+        assert breaker.allow_request()
+        breaker.release()
+    assert breaker.failure_rate == 0
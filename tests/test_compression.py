@@ -0,0 +1,178 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask
+
+from sipa import compression
+from sipa.compression import compress_directory
+
+from .fixture_helpers import DEFAULT_TESTING_CONFIG, make_testing_app
+
+CSS = b"body { color: black; }\n" * 200
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_bytes(CSS)
+    (tmp_path / "css" / "small.css").write_bytes(b"p {}")
+    (tmp_path / "logo.png").write_bytes(os.urandom(4096))
+    return tmp_path
+
+
+class TestCompressDirectory:
+    def test_writes_siblings(self, static_dir):
+        assert compress_directory(str(static_dir)) == len(compression.ENCODINGS)
+        assert gzip.decompress((static_dir / "css" / "style.css.gz").read_bytes()) == CSS
+
+    def test_skips_small_and_incompressible_files(self, static_dir):
+        compress_directory(str(static_dir))
+        assert not (static_dir / "css" / "small.css.gz").exists()
+        assert not (static_dir / "logo.png.gz").exists()
+
+    def test_skips_up_to_date_siblings(self, static_dir):
+        compress_directory(str(static_dir))
+        assert compress_directory(str(static_dir)) == 0
+
+    def test_rewrites_outdated_siblings(self, static_dir):
+        compress_directory(str(static_dir))
+        style = static_dir / "css" / "style.css"
+        style.write_bytes(CSS * 2)
+        mtime = os.path.getmtime(style) + 1
+        os.utime(style, (mtime, mtime))
+        assert compress_directory(str(static_dir)) == len(compression.ENCODINGS)
+        assert gzip.decompress((static_dir / "css" / "style.css.gz").read_bytes()) \
+            == CSS * 2
+
+
+@pytest.fixture
+def static_app(static_dir) -> Flask:
+    compress_directory(str(static_dir))
+    app = Flask(__name__, static_folder=str(static_dir), static_url_path="/static")
+    app.config["COMPRESS_RESPONSES"] = False
+    compression.init_app(app)
+    return app
+
+
+class TestStaticFiles:
+    def test_sends_gzip_sibling(self, static_app):
+        response = static_app.test_client().get(
+            "/static/css/style.css", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert response.content_encoding == "gzip"
+        assert response.mimetype == "text/css"
+        assert "Accept-Encoding" in response.vary
+        assert gzip.decompress(response.data) == CSS
+
+    def test_sends_original_without_accept_encoding(self, static_app):
+        response = static_app.test_client().get(
+            "/static/css/style.css", headers={"Accept-Encoding": "identity"}
+        )
+        assert response.content_encoding is None
+        assert "Accept-Encoding" in response.vary
+        assert response.data == CSS
+
+    def test_ignores_outdated_sibling(self, static_app, static_dir):
+        style = static_dir / "css" / "style.css"
+        mtime = os.path.getmtime(style) + 1
+        os.utime(style, (mtime, mtime))
+        response = static_app.test_client().get(
+            "/static/css/style.css", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.content_encoding is None
+        assert response.data == CSS
+
+    def test_file_without_siblings(self, static_app):
+        response = static_app.test_client().get(
+            "/static/css/small.css", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.content_encoding is None
+        assert "Accept-Encoding" not in response.vary
+
+    def test_missing_file(self, static_app):
+        response = static_app.test_client().get("/static/missing.css")
+        assert response.status_code == 404
+
+
+PAGE = "<p>" + "Lorem ipsum dolor sit amet. " * 100 + "</p>"
+
+
+@pytest.fixture
+def dynamic_app() -> Flask:
+    app = Flask(__name__)
+    app.config.update(COMPRESS_RESPONSES=True, COMPRESS_MIN_SIZE=1024,
+                      COMPRESS_LEVEL=1)
+    compression.init_app(app)
+
+    @app.route("/page")
+    def page():
+        response = app.make_response(PAGE)
+        response.set_etag("abc")
+        return response
+
+    @app.route("/short")
+    def short():
+        return "<p>short</p>"
+
+    @app.route("/text")
+    def text():
+        return app.response_class(PAGE, mimetype="text/plain")
+
+    return app
+
+
+class TestCompressResponse:
+    def test_compresses_html(self, dynamic_app):
+        response = dynamic_app.test_client().get(
+            "/page", headers={"Accept-Encoding": "gzip, deflate"}
+        )
+        assert response.content_encoding == "gzip"
+        assert "Accept-Encoding" in response.vary
+        assert gzip.decompress(response.data).decode() == PAGE
+        assert response.get_etag() == ("abc", True)
+
+    def test_not_without_accept_encoding(self, dynamic_app):
+        response = dynamic_app.test_client().get("/page")
+        assert response.content_encoding is None
+        assert "Accept-Encoding" in response.vary
+        assert response.get_etag() == ("abc", False)
+
+    @pytest.mark.parametrize("path", ["/short", "/text"])
+    def test_not_small_or_other_responses(self, dynamic_app, path):
+        response = dynamic_app.test_client().get(
+            path, headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.content_encoding is None
+
+
+def test_sipa_pages_are_compressed():
+    app = make_testing_app(DEFAULT_TESTING_CONFIG | {
+        "BACKEND": "sample", "COMPRESS_RESPONSES": True,
+    })
+    response = app.test_client().get("/news/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.content_encoding == "gzip"
+    assert "</html>" in gzip.decompress(response.data).decode()
+
+
+def test_compressed_page_is_revalidated(content):
+    app = make_testing_app(DEFAULT_TESTING_CONFIG | {
+        "BACKEND": "sample",
+        "FLATPAGES_ROOT": str(content),
+        "COMPRESS_RESPONSES": True,
+    })
+    client = app.test_client()
+    response = client.get("/news/", headers={"Accept-Encoding": "gzip"})
+    assert response.content_encoding == "gzip"
+    etag, weak = response.get_etag()
+    assert weak
+    response = client.get("/news/", headers={"Accept-Encoding": "gzip",
+                                             "If-None-Match": f'W/"{etag}"'})
+    assert response.status_code == 304
+
+
+def test_sipa_static_files_use_compression_view():
+    app = make_testing_app(DEFAULT_TESTING_CONFIG | {"BACKEND": "sample"})
+    assert app.view_functions["static"] is compression.send_static_file
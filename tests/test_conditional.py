@@ -0,0 +1,119 @@
+from pathlib import Path
+
+import pytest
+from flask import Flask, before_render_template
+
+from sipa.conditional import current_release
+
+from .fixture_helpers import DEFAULT_TESTING_CONFIG, commit_pages, make_testing_app
+
+
+def make_app(content: Path, **config) -> Flask:
+    return make_testing_app(DEFAULT_TESTING_CONFIG | {
+        "BACKEND": "sample",
+        "FLATPAGES_ROOT": str(content),
+    } | config)
+
+
+@pytest.fixture
+def app(content):
+    return make_app(content)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_page_has_validators(client):
+    response = client.get("/news/")
+    assert response.get_etag() == (response.get_etag()[0], False)
+    assert response.last_modified is not None
+    assert {"Accept-Language", "Cookie"} <= set(response.vary)
+
+
+def test_not_modified(client):
+    etag, _ = client.get("/news/").get_etag()
+    response = client.get("/news/", headers={"If-None-Match": f'"{etag}"'})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.get_etag()[0] == etag
+    assert "Content-Security-Policy" not in response.headers
+
+
+def test_not_modified_since(client):
+    last_modified = client.get("/news/").headers["Last-Modified"]
+    response = client.get("/news/", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+
+def test_answered_before_rendering(app, client):
+    etag, _ = client.get("/news/").get_etag()
+    rendered = []
+    with before_render_template.connected_to(
+            lambda *a, **kw: rendered.append(kw), app):
+        client.get("/news/", headers={"If-None-Match": f'"{etag}"'})
+    assert rendered == []
+
+
+def test_etag_depends_on_locale(client):
+    german, _ = client.get("/news/", headers={"Accept-Language": "de"}).get_etag()
+    english, _ = client.get("/news/", headers={"Accept-Language": "en"}).get_etag()
+    assert german != english
+
+
+def test_etag_changes_with_content(app, client, content):
+    etag, _ = client.get("/news/").get_etag()
+    commit_pages(content, {"news/second.de.md": "title: Zweite\ndate: 2024-02-01\n\n"})
+    app.cf_pages.refresh()
+    response = client.get("/news/", headers={"If-None-Match": f'"{etag}"'})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+
+
+def test_no_validators_with_session(client):
+    client.set_cookie("session", "foo", domain="localhost.localdomain")
+    assert client.get("/news/").get_etag() == (None, None)
+
+
+def test_no_validators_for_other_views(client):
+    assert client.get("/login").get_etag() == (None, None)
+
+
+def test_served_from_page_cache(content):
+    app = make_app(content, PAGE_CACHE_SIZE=1 << 20)
+    with app.test_client() as client:
+        etag, _ = client.get("/news/").get_etag()
+        response = client.get("/news/")
+        assert app.extensions["page_cache"].hits == 1
+        assert response.get_etag()[0] == etag
+
+
+class TestRelease:
+    @pytest.fixture
+    def root(self, tmp_path):
+        (tmp_path / "templates").mkdir()
+        (tmp_path / "templates" / "base.html").write_text("base")
+        (tmp_path / "static").mkdir()
+        (tmp_path / "static" / "style.css").write_text("css")
+        return tmp_path
+
+    def test_stable(self, root):
+        assert current_release(str(root)) == current_release(str(root))
+
+    def test_changes_with_templates(self, root):
+        release = current_release(str(root))
+        (root / "templates" / "base.html").write_text("changed")
+        assert current_release(str(root)).token != release.token
+
+    def test_changes_with_static_files(self, root):
+        # the pages link to them by their hash
+        release = current_release(str(root))
+        (root / "static" / "style.css").write_text("changed")
+        assert current_release(str(root)).token != release.token
+
+    def test_ignores_bytecode(self, root):
+        release = current_release(str(root))
+        (root / "__pycache__").mkdir()
+        (root / "__pycache__" / "module.pyc").write_text("bytecode")
+        assert current_release(str(root)) == release
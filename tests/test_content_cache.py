@@ -0,0 +1,96 @@
+from unittest.mock import patch
+
+import pytest
+from flask_flatpages import FlatPages
+
+from sipa.content_cache import CachedPage, ContentCache
+
+from .fixture_helpers import SAMPLE_PAGES, commit_pages, make_cf_pages, write_pages
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return tmp_path / "cache"
+
+
+def make_cached_cf_pages(content, cache_dir, **config):
+    return make_cf_pages(content, CONTENT_CACHE_DIR=str(cache_dir), **config)
+
+
+def cache_files(cache_dir):
+    return sorted(p.name for p in cache_dir.glob("pages-*.pickle"))
+
+
+def test_first_start_fills_cache(content, cache_dir):
+    make_cached_cf_pages(content, cache_dir)
+    assert len(cache_files(cache_dir)) == 1
+
+
+def test_second_start_loads_cache(content, cache_dir):
+    filled = make_cached_cf_pages(content, cache_dir)
+    with patch.object(FlatPages, "_parse", autospec=True) as parse:
+        cached = make_cached_cf_pages(content, cache_dir)
+    parse.assert_not_called()
+
+    page = cached.flat_pages.get("news/first.en")
+    assert isinstance(page, CachedPage)
+    assert page.meta["title"] == "First news"
+    with cached.app.test_request_context():
+        assert page.html == filled.flat_pages.get("news/first.en").html
+
+    assert cached.root_category.categories.keys() == {"news", "about"}
+    assert [a.id for a in cached.get_articles_of_category("news")] == ["first"]
+    assert cached.get("about", "broken").localized_pages == {}
+
+
+def test_other_script_root_is_rendered_again(content, cache_dir):
+    make_cached_cf_pages(content, cache_dir)
+    cf_pages = make_cached_cf_pages(content, cache_dir)
+    page = cf_pages.flat_pages.get("news/first.en")
+    with cf_pages.app.test_request_context(base_url="http://localhost/sipa/"):
+        assert 'href="/sipa/pages/about"' in page.html
+
+
+def test_new_commit_replaces_cache(content, cache_dir):
+    make_cached_cf_pages(content, cache_dir)
+    [before] = cache_files(cache_dir)
+
+    commit_pages(content, {"news/second.en.md": "title: Second news\n\nNews!\n"})
+    cf_pages = make_cached_cf_pages(content, cache_dir)
+
+    [after] = cache_files(cache_dir)
+    assert after != before
+    assert cf_pages.get("news", "second") is not None
+
+
+def test_render_config_is_part_of_key(content, cache_dir):
+    make_cached_cf_pages(content, cache_dir)
+    [before] = cache_files(cache_dir)
+    make_cached_cf_pages(content, cache_dir, FLATPAGES_MARKDOWN_EXTENSIONS=["sane_lists"])
+    [after] = cache_files(cache_dir)
+    assert after != before
+
+
+def test_dirty_content_is_not_cached(content, cache_dir):
+    write_pages(content, {"news/draft.en.md": "title: Draft\n\nNot committed\n"})
+    cf_pages = make_cached_cf_pages(content, cache_dir)
+    assert cache_files(cache_dir) == []
+    assert cf_pages.get("news", "draft") is not None
+
+
+def test_no_git_repository(tmp_path, cache_dir):
+    root = tmp_path / "plain"
+    root.mkdir()
+    write_pages(root, SAMPLE_PAGES)
+    assert ContentCache(str(cache_dir)).path(
+        make_cached_cf_pages(root, cache_dir).flat_pages) is None
+
+
+def test_corrupt_cache_is_ignored(content, cache_dir):
+    make_cached_cf_pages(content, cache_dir)
+    [name] = cache_files(cache_dir)
+    (cache_dir / name).write_bytes(b"garbage")
+    cf_pages = make_cached_cf_pages(content, cache_dir)
+    assert cf_pages.get("news", "first") is not None
+    # and it has been replaced
+    assert (cache_dir / name).read_bytes() != b"garbage"
@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from flask import Flask, g
+
+from sipa.model.pycroft.userdb import UserDB
+from sipa.utils import _fetch_meetings, meetingcal
+from sipa.utils.deadline import (
+    Deadline,
+    DeadlineExceeded,
+    current_deadline,
+    deadline_timeout,
+    request_budget,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def test_remaining(clock):
+    deadline = Deadline(5, clock=clock)
+    clock.now = 2
+    assert deadline.remaining() == 3
+    assert not deadline.expired
+    clock.now = 6
+    assert deadline.remaining() == 0
+    assert deadline.expired
+
+
+def test_timeout_shrunk(clock):
+    deadline = Deadline(5, clock=clock)
+    clock.now = 4
+    assert deadline.timeout(3) == 1
+    assert deadline.timeout(0.5) == 0.5
+    assert deadline.timeout(None) == 1
+
+
+def test_expired_deadline_raises(clock):
+    deadline = Deadline(5, clock=clock)
+    clock.now = 5
+    with pytest.raises(DeadlineExceeded, match="sending mail"):
+        deadline.timeout(3, "sending mail")
+
+
+def test_no_deadline_outside_of_request():
+    assert current_deadline() is None
+    assert deadline_timeout(3) == 3
+
+
+def test_request_deadline(app):
+    with app.test_request_context():
+        app.preprocess_request()
+        assert current_deadline() is None
+        g.deadline = Deadline(0)
+        with pytest.raises(DeadlineExceeded):
+            deadline_timeout(3)
+
+
+@pytest.mark.parametrize("config, harakiri, budget", [
+    ({"REQUEST_DEADLINE": 4}, 8, 4),
+    ({"REQUEST_DEADLINE": None}, 8, 6.5),
+    ({"REQUEST_DEADLINE": None}, None, None),
+])
+def test_request_budget(config, harakiri, budget):
+    app = Flask(__name__)
+    app.config.update({"REQUEST_DEADLINE_MARGIN": 1.5} | config)
+    with patch("sipa.utils.deadline.harakiri_timeout", return_value=harakiri):
+        assert request_budget(app) == budget
+
+
+def test_deadline_exceeded_flashes_and_redirects(app):
+    client = app.test_client()
+    with patch("sipa.blueprints.generic.render_template",
+               side_effect=DeadlineExceeded("test")):
+        resp = client.get("/login")
+    assert resp.status_code == 302
+    with client.session_transaction() as session:
+        assert session["_flashes"][0][0] == "error"
+
+
+@pytest.fixture
+def fetch_calendar():
+    _fetch_meetings.cache.clear()
+    with patch("sipa.utils.try_fetch_calendar",
+               side_effect=DeadlineExceeded("test")) as fetch:
+        yield fetch
+    _fetch_meetings.cache.clear()
+
+
+def test_meetings_empty_after_deadline(app, fetch_calendar):
+    with app.app_context():
+        assert meetingcal() == []
+        fetch_calendar.side_effect = None
+        fetch_calendar.return_value = None
+        assert meetingcal() == []
+    # the exceeded deadline was not cached
+    assert fetch_calendar.call_count == 2
+
+
+def test_meetings_fragment_after_deadline(app, fetch_calendar):
+    client = app.test_client()
+    resp = client.get("/meetings-fragment")
+    assert resp.status_code == 200
+    with client.session_transaction() as session:
+        assert "_flashes" not in session
+
+
+def test_userdb_unknown_after_deadline(app):
+    user = SimpleNamespace(login=SimpleNamespace(value="test"))
+    with patch.dict(app.config, {"DB_HELIOS_IP_MASK": "10.0.0.%"}), \
+            app.test_request_context():
+        g.deadline = Deadline(0)
+        assert UserDB(user).has_db is None
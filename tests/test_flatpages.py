@@ -0,0 +1,174 @@
+from threading import Event
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import g
+from flask_flatpages import FlatPages
+
+from sipa.utils.git_utils import get_head_commit
+
+from .fixture_helpers import (
+    DEFAULT_TESTING_CONFIG,
+    commit_pages,
+    make_cf_pages,
+    make_testing_app,
+    run_git,
+)
+
+
+@pytest.fixture
+def cf_pages(content):
+    return make_cf_pages(content)
+
+
+def test_generation_is_head_commit(cf_pages, content):
+    assert cf_pages.generation == get_head_commit(str(content))
+
+
+def test_refresh_without_new_commit(cf_pages):
+    root_category = cf_pages.root_category
+    assert not cf_pages.refresh()
+    assert cf_pages.root_category is root_category
+
+
+class TestUpdate:
+    @pytest.fixture(autouse=True)
+    def new_commit(self, content, cf_pages):
+        commit_pages(content, {
+            "news/first.en.md": "title: First news, fixed\n\nSee there.\n",
+            "news/second.en.md": "title: Second news\n\nNews!\n",
+        })
+        run_git(content, "rm", "-q", "about/broken.md")
+        run_git(content, "commit", "-q", "-m", "remove broken page")
+
+    def test_only_changed_files_are_parsed(self, cf_pages):
+        with patch.object(FlatPages, "_parse", autospec=True,
+                          side_effect=FlatPages._parse) as parse:
+            assert cf_pages.refresh()
+        assert sorted(call.args[2] for call in parse.call_args_list) \
+            == ["news/first.en", "news/second.en"]
+
+    def test_tree_is_swapped(self, cf_pages, content):
+        old_root = cf_pages.root_category
+        unchanged = cf_pages.flat_pages.get("news/first.de")
+        cf_pages.refresh()
+
+        assert cf_pages.root_category is not old_root
+        assert cf_pages.generation == get_head_commit(str(content))
+        assert cf_pages.get("news", "second") is not None
+        assert cf_pages.get("about", "broken") is None
+        assert cf_pages.flat_pages.get("news/first.en").meta["title"] \
+            == "First news, fixed"
+        assert cf_pages.flat_pages.get("news/first.de") is unchanged
+        # the old tree stays intact for requests still using it
+        assert old_root.categories["about"]._articles.keys() == {"index", "broken"}
+
+    def test_unknown_generation_reloads_everything(self, cf_pages):
+        cf_pages.generation = "0" * 40
+        cf_pages.refresh()
+        assert cf_pages.get("news", "second") is not None
+        assert cf_pages.get("about", "broken") is None
+
+    def test_failing_update_keeps_old_pages(self, cf_pages):
+        old_root = cf_pages.root_category
+        with patch.object(FlatPages, "_parse", side_effect=ValueError):
+            assert not cf_pages.refresh()
+        assert cf_pages.root_category is old_root
+
+    def test_refreshed_in_background(self, cf_pages):
+        refreshed = Event()
+        with patch.object(cf_pages, "refresh", side_effect=refreshed.set):
+            cf_pages.start_refreshing(0.01)
+            try:
+                assert refreshed.wait(timeout=5)
+            finally:
+                cf_pages.stop_refreshing()
+
+    def test_not_refreshed_before_request(self, cf_pages):
+        with cf_pages.app.test_client() as client:
+            client.get("/")
+        assert cf_pages.get("news", "second") is None
+
+
+class TestRefreshAllWorkers:
+    @pytest.fixture
+    def uwsgi(self):
+        uwsgi = MagicMock()
+        with patch.dict("sys.modules", {"uwsgi": uwsgi}):
+            yield uwsgi
+
+    def test_reloads_uwsgi_without_interval(self, cf_pages, uwsgi):
+        with patch.object(cf_pages, "refresh") as refresh:
+            cf_pages.refresh_all_workers()
+        uwsgi.reload.assert_called_once_with()
+        refresh.assert_not_called()
+
+    def test_refreshes_this_worker_with_interval(self, content, uwsgi):
+        cf_pages = make_cf_pages(content, CONTENT_REFRESH_INTERVAL=60)
+        try:
+            with patch.object(cf_pages, "refresh") as refresh:
+                cf_pages.refresh_all_workers()
+        finally:
+            cf_pages.stop_refreshing()
+        refresh.assert_called_once_with()
+        uwsgi.reload.assert_not_called()
+
+    def test_refreshes_without_uwsgi(self, cf_pages):
+        with patch.object(cf_pages, "refresh") as refresh:
+            cf_pages.refresh_all_workers()
+        refresh.assert_called_once_with()
+
+
+def test_not_refreshing_by_default():
+    app = make_testing_app(DEFAULT_TESTING_CONFIG)
+    assert app.config["CONTENT_REFRESH_INTERVAL"] is None
+    assert app.cf_pages._stop_refreshing is None
+
+
+def test_reload_rebuilds_tree(cf_pages, content):
+    (content / "news/first.en.md").unlink()
+    (content / "news/first.de.md").unlink()
+    cf_pages.reload()
+    assert cf_pages.get("news", "first") is None
+
+
+class TestArticleIndex:
+    @pytest.fixture
+    def cf_pages(self, content):
+        commit_pages(content, {
+            "news/old.en.md": "title: Old news\ndate: 2023-01-01\n\nOld.\n",
+            "news/newest.de.md": "title: Neueste\ndate: 2024-06-01\n\nNeu.\n",
+            "news/undated.en.md": "title: Undated\n\nNo date.\n",
+        })
+        return make_cf_pages(content)
+
+    def localized(self, cf_pages, *preferred):
+        with cf_pages.app.test_request_context():
+            g.preferred_locales = list(preferred)
+            return cf_pages.get_localized_articles("news")
+
+    def test_dated_newest_first(self, cf_pages):
+        news = self.localized(cf_pages, "en")
+        assert [a.id for a in news.dated] == ["newest", "first", "old"]
+
+    def test_by_basename(self, cf_pages):
+        news = self.localized(cf_pages, "en")
+        assert news.by_basename.keys() == {"first", "old", "newest", "undated"}
+        assert news.by_basename["first"].id == "first"
+
+    def test_same_choice_shares_index(self, cf_pages):
+        assert self.localized(cf_pages, "en") is self.localized(cf_pages, "fr", "en")
+        assert self.localized(cf_pages, "en") is not self.localized(cf_pages, "de")
+
+    def test_unknown_category(self, cf_pages):
+        with cf_pages.app.test_request_context():
+            g.preferred_locales = ["en"]
+            assert cf_pages.get_localized_articles("events").dated == []
+
+    def test_rebuilt_with_tree(self, cf_pages, content):
+        before = self.localized(cf_pages, "en")
+        commit_pages(content, {"news/latest.en.md": "title: Latest\ndate: 2025-01-01\n\n!\n"})
+        cf_pages.refresh()
+        after = self.localized(cf_pages, "en")
+        assert after is not before
+        assert after.dated[0].id == "latest"
@@ -0,0 +1,63 @@
+"""Pins the behavior of the `FlatPages` internals sipa relies on
+
+If these fail after upgrading Flask-FlatPages, adapt
+`sipa.utils.flatpages_internals`.
+"""
+import os
+
+import pytest
+
+from sipa.utils.flatpages_internals import FlatPagesInternals
+
+from .fixture_helpers import make_cf_pages
+
+
+@pytest.fixture
+def flat_pages(content):
+    return make_cf_pages(content).flat_pages
+
+
+@pytest.fixture
+def internals(flat_pages) -> FlatPagesInternals:
+    return FlatPagesInternals(flat_pages)
+
+
+def test_pages_keyed_by_path(internals, flat_pages):
+    pages = internals.pages()
+    assert pages["news/first.en"] is flat_pages.get("news/first.en")
+    assert set(pages) == {page.path for page in flat_pages}
+
+
+def test_replaced_pages_are_used(internals, flat_pages):
+    first = flat_pages.get("news/first.en")
+    internals.replace_pages({"only": first})
+    assert list(flat_pages) == [first]
+    assert flat_pages.get("only") is first
+    assert flat_pages.get("news/first.de") is None
+
+
+def test_reload_discards_replaced_pages(internals, flat_pages):
+    internals.replace_pages({})
+    flat_pages.reload()
+    assert flat_pages.get("news/first.en") is not None
+
+
+def test_read_page_reads_again(internals, flat_pages, content):
+    filename = str(content / "news" / "first.en.md")
+    mtime = os.path.getmtime(filename)
+    with open(filename, "w") as f:
+        f.write("title: Changed\n\nChanged.\n")
+    # changed within the same instant it was read before
+    os.utime(filename, (mtime, mtime))
+
+    page = internals.read_page("news/first.en", filename, "news")
+    assert page.meta["title"] == "Changed"
+    assert page.path == "news/first.en"
+    assert page is not flat_pages.get("news/first.en")
+
+
+def test_html_renderer(internals, flat_pages):
+    page = flat_pages.get("news/first.en")
+    renderer = internals.html_renderer()
+    with flat_pages.app.test_request_context():
+        assert renderer(page) == page.html
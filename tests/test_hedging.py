@@ -0,0 +1,99 @@
+from threading import Event
+
+import pytest
+from flask import Flask
+
+from sipa.utils.hedging import Hedger, LatencyWindow
+
+
+@pytest.fixture
+def request_context():
+    with Flask(__name__).test_request_context() as ctx:
+        yield ctx
+
+
+def slow_then_fast():
+    """A call which hangs on its first invocation only"""
+    first = Event()
+    release = Event()
+
+    def fn():
+        if not first.is_set():
+            first.set()
+            release.wait(timeout=5)
+            return "slow"
+        return "fast"
+
+    return fn, release
+
+
+def test_percentile():
+    window = LatencyWindow()
+    for i in range(1, 101):
+        window.record(i)
+    assert window.percentile(95) == 95
+    assert window.percentile(50) == 50
+    assert LatencyWindow().percentile(95) is None
+
+
+def test_auto_delay_needs_samples():
+    hedger = Hedger(delay='auto', min_samples=3)
+    assert hedger.delay_for("user") is None
+    for _ in range(3):
+        assert hedger.call("user", lambda: 1) == 1
+    assert hedger.delay_for("user") is not None
+
+
+@pytest.mark.usefixtures('request_context')
+def test_hedge_wins():
+    hedger = Hedger(delay=0.01, budget=1)
+    fn, release = slow_then_fast()
+    assert hedger.call("user", fn) == "fast"
+    release.set()
+    assert (hedger.hedges_sent, hedger.hedges_won) == (1, 1)
+
+
+@pytest.mark.usefixtures('request_context')
+def test_fast_call_not_hedged():
+    hedger = Hedger(delay=5, budget=1)
+    assert hedger.call("user", lambda: 1) == 1
+    assert hedger.hedges_sent == 0
+
+
+@pytest.mark.usefixtures('request_context')
+def test_budget_exhausted():
+    hedger = Hedger(delay=0.01, budget=1)
+    fn, release = slow_then_fast()
+    hedger.call("user", fn)
+    release.set()
+
+    fn, release = slow_then_fast()
+    release.set()
+    assert hedger.call("user", fn) == "slow"
+    assert hedger.hedges_sent == 1
+
+
+def test_no_hedges_outside_of_request():
+    hedger = Hedger(delay=0.01, budget=1)
+    fn, release = slow_then_fast()
+    release.set()
+    assert hedger.call("user", fn) == "slow"
+    assert hedger.hedges_sent == 0
+
+
+@pytest.mark.usefixtures('request_context')
+def test_failed_hedge_falls_back_to_primary():
+    hedger = Hedger(delay=0.01, budget=1)
+    first = Event()
+    release = Event()
+
+    def fn():
+        if not first.is_set():
+            first.set()
+            release.wait(timeout=5)
+            return "slow"
+        release.set()
+        raise ValueError
+
+    assert hedger.call("user", fn) == "slow"
+    assert (hedger.hedges_sent, hedger.hedges_won) == (1, 0)
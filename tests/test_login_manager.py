@@ -1,8 +1,18 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
 from flask import Flask, Blueprint, url_for
 from flask_login import current_user, login_user
 
-from sipa.login_manager import SipaLoginManager
+from sipa.login_manager import (
+    LEGACY_DISPLAY_NAME_KEY,
+    DisplayNameCache,
+    LazyUser,
+    SipaLoginManager,
+)
+from sipa.model.sample import datasource as sample_datasource
 
+from .assertions import TestClient
 from .base import TestCase
 
 
@@ -114,3 +124,136 @@ class BlueprintLevelUserLoadingDisabledTest(SipaLoginManagerTest):
         response = self.client.get(url_for("documents.show_images_as_well"))
         assert response.data.decode() == "Images :-)"
         assert "documents.show_images_as_well" in self.mgr.ignored_endpoints
+
+
+class TestLazyUser:
+    @pytest.fixture
+    def loader(self):
+        return MagicMock(side_effect=AuthenticatedUser)
+
+    @pytest.fixture
+    def user(self, loader):
+        return LazyUser("test_user", loader)
+
+    def test_flags_do_not_load(self, user, loader):
+        assert user.is_authenticated
+        assert user.is_active
+        assert not user.is_anonymous
+        assert user.get_id() == "test_user"
+        loader.assert_not_called()
+        assert not user.is_loaded
+
+    def test_data_access_loads_once(self, user, loader):
+        assert user.uid == "test_user"
+        assert user.uid == "test_user"
+        loader.assert_called_once_with("test_user")
+        assert user.is_loaded
+
+    def test_missing_attribute(self, user):
+        with pytest.raises(AttributeError):
+            user.no_such_attribute
+
+    def test_flags_of_vanished_user(self, loader):
+        loader.side_effect = lambda uid: MagicMock(is_authenticated=False,
+                                                   is_anonymous=True)
+        user = LazyUser("test_user", loader)
+        user.realname
+        assert not user.is_authenticated
+        assert user.is_anonymous
+
+    @pytest.fixture
+    def display_names(self) -> DisplayNameCache:
+        return DisplayNameCache(maxsize=10, ttl=60)
+
+    @pytest.fixture
+    def app(self, display_names) -> Flask:
+        app = Flask('test')
+        app.config['SECRET_KEY'] = "foobar"*9
+        app.extensions['display_names'] = display_names
+        return app
+
+    def test_display_name_from_cache(self, user, loader, app, display_names):
+        display_names.set("test_user", "Test User")
+        with app.test_request_context():
+            assert user.display_name == "Test User"
+        loader.assert_not_called()
+
+    def test_display_name_not_cached(self, user, loader, app, display_names):
+        loader.side_effect = lambda uid: MagicMock(display_name="Test User")
+        with app.test_request_context():
+            from flask import session
+            assert user.display_name == "Test User"
+            assert not session
+        assert display_names.get("test_user") == "Test User"
+        loader.assert_called_once()
+
+
+class TestDisplayNameCache:
+    def test_expiry(self):
+        now = [0]
+        cache = DisplayNameCache(maxsize=10, ttl=60, timer=lambda: now[0])
+        cache.set("1", "Test User")
+        assert cache.get(1) == "Test User"
+        now[0] = 61
+        assert cache.get("1") is None
+
+    def test_invalidate(self):
+        cache = DisplayNameCache(maxsize=10, ttl=60)
+        cache.set("1", "Test User")
+        cache.invalidate("1")
+        assert cache.get("1") is None
+
+    def test_disabled(self):
+        cache = DisplayNameCache(maxsize=0, ttl=60)
+        cache.set("1", "Test User")
+        assert cache.get("1") is None
+
+
+class TestLazyUserLoading:
+    @pytest.fixture(scope="class")
+    def client(self, app: Flask) -> TestClient:
+        # without a surrounding app context, so that `g` is not shared
+        # between requests
+        client = TestClient(app)
+        client.post("/login", data={"username": "test", "password": "test"})
+        return client
+
+    @pytest.fixture
+    def get_user(self):
+        user_class = sample_datasource.user_class
+        with patch.object(user_class, "get", wraps=user_class.get) as get_user:
+            yield get_user
+
+    def test_news_does_not_load_user(self, client: TestClient, get_user):
+        resp = client.get("/news/")
+        assert resp.status_code == 200
+        get_user.assert_not_called()
+        assert "Test User" in resp.data.decode()
+
+    def test_display_name_not_in_session(self, client: TestClient):
+        with client.session_transaction() as session:
+            assert "Test User" not in repr(dict(session))
+
+    def test_usersuite_loads_user(self, client: TestClient, get_user):
+        resp = client.get("/usersuite/")
+        assert resp.status_code == 200
+        get_user.assert_called_once_with("test")
+
+
+def test_legacy_display_name_removed_from_session(app: Flask):
+    client = TestClient(app)
+    client.post("/login", data={"username": "test", "password": "test"})
+    with client.session_transaction() as session:
+        session[LEGACY_DISPLAY_NAME_KEY] = "Test User"
+    client.get("/news/")
+    with client.session_transaction() as session:
+        assert LEGACY_DISPLAY_NAME_KEY not in session
+
+
+def test_logout_forgets_display_name(app: Flask):
+    client = TestClient(app)
+    client.post("/login", data={"username": "test", "password": "test"})
+    display_names: DisplayNameCache = app.extensions["display_names"]
+    assert display_names.get("test") == "Test User"
+    client.get("/logout")
+    assert display_names.get("test") is None
@@ -5,6 +5,7 @@ from unittest.mock import MagicMock, patch
 from sipa.mail import send_contact_mail, send_complex_mail, \
     send_official_contact_mail, send_usersuite_contact_mail, \
     compose_subject, compose_body, send_mail
+from sipa.utils.deadline import DeadlineExceeded
 
 
 class MailSendingTestBase(TestCase):
@@ -102,6 +103,7 @@ class SMTPTestBase(TestCase):
             'MAILSERVER_SSL_CA_FILE': None,
             'MAILSERVER_USER': None,
             'MAILSERVER_PASSWORD': None,
+            'MAILSERVER_TIMEOUT': 5,
             'CONTACT_SENDER_MAIL': 'noreply@agdsn.de',
         }
 
@@ -261,6 +263,29 @@ class SendMailFailingTestCase(SMTPTestBase):
         assert not self.success
 
 
+class SendMailDeadlineExceededTestCase(SMTPTestBase):
+    def setUp(self):
+        super().setUp()
+
+        with self._patch_smtp(), patch(
+            "sipa.mail.current_app", self.app_mock
+        ), patch(
+            "sipa.mail.deadline_timeout", side_effect=DeadlineExceeded
+        ), self.assertLogs("sipa.mail", level="ERROR") as log:
+            self.success = send_mail("", "", "", "")
+
+        self.log = log
+
+    def test_failing_returns_false(self):
+        assert not self.success
+
+    def test_smtp_not_contacted(self):
+        assert not self.smtp_mock.called
+
+    def test_error_logged(self):
+        assert "no time left" in self.log.output.pop()
+
+
 class ComplexMailContentTestCase(MailSendingTestBase):
     mail_function = staticmethod(send_complex_mail)
 
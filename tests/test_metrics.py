@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from sipa.utils.metrics import Metric, MetricsRegistry
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    return MetricsRegistry()
+
+
+def lines(registry: MetricsRegistry) -> list[str]:
+    """The rendered lines without the `pid` label"""
+    pid = f'pid="{os.getpid()}"'
+    rendered = registry.render().replace(f",{pid}", "").replace(f"{{{pid}}}", "")
+    return rendered.splitlines()
+
+
+def test_metric_without_samples():
+    class Incomplete(Metric):
+        pass
+
+    with pytest.raises(TypeError, match="samples"):
+        Incomplete('incomplete', "Incomplete")
+
+
+def test_counter(registry):
+    counter = registry.counter('requests', "Requests", ['status'])
+    counter.inc(status='200')
+    counter.inc(2, status='200')
+    assert counter.value(status='200') == 3
+    assert 'requests_total{status="200"} 3' in lines(registry)
+
+
+def test_collected_counter(registry):
+    counts = {('hit',): 3}
+    counter = registry.counter('lookups', "Lookups", ['result'],
+                               collect=lambda: counts)
+    assert counter.value(result='hit') == 3
+    assert 'lookups_total{result="hit"} 3' in lines(registry)
+    assert '# TYPE lookups counter' in lines(registry)
+    with pytest.raises(TypeError):
+        counter.inc(result='hit')
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = registry.histogram('latency', "Latency", ['endpoint'],
+                                   buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, endpoint='user/{id}')
+    rendered = lines(registry)
+    assert 'latency_bucket{endpoint="user/{id}",le="0.1"} 1' in rendered
+    assert 'latency_bucket{endpoint="user/{id}",le="1"} 2' in rendered
+    assert 'latency_bucket{endpoint="user/{id}",le="+Inf"} 3' in rendered
+    assert 'latency_count{endpoint="user/{id}"} 3' in rendered
+    assert 'latency_sum{endpoint="user/{id}"} 5.55' in rendered
+
+
+def test_gauge(registry):
+    registry.gauge('entries', "Entries", collect=lambda: {(): 7})
+    assert 'entries 7' in lines(registry)
+
+
+def test_label_values_escaped(registry):
+    counter = registry.counter('errors', "Errors", ['message'])
+    counter.inc(message='a "quoted"\nvalue')
+    assert r'message="a \"quoted\"\nvalue"' in registry.render()
+
+
+def test_wrong_labels_rejected(registry):
+    counter = registry.counter('requests', "Requests", ['status'])
+    with pytest.raises(ValueError):
+        counter.inc(method='GET')
+
+
+def test_duplicate_names_rejected(registry):
+    registry.counter('requests', "Requests")
+    with pytest.raises(ValueError):
+        registry.counter('requests', "Requests")
+
+
+def test_help_and_type(registry):
+    registry.counter('requests', "Requests served")
+    assert lines(registry) == ['# HELP requests Requests served',
+                               '# TYPE requests counter']
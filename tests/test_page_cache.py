@@ -0,0 +1,212 @@
+import gzip
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from flask import Flask, flash, g, render_template_string
+
+from sipa.page_cache import CachedResponse, PageCache, cached_for_anonymous
+from sipa.utils.csp import NonceInfo
+
+from .fixture_helpers import DEFAULT_TESTING_CONFIG, commit_pages, make_testing_app
+
+OUTSIDE = {"REMOTE_ADDR": "192.0.2.1"}
+
+
+def make_app(content: Path, **config) -> Flask:
+    app = make_testing_app(DEFAULT_TESTING_CONFIG | {
+        "BACKEND": "sample",
+        "FLATPAGES_ROOT": str(content),
+        "PAGE_CACHE_SIZE": 1 << 20,
+    } | config)
+
+    @app.route("/nonce")
+    @cached_for_anonymous
+    def nonce():
+        g.nonce_info = NonceInfo()
+        return render_template_string("<script nonce={{ n }}></script>",
+                                      n=g.nonce_info.add_script_nonce())
+
+    @app.route("/flash")
+    @cached_for_anonymous
+    def flashing():
+        flash("Hello")
+        return "flashed"
+
+    return app
+
+
+@pytest.fixture
+def app(content):
+    return make_app(content)
+
+
+@pytest.fixture
+def page_cache(app) -> PageCache:
+    return app.extensions["page_cache"]
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class TestPageCache:
+    def test_disabled(self):
+        cache = PageCache(0)
+        cache.set("key", CachedResponse(b"", 200, []))
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_size_bound(self):
+        entry = CachedResponse(b"x" * 1000, 200, [])
+        cache = PageCache(3 * entry.size)
+        for key in range(4):
+            cache.set(key, entry)
+        assert len(cache) == 3
+        assert cache.get(0) is None
+        assert cache.currsize == 3 * entry.size
+
+    def test_too_large_entry_is_skipped(self):
+        cache = PageCache(100)
+        cache.set("key", CachedResponse(b"x" * 1000, 200, []))
+        assert len(cache) == 0
+
+
+def test_disabled_by_default(content):
+    app = make_app(content, PAGE_CACHE_SIZE=0)
+    with app.test_client() as client:
+        client.get("/news/")
+        client.get("/news/")
+    assert not app.extensions["page_cache"].enabled
+
+
+def test_second_request_is_hit(client, page_cache):
+    first = client.get("/news/")
+    second = client.get("/news/")
+    assert first.status_code == second.status_code == 200
+    assert second.data == first.data
+    assert (page_cache.misses, page_cache.hits) == (1, 1)
+
+
+def test_hit_gets_csp(client):
+    client.get("/news/")
+    response = client.get("/news/")
+    assert "default-src" in response.headers["Content-Security-Policy"]
+
+
+class TestCompressed:
+    GZIP = {"Accept-Encoding": "gzip"}
+
+    @pytest.fixture
+    def app(self, content):
+        return make_app(content, COMPRESS_RESPONSES=True, COMPRESS_MIN_SIZE=0)
+
+    def test_gzipped_body_is_stored(self, client, page_cache):
+        client.get("/news/")
+        (entry,) = page_cache._cache.values()
+        assert gzip.decompress(entry.gzipped) == entry.body
+        assert entry.size == len(entry.body) + len(entry.gzipped) + 1024
+
+    def test_miss_is_compressed_once(self, client):
+        with patch("sipa.compression.gzip.compress",
+                   wraps=gzip.compress) as compress:
+            response = client.get("/news/", headers=self.GZIP)
+        assert compress.call_count == 1
+        assert response.content_encoding == "gzip"
+
+    def test_hit_is_not_compressed_again(self, client, page_cache):
+        first = client.get("/news/", headers=self.GZIP)
+        with patch("sipa.compression.gzip.compress",
+                   side_effect=AssertionError) as compress:
+            second = client.get("/news/", headers=self.GZIP)
+        compress.assert_not_called()
+        assert page_cache.hits == 1
+        assert second.content_encoding == "gzip"
+        assert "Accept-Encoding" in second.vary
+        assert second.data == first.data
+        assert second.get_etag() == first.get_etag()
+        assert second.get_etag()[1] is True
+
+    def test_hit_without_accept_encoding(self, client, page_cache):
+        gzipped = client.get("/news/", headers=self.GZIP)
+        response = client.get("/news/")
+        assert page_cache.hits == 1
+        assert response.content_encoding is None
+        assert response.data == gzip.decompress(gzipped.data)
+        assert response.get_etag()[1] is False
+
+
+def test_redirect_is_cached(client, page_cache):
+    client.get("/")
+    response = client.get("/")
+    assert response.status_code == 302
+    assert page_cache.hits == 1
+
+
+def test_uncached_endpoint(client, page_cache):
+    client.get("/login")
+    assert (page_cache.misses, page_cache.hits) == (0, 0)
+
+
+@pytest.mark.parametrize("cookie", ["session", "remember_token"])
+def test_bypassed_with_cookie(client, page_cache, cookie):
+    client.get("/news/")
+    client.set_cookie(cookie, "foo", domain="localhost.localdomain")
+    client.get("/news/")
+    assert page_cache.hits == 0
+
+
+def test_keyed_by_locale(client, page_cache):
+    german = client.get("/news/", headers={"Accept-Language": "de"})
+    english = client.get("/news/", headers={"Accept-Language": "en"})
+    assert german.data != english.data
+    assert len(page_cache) == 2
+
+
+def test_keyed_by_dormitory(client, page_cache):
+    client.get("/news/")
+    client.get("/news/", environ_base=OUTSIDE)
+    assert len(page_cache) == 2
+
+
+def test_bypassed_in_dormitory_without_deferred_traffic(content):
+    app = make_app(content, TRAFFIC_DATA_DEFERRED=False)
+    page_cache = app.extensions["page_cache"]
+    with app.test_client() as client:
+        client.get("/news/")
+        client.get("/news/", environ_base=OUTSIDE)
+    assert page_cache.misses == 1
+
+
+def test_new_content_is_not_served_from_cache(app, client, content):
+    client.get("/news/first")
+    commit_pages(content, {"news/first.de.md": "title: Neu\ndate: 2024-01-01\n\nNeu\n"})
+    app.cf_pages.refresh()
+    response = client.get("/news/first")
+    assert "Neu" in response.text
+
+
+def test_locale_change_is_not_stored(client, page_cache):
+    client.get("/news/?locale=en")
+    assert len(page_cache) == 0
+
+
+def test_flash_is_not_stored(client, page_cache):
+    client.get("/flash")
+    assert len(page_cache) == 0
+
+
+def test_page_with_nonce_is_not_stored(client, page_cache):
+    response = client.get("/nonce")
+    assert "'nonce-" in response.headers["Content-Security-Policy"]
+    assert len(page_cache) == 0
+
+
+def test_metrics(app, client):
+    client.get("/news/")
+    client.get("/news/")
+    rendered = app.extensions["metrics"].render()
+    assert "# TYPE sipa_page_cache_lookups counter" in rendered
+    assert 'sipa_page_cache_lookups_total{result="hit"' in rendered
+    assert "sipa_page_cache_entries" in rendered
@@ -0,0 +1,160 @@
+from unittest.mock import patch
+
+import pytest
+
+from sipa.search import LocaleIndex, SearchIndex, plain_text, tokenize
+
+from .fixture_helpers import (
+    DEFAULT_TESTING_CONFIG,
+    commit_pages,
+    make_cf_pages,
+    make_testing_app,
+)
+
+PAGES = {
+    "about/fees.de.md": "title: Beitrag\n\nDer Beitrag beträgt 5 € im Monat.\n",
+    "about/fees.en.md": "title: Fees\n\nThe membership fee is 5 € per month.\n",
+    "about/wifi.de.md": "title: WLAN\n\nDas WLAN erreichst du über **eduroam**.\n",
+    "about/secret.de.md": "title: Geheim\nrestricted: true\n\nDer Beitrag ist geheim.\n",
+    "about/hidden.de.md": "title: Versteckt\nhidden: true\n\nBeitrag\n",
+    "about/network/index.md": "title: Netzwerk\n\n",
+    "about/network/ports.de.md": "title: Ports\n\nOffene Ports: keine.\n",
+}
+
+
+@pytest.fixture
+def cf_pages(content):
+    commit_pages(content, PAGES)
+    return make_cf_pages(content)
+
+
+def titles(results):
+    return [result.title for result in results]
+
+
+class TestTokenize:
+    def test_stopwords_are_removed(self):
+        assert tokenize("Der Beitrag und die Gebühr", "de") == ["beitrag", "gebuhr"]
+
+    def test_inflections_are_stemmed(self):
+        assert tokenize("Gebühren", "de") == tokenize("Gebühr", "de")
+        assert tokenize("fees", "en") == tokenize("fee", "en")
+
+    def test_unknown_locale(self):
+        assert tokenize("Der Beitrag", "fr") == ["der", "beitrag"]
+
+
+def test_plain_text():
+    assert plain_text("# Title\n\n* See [*here*](/pages/x){: .btn}.") == "Title See here."
+
+
+class TestSearch:
+    def test_finds_page_of_locale(self, cf_pages):
+        assert titles(cf_pages.search("Beitrag", "de")) == ["Beitrag"]
+        assert titles(cf_pages.search("membership fee", "en")) == ["Fees"]
+
+    def test_falls_back_to_default_page(self, cf_pages):
+        assert titles(cf_pages.search("eduroam", "en")) == ["WLAN"]
+
+    def test_finds_news(self, cf_pages):
+        [result] = cf_pages.search("Meldung", "de")
+        assert (result.endpoint, result.values) \
+            == ("news.show_news", {"filename": "first"})
+
+    def test_finds_pages_of_nested_categories(self, cf_pages):
+        [result] = cf_pages.search("Ports", "de")
+        assert (result.endpoint, result.values) == (
+            "pages.show", {"category_id": "about/network", "article_id": "ports"},
+        )
+        article = cf_pages.get("about/network", "ports")
+        assert article.localized_pages["de"].meta["title"] == "Ports"
+
+    def test_skips_restricted_and_hidden_pages(self, cf_pages):
+        assert titles(cf_pages.search("geheim versteckt", "de")) == []
+
+    def test_title_ranks_higher(self, content):
+        commit_pages(content, {
+            "about/a.en.md": "title: Other\n\nrouter router\n",
+            "about/b.en.md": "title: Router\n\nSomething\n",
+        })
+        assert titles(make_cf_pages(content).search("router", "en")) \
+            == ["Router", "Other"]
+
+    def test_snippet(self, cf_pages):
+        [result] = cf_pages.search("eduroam", "de")
+        assert result.snippet == "Das WLAN erreichst du über <mark>eduroam</mark>."
+
+    def test_snippet_is_escaped(self):
+        index = LocaleIndex("en")
+        snippet = index.snippet("<b>router</b> & more", {"router"})
+        assert snippet == "&lt;b&gt;<mark>router</mark>&lt;/b&gt; &amp; more"
+
+    def test_snippet_of_long_text(self):
+        index = LocaleIndex("en")
+        text = " ".join(["filler"] * 100 + ["router"] + ["filler"] * 100)
+        snippet = index.snippet(text, {"router"}, width=40)
+        assert snippet.startswith("… ") and snippet.endswith(" …")
+        assert "<mark>router</mark>" in snippet
+        assert len(snippet) < 80
+
+    def test_unknown_locale(self, cf_pages):
+        assert cf_pages.search("Beitrag", "fr") == []
+
+
+class TestUpdate:
+    def test_only_changed_pages_are_indexed(self, cf_pages, content):
+        commit_pages(content, {"about/wifi.de.md": "title: WLAN\n\nNun mit Kabel.\n"})
+        with patch.object(LocaleIndex, "_document", autospec=True,
+                          side_effect=LocaleIndex._document) as document:
+            assert cf_pages.refresh()
+        assert [call.args[1].key for call in document.call_args_list] \
+            == [("about", "wifi")] * 2
+        assert titles(cf_pages.search("Kabel", "de")) == ["WLAN"]
+        assert titles(cf_pages.search("eduroam", "de")) == []
+
+    def test_removed_pages_are_not_found(self, cf_pages, content):
+        (content / "about/fees.en.md").unlink()
+        commit_pages(content, {})
+        cf_pages.refresh()
+        assert titles(cf_pages.search("fee", "en")) == []
+        assert titles(cf_pages.search("Beitrag", "en")) == ["Beitrag"]
+
+    def test_removed_documents_are_compacted(self, cf_pages, content):
+        (content / "about/fees.de.md").unlink()
+        commit_pages(content, {"about/wifi.de.md": "title: WLAN\n\nNun mit Kabel.\n"})
+        cf_pages.refresh()
+        index = cf_pages.search_index._indexes["de"]
+        assert None not in index._documents
+        assert len(index._documents) == len(index)
+        assert titles(cf_pages.search("Kabel", "de")) == ["WLAN"]
+        assert titles(cf_pages.search("Ports", "de")) == ["Ports"]
+
+    def test_old_index_is_unchanged(self, cf_pages):
+        old = cf_pages.search_index
+        cf_pages.reload()
+        assert cf_pages.search_index is not old
+        assert titles(old.search("Beitrag", "de")) == ["Beitrag"]
+
+    def test_unchanged_tree_keeps_documents(self, cf_pages):
+        index = cf_pages.search_index.updated(cf_pages.root_category)
+        assert isinstance(index, SearchIndex)
+        assert index._indexes["de"]._postings == \
+            cf_pages.search_index._indexes["de"]._postings
+
+
+def test_nested_result_is_reachable(content):
+    commit_pages(content, PAGES)
+    app = make_testing_app(DEFAULT_TESTING_CONFIG | {
+        "BACKEND": "sample", "FLATPAGES_ROOT": str(content),
+    })
+    client = app.test_client()
+    response = client.get("/search/?q=Ports", headers={"Accept-Language": "de"})
+    assert 'href="/pages/about/network/ports"' in response.text
+    response = client.get("/pages/about/network/ports")
+    assert response.status_code == 200
+    assert "Offene Ports" in response.text
+
+
+def test_search_view(module_test_client):
+    response = module_test_client.get("/search/?q=foo")
+    assert response.status_code == 200
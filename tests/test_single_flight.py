@@ -0,0 +1,107 @@
+import time
+from threading import Barrier, Event, Thread
+
+import pytest
+
+from sipa.utils.single_flight import SingleFlight, WaitTimeout
+
+
+def run_concurrently(flight: SingleFlight, fn, count: int) -> list:
+    """Start `count` threads calling `fn` via the flight.
+
+    The leader's call is held back until all followers are waiting.
+    """
+    results = [None] * count
+    ready = Barrier(count)
+
+    def worker(i):
+        ready.wait()
+        try:
+            results[i] = flight.do("key", fn, share=list)
+        except Exception as e:
+            results[i] = e
+
+    threads = [Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+def test_concurrent_calls_coalesced():
+    flight = SingleFlight()
+    release = Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(timeout=5)
+        return [42]
+
+    # release the leader once every other thread joined the flight
+    def release_when_coalesced():
+        while flight.coalesced < 3:
+            time.sleep(0.001)
+        release.set()
+
+    Thread(target=release_when_coalesced, daemon=True).start()
+    results = run_concurrently(flight, fn, 4)
+
+    assert len(calls) == 1
+    assert results == [[42]] * 4
+    # every caller gets its own copy
+    assert len({id(r) for r in results}) == 4
+    assert flight.in_flight() == 0
+
+
+def test_error_shared_with_waiters():
+    flight = SingleFlight()
+    release = Event()
+
+    def fn():
+        release.wait(timeout=5)
+        raise ValueError("boom")
+
+    def release_when_coalesced():
+        while flight.coalesced < 1:
+            time.sleep(0.001)
+        release.set()
+
+    Thread(target=release_when_coalesced, daemon=True).start()
+    results = run_concurrently(flight, fn, 2)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.in_flight() == 0
+
+
+def test_sequential_calls_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    assert flight.coalesced == 0
+
+
+def test_leader_error_propagates():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError()))
+    assert flight.in_flight() == 0
+
+
+def test_waiter_gives_up_after_timeout():
+    flight = SingleFlight()
+    started, release = Event(), Event()
+
+    def fn():
+        started.set()
+        release.wait(timeout=5)
+        return 1
+
+    leader = Thread(target=flight.do, args=("key", fn))
+    leader.start()
+    started.wait(timeout=5)
+    with pytest.raises(WaitTimeout):
+        flight.do("key", fn, timeout=0.01)
+    release.set()
+    leader.join(timeout=5)
+    assert flight.in_flight() == 0
@@ -1,8 +1,19 @@
+from pathlib import Path
+from subprocess import check_output
+from unittest.mock import patch
+
 import pytest
 from flask import Flask
 
 from sipa.blueprints.documents import StaticFiles
 
+from .fixture_helpers import (
+    DEFAULT_TESTING_CONFIG,
+    commit_pages,
+    make_cf_pages,
+    make_testing_app,
+)
+
 
 @pytest.fixture(scope="module")
 def documents_dir(tmp_path_factory: pytest.TempPathFactory):
@@ -35,3 +46,149 @@ def app(static_file, documents_dir):
 def test_static_view(app: Flask):
     with app.test_client() as c, c.get("/documents/test.txt") as resp:
         assert resp.text == "Test!"
+
+
+def make_documents_app(content: Path, **config) -> Flask:
+    """A minimal app with the pages of `content`, serving `content/documents`"""
+    app = make_cf_pages(content, **{
+        "STATIC_FILES_OFFLOAD": None,
+        "STATIC_FILES_ACCEL_PREFIX": "/_content/",
+    } | config).app
+    app.add_url_rule("/documents/<path:filename>", view_func=StaticFiles.as_view(
+        "show_document", str(content / "documents")))
+    return app
+
+
+class TestValidators:
+    @pytest.fixture
+    def app(self, content):
+        commit_pages(content, {"documents/doc.txt": "version 1"})
+        return make_documents_app(content)
+
+    @pytest.fixture
+    def client(self, app):
+        return app.test_client()
+
+    def test_etag_is_blob_sha(self, client, content):
+        response = client.get("/documents/doc.txt")
+        sha = check_output(["git", "-C", str(content), "rev-parse",
+                            "HEAD:documents/doc.txt"], text=True).strip()
+        assert response.get_etag() == (sha, False)
+
+    def test_last_modified_is_commit_time(self, client, content):
+        response = client.get("/documents/doc.txt")
+        timestamp = check_output(["git", "-C", str(content), "log", "-1",
+                                  "--format=%ct"], text=True).strip()
+        assert response.last_modified.timestamp() == int(timestamp)
+
+    def test_not_modified(self, client):
+        etag, _ = client.get("/documents/doc.txt").get_etag()
+        response = client.get("/documents/doc.txt",
+                              headers={"If-None-Match": f'"{etag}"'})
+        assert response.status_code == 304
+
+    def test_new_version(self, app, client, content):
+        etag, _ = client.get("/documents/doc.txt").get_etag()
+        commit_pages(content, {"documents/doc.txt": "version 2"})
+        app.cf_pages.refresh()
+        assert client.get("/documents/doc.txt").get_etag()[0] != etag
+
+    def test_repository_not_opened_per_request(self, client):
+        client.get("/documents/doc.txt")
+        with patch("git.Repo", side_effect=AssertionError) as repo:
+            response = client.get("/documents/doc.txt")
+        repo.assert_not_called()
+        assert response.get_etag()[1] is False
+
+    def test_changed_file(self, client, content):
+        (content / "documents" / "doc.txt").write_text("version 1, changed")
+        response = client.get("/documents/doc.txt")
+        assert response.text == "version 1, changed"
+        assert response.get_etag()[0].startswith(
+            str((content / "documents" / "doc.txt").stat().st_mtime))
+
+    def test_untracked_file(self, client, content):
+        (content / "documents" / "new.txt").write_text("new")
+        response = client.get("/documents/new.txt")
+        assert response.status_code == 200
+        # werkzeug's default, derived from the mtime
+        assert response.get_etag()[0].startswith(
+            str((content / "documents" / "new.txt").stat().st_mtime))
+
+
+class TestOffload:
+    @pytest.fixture
+    def content(self, content):
+        commit_pages(content, {"documents/Hand buch.pdf": "%PDF"})
+        return content
+
+    def test_x_accel_redirect(self, content):
+        app = make_documents_app(content, STATIC_FILES_OFFLOAD="x-accel-redirect")
+        response = app.test_client().get("/documents/Hand buch.pdf")
+        assert response.status_code == 200
+        assert response.headers["X-Accel-Redirect"] \
+            == "/_content/documents/Hand%20buch.pdf"
+        assert response.mimetype == "application/pdf"
+        assert response.data == b""
+        assert response.get_etag()[0] is not None
+
+    def test_x_sendfile(self, content):
+        app = make_documents_app(content, STATIC_FILES_OFFLOAD="x-sendfile")
+        response = app.test_client().get("/documents/Hand buch.pdf")
+        assert response.headers["X-Sendfile"] \
+            == str(content / "documents" / "Hand buch.pdf")
+        assert response.data == b""
+
+    def test_range_is_left_to_the_proxy(self, content):
+        app = make_documents_app(content, STATIC_FILES_OFFLOAD="x-accel-redirect")
+        response = app.test_client().get("/documents/Hand buch.pdf",
+                                         headers={"Range": "bytes=0-1"})
+        assert response.status_code == 200
+        assert "X-Accel-Redirect" in response.headers
+
+    def test_not_modified_is_not_offloaded(self, content):
+        app = make_documents_app(content, STATIC_FILES_OFFLOAD="x-sendfile")
+        client = app.test_client()
+        etag, _ = client.get("/documents/Hand buch.pdf").get_etag()
+        response = client.get("/documents/Hand buch.pdf",
+                              headers={"If-None-Match": f'"{etag}"'})
+        assert response.status_code == 304
+        assert "X-Sendfile" not in response.headers
+
+    def test_untracked_file(self, content):
+        path = content / "documents" / "new.pdf"
+        path.write_text("%PDF")
+        app = make_documents_app(content, STATIC_FILES_OFFLOAD="x-sendfile")
+        client = app.test_client()
+        response = client.get("/documents/new.pdf")
+        assert response.status_code == 200
+        assert response.headers["X-Sendfile"] == str(path)
+        assert response.last_modified.timestamp() == int(path.stat().st_mtime)
+        etag, _ = response.get_etag()
+        response = client.get("/documents/new.pdf",
+                              headers={"If-None-Match": f'"{etag}"'})
+        assert response.status_code == 304
+
+    @pytest.mark.parametrize("filename", ["missing.pdf", "../../etc/passwd"])
+    def test_not_found(self, content, filename):
+        app = make_documents_app(content, STATIC_FILES_OFFLOAD="x-sendfile")
+        response = app.test_client().get(f"/documents/{filename}")
+        assert response.status_code == 404
+        assert "X-Sendfile" not in response.headers
+
+
+def test_uwsgi_serves_ranges_of_offloaded_files():
+    # uwsgi allows repeated options, which `configparser` does not
+    ini = (Path(__file__).parents[1] / "uwsgi.ini").read_text()
+    section = ini.split("[x-sendfile]\n")[1].split("\n[")[0]
+    options = {line for line in section.splitlines()
+               if line and not line.startswith(";")}
+    assert "honour-range = true" in options
+    assert "collect-header = X-Sendfile X_SENDFILE" in options
+    assert "response-route-if-not = empty:${X_SENDFILE} static:${X_SENDFILE}" \
+        in options
+
+
+def test_unknown_offload_mode():
+    with pytest.raises(ValueError, match="STATIC_FILES_OFFLOAD"):
+        make_testing_app(DEFAULT_TESTING_CONFIG | {"STATIC_FILES_OFFLOAD": "ftp"})